@@ -0,0 +1,86 @@
+"""Review statistics over a synthetic transition history.
+
+    python -m benchmarks.bench_history --rows 2000000 --repeat 3
+"""
+import argparse
+import os
+import random
+import tempfile
+from unittest import mock
+
+import history
+from benchmarks.harness import Result, report
+
+VERDICTS = (history.APPROVED, history.REJECTED)
+
+
+def synthesize(path, rows, projects=20, seed=1):
+    """Writing `rows` transitions straight into the column files.
+
+    Every review is two rows: `reviewing`, then a verdict a few hours later.
+    """
+    generator = random.Random(seed)
+    store = history.HistoryStore(path)
+    for number in range(projects):
+        store.project_code(f'project{number}')
+    buffers = store.buffers
+    at = 1600000000.0
+    for number in range(rows // 2):
+        at += generator.expovariate(1 / 30)
+        project = number % projects
+        for status, previous, moment in (
+                (history.REVIEWING, history.STATUS_CODES[None], at),
+                (generator.choice(VERDICTS), history.REVIEWING,
+                 at + generator.expovariate(1 / 14400))):
+            buffers['at'].append(moment)
+            buffers['homework'].append(number)
+            buffers['project'].append(project)
+            buffers['from_status'].append(previous)
+            buffers['to_status'].append(status)
+            buffers['comment_offset'].append(0)
+            buffers['comment_size'].append(0)
+    store.flush()
+    return store
+
+
+def bench_statistics(store, repeat, numpy):
+    result = Result('statistics', numpy=numpy)
+    with mock.patch.object(
+            history, 'vectorized',
+            history.vectorized if numpy else lambda: None):
+        for _ in range(repeat):
+            with result.timed():
+                statistics = history.statistics(store)
+            result.operations += statistics['transitions']
+    result.elapsed = sum(result.latencies)
+    result.extra['review_p50_h'] = statistics['review_hours']['p50']
+    return result
+
+
+def run(rows, repeat):
+    with tempfile.TemporaryDirectory() as path:
+        store = synthesize(os.path.join(path, 'history'), rows)
+        results = []
+        if history.vectorized() is not None:
+            results.append(bench_statistics(store, repeat, numpy=True))
+        results.append(bench_statistics(store, repeat, numpy=False))
+        size = sum(
+            os.path.getsize(store.column_path(name))
+            for name, _ in history.COLUMNS
+        )
+    for result in results:
+        result.extra['bytes_per_row'] = round(size / rows, 1)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--rows', type=int, default=1000000)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--json', action='store_true')
+    args = parser.parse_args()
+    report(run(args.rows, args.repeat), args.json)
+
+
+if __name__ == '__main__':
+    main()
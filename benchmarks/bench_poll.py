@@ -0,0 +1,157 @@
+"""Throughput and latency of the poll cycle against local stand-ins.
+
+    python -m benchmarks.bench_poll --subscribers 200 --cycles 3
+"""
+import argparse
+import asyncio
+import time
+
+import homework
+from benchmarks.harness import Result, measure_memory, report
+from benchmarks.standins import PracticumStandIn, TelegramStandIn
+from http_session import PooledSession
+from status_index import StatusIndex
+
+SCENARIOS = {}
+
+
+def scenario(name):
+    """Registering a benchmark scenario under a name."""
+    def register(function):
+        SCENARIOS[name] = function
+        return function
+    return register
+
+
+def make_subscriptions(count, chats_per_token=1):
+    from subscriptions import Subscription
+
+    return [Subscription(f'token{number // chats_per_token}',
+                         str(100000 + number))
+            for number in range(count)]
+
+
+@scenario('sync')
+def bench_sync(practicum, telegram, subscriptions, cycles, result):
+    """Original functions called one after another, a poll per chat."""
+    bot = telegram.bot()
+    statuses = {subscription: StatusIndex() for subscription in subscriptions}
+    timestamps = {}
+    started = time.perf_counter()
+    for _ in range(cycles):
+        for subscription in subscriptions:
+            with result.timed():
+                try:
+                    api_answer = homework.request_api_answer(
+                        practicum.url,
+                        timestamps.get(subscription, 0),
+                        homework.make_headers(subscription.token)
+                    )
+                    homework.check_response(api_answer)
+                    notifications = homework.check_response_changes(
+                        api_answer,
+                        statuses[subscription]
+                    )
+                    for notification in notifications:
+                        homework.send_message_to(
+                            bot,
+                            subscription.chat_id,
+                            notification.message
+                        )
+                    homework.commit_changes(
+                        notifications,
+                        statuses[subscription]
+                    )
+                    timestamps[subscription] = api_answer['current_date']
+                except Exception:
+                    result.extra['errors'] = result.extra.get('errors', 0) + 1
+            result.operations += 1
+    result.elapsed = time.perf_counter() - started
+    return statuses, timestamps
+
+
+@scenario('engine')
+def bench_engine(practicum, telegram, subscriptions, cycles, result,
+                 cache=None):
+    """Asyncio engine with direct sends, a poll per token."""
+    from engine import PollingEngine
+
+    engine = PollingEngine(subscriptions, telegram.bot(64), practicum.url,
+                           cache=cache)
+    poll = engine.poll
+
+    async def timed_poll(token):
+        started = time.perf_counter()
+        try:
+            return await poll(token)
+        finally:
+            result.latencies.append(time.perf_counter() - started)
+
+    engine.poll = timed_poll
+    started = time.perf_counter()
+    for _ in range(cycles):
+        result.operations += len(asyncio.run(engine.poll_all()))
+    result.elapsed = time.perf_counter() - started
+    engine.executor.shutdown()
+    return engine
+
+
+@scenario('engine_cached')
+def bench_engine_cached(practicum, telegram, subscriptions, cycles, result):
+    """Engine with the per-token response cache."""
+    from response_cache import ResponseCache
+
+    return bench_engine(practicum, telegram, subscriptions, cycles, result,
+                        ResponseCache())
+
+
+def run(names, subscribers, cycles, latency, error_rate, homeworks,
+        memory=False, chats_per_token=1, stable=False, etag=False):
+    """Running scenarios against fresh stand-ins, returns the results."""
+    results = []
+    for name in names:
+        with PracticumStandIn(homeworks=homeworks, latency=latency,
+                              error_rate=error_rate, seed=1, stable=stable,
+                              etag=etag) as practicum, \
+                TelegramStandIn(latency=latency, keep_messages=False,
+                                seed=2) as telegram:
+            homework.use_session(PooledSession())
+            result = Result(name, subscribers=subscribers,
+                            homeworks=homeworks)
+            subscriptions = make_subscriptions(subscribers, chats_per_token)
+            with measure_memory(result, memory, per=subscribers):
+                state = SCENARIOS[name](
+                    practicum, telegram, subscriptions, cycles, result
+                )
+            del state
+            result.extra['api_requests'] = practicum.requests
+            result.extra['telegram_requests'] = telegram.requests
+            homework.use_session(None)
+            results.append(result)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('scenarios', nargs='*', default=list(SCENARIOS))
+    parser.add_argument('--subscribers', type=int, default=100)
+    parser.add_argument('--cycles', type=int, default=3)
+    parser.add_argument('--latency', type=float, default=0.0)
+    parser.add_argument('--error-rate', type=float, default=0.0)
+    parser.add_argument('--homeworks', type=int, default=3)
+    parser.add_argument('--chats-per-token', type=int, default=1)
+    parser.add_argument('--memory', action='store_true',
+                        help='measure memory per subscriber (slower)')
+    parser.add_argument('--stable', action='store_true',
+                        help='homeworks never change, like idle accounts')
+    parser.add_argument('--etag', action='store_true',
+                        help='stand-in answers with ETag and 304')
+    parser.add_argument('--json', action='store_true')
+    args = parser.parse_args()
+    report(run(args.scenarios, args.subscribers, args.cycles, args.latency,
+               args.error_rate, args.homeworks, args.memory,
+               args.chats_per_token, args.stable, args.etag), args.json)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,98 @@
+"""Homework records and memoized messages against the raw dict path.
+
+    python -m benchmarks.bench_records --subscribers 2000 --homeworks 20
+"""
+import argparse
+import json
+import random
+import time
+
+import homework
+from benchmarks.harness import Result, measure_memory, report
+from records import record_hook
+
+STATUSES = ('reviewing', 'rejected', 'approved')
+PROJECTS = 20
+
+
+def make_answer(generator, homeworks):
+    return json.dumps({
+        'homeworks': [{
+            'id': number,
+            'status': generator.choice(STATUSES),
+            'homework_name': f'student__project{number % PROJECTS}.zip',
+            'reviewer_comment': 'Всё нравится. ' * generator.randint(1, 5),
+            'date_updated': '2020-02-13T14:40:57Z',
+            'lesson_name': f'Проект {number % PROJECTS}',
+        } for number in range(homeworks)],
+        'current_date': 1581604970
+    }).encode()
+
+
+def bench_decode(name, bodies, object_hook):
+    """Decoding every answer and keeping its homeworks."""
+    result = Result(f'decode_{name}', answers=len(bodies))
+    kept = []
+    with measure_memory(result, per=len(bodies)):
+        started = time.perf_counter()
+        for body in bodies:
+            with result.timed():
+                kept.append(json.loads(body, object_hook=object_hook)[
+                    'homeworks'
+                ])
+        result.elapsed = time.perf_counter() - started
+    result.operations = len(bodies)
+    return result
+
+
+def render_format(item):
+    status = item['status']
+    if status not in homework.VERDICTS:
+        raise ValueError(status)
+    return homework.PROJECT_CHECKED.format(
+        verdict=homework.VERDICTS[status],
+        name=item['homework_name']
+    )
+
+
+def bench_render(name, answers, render):
+    """Rendering a message for every homework of every answer."""
+    result = Result(f'render_{name}', answers=len(answers))
+    homework.render_status.cache_clear()
+    messages = []
+    with measure_memory(result, per=len(answers)):
+        started = time.perf_counter()
+        for homeworks in answers:
+            with result.timed():
+                messages.append([render(item) for item in homeworks])
+        result.elapsed = time.perf_counter() - started
+    result.operations = sum(len(homeworks) for homeworks in answers)
+    return result
+
+
+def run(subscribers, homeworks, seed=1):
+    generator = random.Random(seed)
+    bodies = [make_answer(generator, homeworks) for _ in range(subscribers)]
+    dicts = [json.loads(body)['homeworks'] for body in bodies]
+    records = [json.loads(body, object_hook=record_hook)['homeworks']
+               for body in bodies]
+    return [
+        bench_decode('dict', bodies, None),
+        bench_decode('record', bodies, record_hook),
+        bench_render('format', dicts, render_format),
+        bench_render('memoized', dicts, homework.parse_status),
+        bench_render('memoized_record', records, homework.parse_status),
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--subscribers', type=int, default=2000)
+    parser.add_argument('--homeworks', type=int, default=20)
+    parser.add_argument('--json', action='store_true')
+    args = parser.parse_args()
+    report(run(args.subscribers, args.homeworks), args.json)
+
+
+if __name__ == '__main__':
+    main()
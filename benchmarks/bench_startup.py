@@ -0,0 +1,94 @@
+"""Cold start: `-X importtime` of the entry points and time to first poll.
+
+    python -m benchmarks.bench_startup --repeat 10
+"""
+import argparse
+import os
+import subprocess
+import sys
+
+from benchmarks.harness import Result, report
+from benchmarks.standins import PracticumStandIn
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+HEAVY_MODULES = ('telegram', 'requests', 'urllib3', 'http.server')
+FIRST_POLL = '''
+import sys
+import homework
+homework.require_tokens()
+from http_session import PooledSession
+homework.use_session(PooledSession())
+homework.get_api_answer(sys.argv[1], 0)
+print(','.join(name for name in {heavy!r} if name in sys.modules), flush=True)
+'''
+
+
+def child_env():
+    return dict(
+        os.environ,
+        PRAKTIKUM_TOKEN='startup',
+        TELEGRAM_TOKEN='123456:startup',
+        TELEGRAM_CHAT_ID='1',
+    )
+
+
+def import_time(module):
+    """Cumulative import time of a module in a fresh interpreter, seconds."""
+    completed = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+        cwd=ROOT, env=child_env(), capture_output=True, text=True,
+        check=True
+    )
+    for line in reversed(completed.stderr.splitlines()):
+        fields = [field.strip() for field in line.split('|')]
+        if len(fields) == 3 and fields[2] == module:
+            return int(fields[1]) / 1e6
+    raise RuntimeError(completed.stderr[-500:])
+
+
+def bench_import(module, repeat):
+    result = Result(f'import {module}')
+    for _ in range(repeat):
+        result.latencies.append(import_time(module))
+        result.operations += 1
+    result.elapsed = sum(result.latencies)
+    return result
+
+
+def bench_first_poll(repeat):
+    """Process start to the first answer of the Practicum stand-in."""
+    result = Result('first_poll')
+    code = FIRST_POLL.format(heavy=HEAVY_MODULES)
+    with PracticumStandIn(homeworks=3, seed=1) as practicum:
+        for _ in range(repeat):
+            with result.timed():
+                process = subprocess.Popen(
+                    [sys.executable, '-c', code, practicum.url],
+                    cwd=ROOT, env=child_env(), stdout=subprocess.PIPE,
+                    text=True
+                )
+                loaded = process.stdout.readline().strip()
+            process.wait()
+            result.operations += 1
+    result.elapsed = sum(result.latencies)
+    result.extra['loaded_heavy'] = loaded or '-'
+    return result
+
+
+def run(modules, repeat):
+    results = [bench_import(module, repeat) for module in modules]
+    results.append(bench_first_poll(repeat))
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('modules', nargs='*', default=['homework', 'engine'])
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--json', action='store_true')
+    args = parser.parse_args()
+    report(run(args.modules, args.repeat), args.json)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,79 @@
+"""Peak memory and time of full vs streaming decode of a large answer.
+
+    python -m benchmarks.bench_streaming --homeworks 20000
+"""
+import argparse
+import json
+import time
+
+import homework
+from benchmarks.harness import Result, measure_memory, report
+from status_index import StatusIndex
+from streaming import AnswerStream, iter_bytes
+
+
+def make_body(homeworks, comment_size):
+    return json.dumps({
+        'homeworks': [
+            {
+                'id': number,
+                'status': 'approved',
+                'homework_name': f'user__project{number}.zip',
+                'reviewer_comment': 'x' * comment_size,
+                'date_updated': '2020-02-13T14:40:57Z',
+                'lesson_name': f'Проект {number}'
+            }
+            for number in range(homeworks)
+        ],
+        'current_date': 1581604970
+    }, ensure_ascii=False).encode()
+
+
+def warm_index(body):
+    """Index that has already seen every homework, like a steady poll."""
+    index = StatusIndex()
+    index.diff(json.loads(body)['homeworks'])
+    return index
+
+
+def decode_full(body, index):
+    return homework.check_response_changes(json.loads(body), index)
+
+
+def decode_streaming(body, index):
+    return homework.check_stream_changes(
+        AnswerStream(iter_bytes(body)), index
+    )
+
+
+def run(homeworks, comment_size, repeat):
+    body = make_body(homeworks, comment_size)
+    results = []
+    for name, decode in (('json', decode_full),
+                         ('streaming', decode_streaming)):
+        result = Result(name, homeworks=homeworks, body_bytes=len(body))
+        index = warm_index(body)
+        with measure_memory(result):
+            decode(body, index)
+        started = time.perf_counter()
+        for _ in range(repeat):
+            with result.timed():
+                decode(body, index)
+        result.elapsed = time.perf_counter() - started
+        result.operations = repeat
+        results.append(result)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--homeworks', type=int, default=10000)
+    parser.add_argument('--comment-size', type=int, default=200)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--json', action='store_true')
+    args = parser.parse_args()
+    report(run(args.homeworks, args.comment_size, args.repeat), args.json)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,96 @@
+"""Scheduling overhead of the timer wheel compared with a binary heap.
+
+    python -m benchmarks.bench_timer_wheel --jobs 100000 --ticks 1000000
+"""
+import argparse
+import heapq
+import random
+import time
+
+from benchmarks.harness import Result, report
+from timer_wheel import TimerWheel
+
+STEP = 1000
+
+
+def bench_wheel(jobs, ticks, max_delay, seed):
+    generator = random.Random(seed)
+    wheel = TimerWheel(clock=lambda: 0.0)
+    result = Result('wheel', jobs=jobs, ticks=ticks)
+    started = time.perf_counter()
+    for job in range(jobs):
+        wheel.schedule_spread(job, max_delay)
+    fired = 0
+    for _ in range(ticks // STEP):
+        with result.timed():
+            for _ in range(STEP):
+                due = wheel.advance_ticks(1)
+                for job in due:
+                    wheel.schedule(job, generator.randint(1, max_delay))
+                fired += len(due)
+    result.elapsed = time.perf_counter() - started
+    result.operations = fired
+    result.extra['s_per_million_ticks'] = round(
+        result.elapsed / ticks * 1_000_000, 3
+    )
+    return result
+
+
+def bench_heap(jobs, ticks, max_delay, seed):
+    generator = random.Random(seed)
+    heap = []
+    result = Result('heap', jobs=jobs, ticks=ticks)
+    started = time.perf_counter()
+    for job in range(jobs):
+        heapq.heappush(heap, (generator.randint(1, max_delay), job))
+    fired = 0
+    for block in range(0, ticks, STEP):
+        with result.timed():
+            for tick in range(block + 1, block + STEP + 1):
+                while heap and heap[0][0] <= tick:
+                    _, job = heapq.heappop(heap)
+                    heapq.heappush(
+                        heap, (tick + generator.randint(1, max_delay), job)
+                    )
+                    fired += 1
+    result.elapsed = time.perf_counter() - started
+    result.operations = fired
+    result.extra['s_per_million_ticks'] = round(
+        result.elapsed / ticks * 1_000_000, 3
+    )
+    return result
+
+
+def bench_cancel(jobs, seed):
+    generator = random.Random(seed)
+    wheel = TimerWheel(clock=lambda: 0.0)
+    result = Result('wheel_reschedule', jobs=jobs)
+    for job in range(jobs):
+        wheel.schedule(job, generator.randint(1, 100000))
+    started = time.perf_counter()
+    for job in range(jobs):
+        wheel.schedule(job, generator.randint(1, 100000))
+    for job in range(jobs):
+        wheel.cancel(job)
+    result.elapsed = time.perf_counter() - started
+    result.operations = 2 * jobs
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--jobs', type=int, default=100000)
+    parser.add_argument('--ticks', type=int, default=1000000)
+    parser.add_argument('--max-delay', type=int, default=600)
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--json', action='store_true')
+    args = parser.parse_args()
+    report([
+        bench_wheel(args.jobs, args.ticks, args.max_delay, args.seed),
+        bench_heap(args.jobs, args.ticks, args.max_delay, args.seed),
+        bench_cancel(args.jobs, args.seed),
+    ], args.json)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,93 @@
+import json
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+
+def percentile(samples, share):
+    """Nearest-rank percentile of a list of numbers."""
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    index = max(0, min(len(ordered) - 1, round(share * len(ordered)) - 1))
+    return ordered[index]
+
+
+class Result:
+    """Measurements of one benchmark scenario."""
+
+    def __init__(self, name, **params):
+        self.name = name
+        self.params = params
+        self.latencies = []
+        self.operations = 0
+        self.elapsed = 0.0
+        self.memory = None
+        self.extra = {}
+
+    @contextmanager
+    def timed(self):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.latencies.append(time.perf_counter() - started)
+
+    def summary(self):
+        summary = dict(
+            name=self.name,
+            operations=self.operations,
+            elapsed=round(self.elapsed, 4),
+            per_second=round(self.operations / self.elapsed, 1)
+            if self.elapsed else 0.0,
+            p50_ms=round(percentile(self.latencies, 0.5) * 1000, 3),
+            p99_ms=round(percentile(self.latencies, 0.99) * 1000, 3),
+        )
+        if self.memory is not None:
+            summary['memory_bytes'] = self.memory
+        summary.update(self.params)
+        summary.update(self.extra)
+        return summary
+
+
+@contextmanager
+def measure_memory(result, enabled=True, per=1):
+    """Recording memory kept after the block, divided by `per`."""
+    if not enabled:
+        yield
+        return
+    tracemalloc.start()
+    baseline = tracemalloc.get_traced_memory()[0]
+    try:
+        yield
+    finally:
+        current, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        result.memory = (current - baseline) // max(per, 1)
+        result.extra['peak_bytes'] = peak - baseline
+
+
+def print_rows(rows, as_json=False):
+    """Printing dicts as a table or as JSON lines."""
+    if as_json:
+        for row in rows:
+            print(json.dumps(row, ensure_ascii=False))
+        return rows
+    columns = []
+    for row in rows:
+        columns.extend(key for key in row if key not in columns)
+    widths = {
+        column: max(len(column), *(len(str(row.get(column, '')))
+                                   for row in rows))
+        for column in columns
+    }
+    print('  '.join(column.ljust(widths[column]) for column in columns))
+    for row in rows:
+        print('  '.join(str(row.get(column, '')).ljust(widths[column])
+                        for column in columns))
+    return rows
+
+
+def report(results, as_json=False):
+    """Printing summaries as a table or as JSON lines."""
+    return print_rows([result.summary() for result in results], as_json)
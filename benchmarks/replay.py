@@ -0,0 +1,309 @@
+"""Replaying captured API answers through the engine on a virtual clock.
+
+    python -m benchmarks.replay synthesize capture.bin --subscribers 2000 \\
+        --days 7
+    python -m benchmarks.replay run capture.bin --speed 1000
+
+Captures are written in production with `RECORD_FILE=capture.bin`.
+"""
+import argparse
+import asyncio
+import heapq
+import json
+import logging
+import random
+import threading
+import time
+import tracemalloc
+from functools import partial
+
+import homework
+from benchmarks.harness import Result, percentile, print_rows, report
+from recording import Record, Recorder, read_records
+from scheduling import PollingPolicy
+from subscriptions import Subscription
+from timer_wheel import TimerWheel
+
+SAMPLE_INTERVAL = 3600
+STATUSES = ('reviewing', 'rejected', 'approved')
+
+
+class VirtualClock:
+    """Time running `speed` times faster than the wall clock."""
+
+    def __init__(self, start, speed, real=time.monotonic):
+        self.start = start
+        self.speed = speed
+        self.real = real
+        self.real_start = real()
+
+    def __call__(self):
+        return self.start + (self.real() - self.real_start) * self.speed
+
+    def time(self):
+        return self()
+
+    def sleep(self, seconds):
+        time.sleep(seconds / self.speed)
+
+    async def async_sleep(self, seconds):
+        await asyncio.sleep(seconds / self.speed)
+
+
+class ReplayResponse:
+
+    def __init__(self, status_code, content):
+        self.status_code = status_code
+        self.content = content
+        self.headers = {}
+
+    def json(self):
+        return json.loads(self.content)
+
+    def iter_content(self, chunk_size):
+        from streaming import iter_bytes
+
+        return iter_bytes(self.content, chunk_size)
+
+    def close(self):
+        pass
+
+
+class ReplaySession:
+    """Answering like the API did at the current virtual time.
+
+    Records are read in order as the clock advances. Homeworks from all
+    records since the previous poll of a token are merged, so a slower or
+    faster poll cadence than in production still sees every change.
+    """
+
+    def __init__(self, records, clock):
+        self.records = iter(records)
+        self.clock = clock
+        self.next = next(self.records, None)
+        self.pending = {}
+        self.changed = {}
+        self.served = {}
+        self.latest = {}
+        self.requests = 0
+        self._lock = threading.Lock()
+
+    def advance(self, now):
+        while self.next is not None and self.next.at <= now:
+            record = self.next
+            self.latest[record.key] = record
+            if record.status_code == 200:
+                homeworks = json.loads(record.body).get('homeworks', ())
+                if homeworks:
+                    self.changed.setdefault(record.key, record.at)
+                pending = self.pending.setdefault(record.key, {})
+                for homework_record in homeworks:
+                    pending[homework_record.get('id')] = homework_record
+            self.next = next(self.records, None)
+
+    def get(self, url, headers, params, **kwargs):
+        key = headers['Authorization'].split(' ')[-1]
+        with self._lock:
+            self.advance(self.clock())
+            self.requests += 1
+            record = self.latest.get(key)
+            if record is None:
+                return ReplayResponse(
+                    200, b'{"homeworks": [], "current_date": 0}'
+                )
+            if record.status_code != 200:
+                return ReplayResponse(record.status_code, record.body)
+            pending = self.pending.pop(key, {})
+            self.served[key] = self.changed.pop(key, None)
+            body = json.dumps({
+                'homeworks': list(pending.values()),
+                'current_date': json.loads(record.body).get(
+                    'current_date', int(record.at)
+                )
+            }).encode()
+            return ReplayResponse(200, body)
+
+    def change_time(self, key):
+        """Time of the change in the last answer served for a token."""
+        with self._lock:
+            return self.served.pop(key, None)
+
+
+class ReplayBot:
+    """Bot measuring virtual time from a change to its notification."""
+
+    def __init__(self, session, clock):
+        self.session = session
+        self.clock = clock
+        self.sent = 0
+        self.latencies = []
+        self._lock = threading.Lock()
+
+    def send_message(self, chat_id, text):
+        changed = self.session.change_time(chat_id)
+        with self._lock:
+            self.sent += 1
+            if changed is not None:
+                self.latencies.append(max(0.0, self.clock() - changed))
+
+
+def synthesize(path, subscribers, days, interval=homework.RETRY_TIME,
+               changes_per_day=1.0, error_rate=0.001, seed=1):
+    """Writing a capture of `days` of polls in chronological order."""
+    generator = random.Random(seed)
+    recorder = Recorder(path)
+    start = 1600000000.0
+    end = start + days * 86400
+    change = changes_per_day * interval / 86400
+    statuses = {}
+    queue = [(start + generator.uniform(0, interval), number)
+             for number in range(subscribers)]
+    heapq.heapify(queue)
+    while queue:
+        at, number = heapq.heappop(queue)
+        if at > end:
+            continue
+        key = f'subscriber{number}'
+        if generator.random() < error_rate:
+            status_code, body = 500, b'{}'
+        else:
+            homeworks = []
+            if number not in statuses or generator.random() < change:
+                status = generator.choice([
+                    status for status in STATUSES
+                    if status != statuses.get(number)
+                ])
+                statuses[number] = status
+                homeworks.append({
+                    'id': number,
+                    'status': status,
+                    'homework_name': f'{key}__project.zip',
+                    'date_updated': int(at)
+                })
+            status_code, body = 200, json.dumps({
+                'homeworks': homeworks,
+                'current_date': int(at)
+            }).encode()
+        recorder.write(Record(at, 0.05, 0, status_code, key, body))
+        heapq.heappush(
+            queue, (at + interval * generator.uniform(0.9, 1.1), number)
+        )
+    recorder.close()
+    return recorder.count
+
+
+def capture_keys(path):
+    keys = {}
+    first = last = None
+    for record in read_records(path):
+        keys[record.key] = None
+        first = record.at if first is None else first
+        last = record.at
+    return list(keys), first, last
+
+
+def replay(path, speed, sample_interval=SAMPLE_INTERVAL, memory=False,
+           cache=False):
+    """Replaying a capture, returns the summary and per-interval samples."""
+    from engine import PollingEngine
+    from response_cache import ResponseCache
+
+    keys, first, last = capture_keys(path)
+    clock = VirtualClock(first, speed)
+    session = ReplaySession(read_records(path), clock)
+    bot = ReplayBot(session, clock)
+    homework.use_session(session)
+    engine = PollingEngine(
+        [Subscription(key, key) for key in keys],
+        bot,
+        'replay',
+        policy_factory=partial(
+            PollingPolicy, homework.RETRY_TIME, homework.ERROR_RETRY_TIME,
+            clock=clock
+        ),
+        wheel=TimerWheel(clock=clock),
+        sleep=clock.async_sleep,
+        cache=ResponseCache() if cache else None
+    )
+    result = Result('replay', subscribers=len(keys), speed=speed)
+    samples = []
+
+    async def sample():
+        requests = sent = latencies = 0
+        while clock() < last:
+            await clock.async_sleep(sample_interval)
+            window = bot.latencies[latencies:]
+            row = dict(
+                hour=round((clock() - first) / 3600, 1),
+                polls=session.requests - requests,
+                notifications=bot.sent - sent,
+                latency_p50_s=round(percentile(window, 0.5), 1),
+                latency_p99_s=round(percentile(window, 0.99), 1),
+            )
+            if memory:
+                row['memory_kb'] = tracemalloc.get_traced_memory()[0] // 1024
+            samples.append(row)
+            requests, sent = session.requests, bot.sent
+            latencies = len(bot.latencies)
+
+    async def run():
+        dispatch = asyncio.ensure_future(engine.dispatch(spread=300))
+        try:
+            await sample()
+        finally:
+            dispatch.cancel()
+
+    if memory:
+        tracemalloc.start()
+    logging.disable(logging.ERROR)
+    started = time.perf_counter()
+    try:
+        asyncio.run(run())
+    finally:
+        if memory:
+            tracemalloc.stop()
+        logging.disable(logging.NOTSET)
+        engine.executor.shutdown()
+        homework.use_session(None)
+    result.elapsed = time.perf_counter() - started
+    result.operations = session.requests
+    result.extra.update(
+        notifications=bot.sent,
+        virtual_hours=round((last - first) / 3600, 1),
+        notification_p50_s=round(percentile(bot.latencies, 0.5), 1),
+        notification_p99_s=round(percentile(bot.latencies, 0.99), 1),
+    )
+    return result, samples
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    commands = parser.add_subparsers(dest='command', required=True)
+    synthetic = commands.add_parser('synthesize')
+    synthetic.add_argument('path')
+    synthetic.add_argument('--subscribers', type=int, default=200)
+    synthetic.add_argument('--days', type=float, default=1)
+    synthetic.add_argument('--changes-per-day', type=float, default=1.0)
+    synthetic.add_argument('--error-rate', type=float, default=0.001)
+    runner = commands.add_parser('run')
+    runner.add_argument('path')
+    runner.add_argument('--speed', type=float, default=1000)
+    runner.add_argument('--sample-interval', type=float,
+                        default=SAMPLE_INTERVAL)
+    runner.add_argument('--memory', action='store_true')
+    runner.add_argument('--cache', action='store_true')
+    runner.add_argument('--json', action='store_true')
+    args = parser.parse_args()
+    if args.command == 'synthesize':
+        print(synthesize(args.path, args.subscribers, args.days,
+                         changes_per_day=args.changes_per_day,
+                         error_rate=args.error_rate))
+        return
+    result, samples = replay(args.path, args.speed, args.sample_interval,
+                             args.memory, args.cache)
+    print_rows(samples, args.json)
+    report([result], args.json)
+
+
+if __name__ == '__main__':
+    main()
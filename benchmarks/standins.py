@@ -0,0 +1,253 @@
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+STATUSES = ('reviewing', 'approved', 'rejected')
+STATUSES_PATH = '/api/user_api/homework_statuses/'
+TELEGRAM_TOKEN = '123456:stand-in'
+
+
+class StandInHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    disable_nagle_algorithm = True
+
+    def respond(self, status_code, data, headers=None):
+        body = json.dumps(data).encode()
+        self.send_response(status_code)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def read_body(self):
+        length = int(self.headers.get('Content-Length', 0))
+        return self.rfile.read(length) if length else b''
+
+    def log_message(self, *args):
+        pass
+
+
+class BacklogHTTPServer(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 1024
+
+
+class StandInServer:
+    """Threaded local server with configurable latency and error rate."""
+
+    handler = StandInHandler
+
+    def __init__(self, latency=0.0, error_rate=0.0, seed=None):
+        self.latency = latency
+        self.error_rate = error_rate
+        self.random = random.Random(seed)
+        self.requests = 0
+        self.errors = 0
+        self._lock = threading.Lock()
+        handler = type('Handler', (self.handler,), {'standin': self})
+        self.server = BacklogHTTPServer(('127.0.0.1', 0), handler)
+        self.thread = None
+
+    @property
+    def base_url(self):
+        return f'http://127.0.0.1:{self.server.server_port}'
+
+    def start(self):
+        self.thread = threading.Thread(
+            target=self.server.serve_forever,
+            daemon=True
+        )
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def begin_request(self):
+        """Applying latency, returns True when an error must be simulated."""
+        if self.latency:
+            time.sleep(self.latency)
+        with self._lock:
+            self.requests += 1
+            failed = self.random.random() < self.error_rate
+            self.errors += failed
+        return failed
+
+
+class PracticumHandler(StandInHandler):
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        if not url.path.startswith(STATUSES_PATH):
+            return self.respond(404, {'code': 'not_found'})
+        if not self.headers.get('Authorization', '').startswith('OAuth '):
+            return self.respond(401, {
+                'code': 'not_authenticated',
+                'message': 'Учетные данные не были предоставлены.'
+            })
+        if self.standin.begin_request():
+            return self.respond(500, {}, {'Retry-After': '1'})
+        from_date = int(float(
+            parse_qs(url.query).get('from_date', ['0'])[0]
+        ))
+        payload = self.standin.payload(from_date)
+        if not self.standin.etag:
+            return self.respond(200, payload)
+        etag = '"{:x}"'.format(
+            hash(json.dumps(payload['homeworks'], sort_keys=True))
+        )
+        if self.headers.get('If-None-Match') == etag:
+            self.send_response(304)
+            self.send_header('ETag', etag)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+        self.respond(200, payload, {'ETag': etag})
+
+
+class PracticumStandIn(StandInServer):
+    """`homework_statuses` stand-in returning `homeworks` of a given size.
+
+    With `stable` the homeworks never change, like an idle account; with
+    `etag` answers carry an `ETag` and `If-None-Match` gets `304`.
+    """
+
+    handler = PracticumHandler
+
+    def __init__(self, homeworks=1, comment_size=100, stable=False,
+                 etag=False, **kwargs):
+        super().__init__(**kwargs)
+        self.homeworks = homeworks
+        self.comment = 'x' * comment_size
+        self.stable = stable
+        self.etag = etag
+        self.started = int(time.time())
+
+    @property
+    def url(self):
+        return self.base_url + STATUSES_PATH
+
+    def payload(self, from_date):
+        now = int(time.time())
+        updated = self.started if self.stable else now
+        return {
+            'homeworks': [
+                {
+                    'id': number,
+                    'status': STATUSES[number % len(STATUSES)]
+                    if self.stable else self.random.choice(STATUSES),
+                    'homework_name': f'user__project{number}.zip',
+                    'reviewer_comment': self.comment,
+                    'date_updated': time.strftime(
+                        '%Y-%m-%dT%H:%M:%SZ', time.gmtime(updated)
+                    ),
+                    'lesson_name': f'Проект {number}'
+                }
+                for number in range(self.homeworks)
+            ],
+            'current_date': now
+        }
+
+
+class TelegramHandler(StandInHandler):
+
+    def do_POST(self):
+        body = self.read_body()
+        if not self.path.endswith('/sendMessage'):
+            return self.respond(404, {'ok': False, 'error_code': 404,
+                                      'description': 'Not Found'})
+        if self.standin.begin_request():
+            return self.respond(429, {
+                'ok': False,
+                'error_code': 429,
+                'description': 'Too Many Requests: retry after 1',
+                'parameters': {'retry_after': 1}
+            })
+        try:
+            data = json.loads(body or b'{}')
+        except ValueError:
+            data = {key: values[0]
+                    for key, values in parse_qs(body.decode()).items()}
+        self.standin.record(data)
+        self.respond(200, {'ok': True, 'result': {
+            'message_id': self.standin.requests,
+            'date': int(time.time()),
+            'chat': {'id': int(data.get('chat_id', 0)), 'type': 'private'},
+            'text': data.get('text', '')
+        }})
+
+
+class TelegramStandIn(StandInServer):
+    """Bot API stand-in for `sendMessage`, keeps the received messages."""
+
+    handler = TelegramHandler
+
+    def __init__(self, keep_messages=True, **kwargs):
+        super().__init__(**kwargs)
+        self.keep_messages = keep_messages
+        self.messages = []
+
+    @property
+    def bot_url(self):
+        return self.base_url + '/bot'
+
+    def record(self, data):
+        if self.keep_messages:
+            with self._lock:
+                self.messages.append((str(data.get('chat_id')),
+                                      data.get('text')))
+
+    def bot(self, con_pool_size=8):
+        """Building a real `telegram.Bot` talking to the stand-in."""
+        from telegram import Bot
+        from telegram.utils.request import Request
+
+        return Bot(
+            token=TELEGRAM_TOKEN,
+            base_url=self.bot_url,
+            request=Request(con_pool_size=con_pool_size)
+        )
+
+
+class RelayStandIn:
+    """Upstream relay pushing status changes to the webhook endpoint."""
+
+    def __init__(self, url, secret=None):
+        self.url = url.rstrip('/')
+        self.secret = secret
+        self.pushed = 0
+
+    def push(self, token, homeworks, current_date=None):
+        """Pushing one event for a token, returns the HTTP status."""
+        from urllib.error import HTTPError
+        from urllib.request import Request, urlopen
+
+        from checkpoints import token_key
+
+        body = json.dumps({
+            'homeworks': homeworks,
+            'current_date': current_date or int(time.time())
+        }).encode()
+        headers = {'Content-Type': 'application/json'}
+        if self.secret:
+            headers['X-Webhook-Secret'] = self.secret
+        request = Request(f'{self.url}/events/{token_key(token)}', body,
+                          headers, method='POST')
+        self.pushed += 1
+        try:
+            with urlopen(request, timeout=5) as response:
+                return response.status
+        except HTTPError as error:
+            return error.code
@@ -0,0 +1,66 @@
+import hashlib
+import os
+import sqlite3
+import threading
+
+CHECKPOINTS_FILE = os.getenv('CHECKPOINTS_FILE', 'checkpoints.sqlite3')
+CHECKPOINT_FLUSH_INTERVAL = float(os.getenv('CHECKPOINT_FLUSH_INTERVAL', 5))
+
+
+def token_key(token):
+    """Building a storage key that does not reveal the token."""
+    return hashlib.sha256(token.encode()).hexdigest()[:32]
+
+
+class CheckpointStore:
+    """Last `current_date` per token, written in batches to SQLite."""
+
+    def __init__(self, path=CHECKPOINTS_FILE):
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        self.connection.execute('PRAGMA journal_mode=WAL')
+        with self.connection:
+            self.connection.execute(
+                'CREATE TABLE IF NOT EXISTS checkpoints ('
+                'key TEXT PRIMARY KEY, from_date INTEGER NOT NULL)'
+            )
+        self.pending = {}
+        self._lock = threading.Lock()
+
+    def load(self):
+        """Reading all stored checkpoints."""
+        return dict(
+            self.connection.execute('SELECT key, from_date FROM checkpoints')
+        )
+
+    def get(self, key, default=0):
+        with self._lock:
+            if key in self.pending:
+                return self.pending[key]
+        row = self.connection.execute(
+            'SELECT from_date FROM checkpoints WHERE key = ?', (key,)
+        ).fetchone()
+        return default if row is None else row[0]
+
+    def set(self, key, current_date):
+        """Buffering a checkpoint until the next `flush`."""
+        with self._lock:
+            self.pending[key] = current_date
+
+    def flush(self):
+        """Writing all buffered checkpoints in one transaction."""
+        with self._lock:
+            pending, self.pending = self.pending, {}
+        if not pending:
+            return 0
+        with self.connection:
+            self.connection.executemany(
+                'INSERT INTO checkpoints (key, from_date) VALUES (?, ?) '
+                'ON CONFLICT(key) DO UPDATE SET '
+                'from_date = excluded.from_date',
+                pending.items()
+            )
+        return len(pending)
+
+    def close(self):
+        self.flush()
+        self.connection.close()
@@ -0,0 +1,133 @@
+import logging
+import os
+import threading
+import time
+
+from log_pipeline import LazyMessage
+from metrics import CIRCUIT_REJECTED, CIRCUIT_TRANSITIONS
+
+CIRCUIT_FAILURE_THRESHOLD = int(os.getenv('CIRCUIT_FAILURE_THRESHOLD', 5))
+CIRCUIT_RESET_TIMEOUT = float(os.getenv('CIRCUIT_RESET_TIMEOUT', 30))
+CIRCUIT_HALF_OPEN_PROBES = int(os.getenv('CIRCUIT_HALF_OPEN_PROBES', 1))
+CIRCUIT_OPEN_MESSAGE = (
+    'Запросы к \"{name}\" временно не выполняются после {failures} '
+    'ошибок подряд, повтор через {retry_after:.0f} с.'
+)
+CIRCUIT_STATE_MESSAGE = 'Состояние цепи \"{name}\": {state}'
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+
+class CircuitOpenError(ConnectionError):
+    """Call rejected without touching the network."""
+
+    def __init__(self, message, name, retry_after):
+        super().__init__(message)
+        CIRCUIT_REJECTED.inc(name)
+        self.name = name
+        self.retry_after = retry_after
+
+
+def counts_all(error):
+    return True
+
+
+class CircuitBreaker:
+    """Closed, open and half-open states of calls to one endpoint.
+
+    After `failure_threshold` failures in a row calls are rejected for
+    `reset_timeout` seconds, then at most `half_open_probes` calls at a time
+    are let through; a successful probe closes the circuit, a failed one
+    opens it again.
+    """
+
+    def __init__(self, name, failure_threshold=CIRCUIT_FAILURE_THRESHOLD,
+                 reset_timeout=CIRCUIT_RESET_TIMEOUT,
+                 half_open_probes=CIRCUIT_HALF_OPEN_PROBES,
+                 is_failure=counts_all, clock=time.monotonic):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.half_open_probes = half_open_probes
+        self.is_failure = is_failure
+        self.clock = clock
+        self.state = CLOSED
+        self.failures = 0
+        self.opened = None
+        self.probes = 0
+        self._lock = threading.Lock()
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, error_type, error, traceback):
+        if error is not None and self.is_failure(error):
+            self.record_failure()
+        else:
+            self.record_success()
+
+    def _set_state(self, state):
+        if state != self.state:
+            CIRCUIT_TRANSITIONS.inc(self.name, state)
+            logging.info(LazyMessage(
+                CIRCUIT_STATE_MESSAGE, name=self.name, state=state
+            ))
+        self.state = state
+
+    def acquire(self):
+        """Letting a call through or raising `CircuitOpenError`."""
+        with self._lock:
+            if self.state == OPEN:
+                retry_after = self.opened + self.reset_timeout - self.clock()
+                if retry_after > 0:
+                    raise CircuitOpenError(
+                        CIRCUIT_OPEN_MESSAGE.format(
+                            name=self.name,
+                            failures=self.failures,
+                            retry_after=retry_after
+                        ),
+                        self.name,
+                        retry_after
+                    )
+                self._set_state(HALF_OPEN)
+                self.probes = 0
+            if self.state == HALF_OPEN:
+                if self.probes >= self.half_open_probes:
+                    raise CircuitOpenError(
+                        CIRCUIT_OPEN_MESSAGE.format(
+                            name=self.name,
+                            failures=self.failures,
+                            retry_after=self.reset_timeout
+                        ),
+                        self.name,
+                        self.reset_timeout
+                    )
+                self.probes += 1
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            if self.state == HALF_OPEN:
+                self.probes -= 1
+                self._set_state(CLOSED)
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.state == HALF_OPEN:
+                self.probes -= 1
+            if (self.state == HALF_OPEN
+                    or self.failures >= self.failure_threshold):
+                self.opened = self.clock()
+                self._set_state(OPEN)
+
+
+def log_error(message, error):
+    """Logging an error, without a traceback for rejected calls."""
+    if isinstance(error, CircuitOpenError):
+        logging.warning(message)
+    else:
+        logging.error(message, exc_info=True)
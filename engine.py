@@ -0,0 +1,543 @@
+import asyncio
+import csv
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+
+from homework import (CHAT_ID, ERROR_RETRY_TIME, HOMEWORK_STATUSES_URL,
+                      LOGGING_MESSAGE_ERROR, PRAKTIKUM_TOKEN, RETRY_TIME,
+                      TELEGRAM_TOKEN)
+import homework
+from checkpoints import CHECKPOINT_FLUSH_INTERVAL, CheckpointStore, token_key
+from circuit import log_error
+from history import HISTORY_DIR, HISTORY_FLUSH_INTERVAL, HistoryStore
+from lazy import LazyClient
+from log_pipeline import LazyMessage, configure_logging
+from metrics import METRICS_PORT, start_http_server
+from outbound import SENDER_WORKERS, OutboundQueue
+from outbox import (OUTBOX_FILE, OUTBOX_PRUNE_INTERVAL, OUTBOX_RETRY_INTERVAL,
+                    Outbox)
+from profiling import Profiler
+from recording import recorded
+from response_cache import ResponseCache
+from scheduling import PollingPolicy
+from status_index import StatusIndex
+from subscriptions import Subscription, SubscriptionIndex
+from timer_wheel import TimerWheel
+from webhook import (WEBHOOK_PORT, WEBHOOK_RECONCILE_TIME,
+                     start_webhook_server)
+
+MAX_IN_FLIGHT = int(os.getenv('MAX_IN_FLIGHT', 64))
+SUBSCRIPTIONS_FILE = os.getenv('SUBSCRIPTIONS_FILE')
+STREAMING_ANSWERS = os.getenv('STREAMING_ANSWERS', '') == '1'
+INITIAL_SPREAD = float(os.getenv('INITIAL_SPREAD', 60))
+NO_SUBSCRIPTIONS_MESSAGE = 'Не найдено ни одной подписки для опроса'
+ENGINE_NOT_RUNNING_MESSAGE = 'Движок опроса ещё не запущен'
+LEASE_RECHECK_TIME = 1
+
+
+def load_subscriptions(path=SUBSCRIPTIONS_FILE, token=PRAKTIKUM_TOKEN,
+                       chat_id=CHAT_ID):
+    """Reading (token, chat id) pairs from a CSV file or the environment."""
+    if path is None:
+        if token and chat_id:
+            return [Subscription(token, chat_id)]
+        raise ValueError(NO_SUBSCRIPTIONS_MESSAGE)
+    with open(path, newline='') as file:
+        subscriptions = [
+            Subscription(row[0].strip(), row[1].strip())
+            for row in csv.reader(file)
+            if len(row) >= 2 and not row[0].startswith('#')
+        ]
+    if not subscriptions:
+        raise ValueError(NO_SUBSCRIPTIONS_MESSAGE)
+    return subscriptions
+
+
+async def get_api_answer(url, current_timestamp, token, executor=None):
+    """Getting statuses from the server without blocking the loop."""
+    return await asyncio.get_running_loop().run_in_executor(
+        executor,
+        homework.request_api_answer,
+        url,
+        current_timestamp,
+        homework.make_headers(token)
+    )
+
+
+async def check_response(response):
+    """Checking RESPONSEs."""
+    return homework.check_response(response)
+
+
+async def check_response_changes(response, index):
+    """Returning notifications for homeworks whose status has changed."""
+    return homework.check_response_changes(response, index)
+
+
+def poll_stream_changes(url, current_timestamp, token, index):
+    """Decoding a streamed answer, returns notifications and `current_date`.
+
+    Streamed answers have no validators, so the third item is None.
+    """
+    stream = homework.stream_api_answer(
+        url,
+        current_timestamp,
+        homework.make_headers(token)
+    )
+    notifications = homework.check_stream_changes(stream, index)
+    return (
+        notifications,
+        stream.fields.get('current_date', current_timestamp),
+        None
+    )
+
+
+def poll_cached_changes(url, current_timestamp, token, index, cache):
+    """Skipping decode and checks when the answer has not changed.
+
+    Validators are returned to be cached once the notifications are stored.
+    """
+    api_answer, current_date, validators = homework.request_cached_answer(
+        url,
+        current_timestamp,
+        homework.make_headers(token),
+        cache.get(token)
+    )
+    notifications = [] if api_answer is None else (
+        homework.check_response_changes(api_answer, index)
+    )
+    return notifications, current_date, validators
+
+
+async def send_message(bot, chat_id, message, executor=None):
+    """Sending a message via telegram without blocking the loop."""
+    return await asyncio.get_running_loop().run_in_executor(
+        executor,
+        homework.send_message_to,
+        bot,
+        chat_id,
+        message
+    )
+
+
+class PollingEngine:
+    """Polls all subscriptions concurrently from a single process.
+
+    Every Practicum token is polled once per cycle however many chats follow
+    it, and the notifications are fanned out to all of those chats.
+    """
+
+    def __init__(self, subscriptions, bot, url=HOMEWORK_STATUSES_URL,
+                 max_in_flight=MAX_IN_FLIGHT, retry_time=RETRY_TIME,
+                 error_retry_time=ERROR_RETRY_TIME, checkpoints=None,
+                 policy_factory=None, outbound=None, outbox=None,
+                 streaming=False, wheel=None, cache=None,
+                 sleep=asyncio.sleep, history=None, profiler=None):
+        self.subscriptions = SubscriptionIndex(subscriptions)
+        self.bot = bot
+        self.url = url
+        self.policy_factory = policy_factory or partial(
+            PollingPolicy, retry_time, error_retry_time
+        )
+        self.outbound = outbound
+        self.outbox = outbox
+        self.streaming = streaming
+        self.wheel = wheel
+        self.cache = cache
+        self.sleep = sleep
+        self.history = history
+        self.profiler = profiler
+        self.timestamps = {}
+        self.statuses = {}
+        self.policies = {}
+        self.polls = {}
+        self.tasks = None
+        self.cadence = None
+        self.loop = None
+        self.holds_lease = None
+        self.accounts = {
+            token_key(token): token for token in self.subscriptions.tokens()
+        }
+        self.checkpoints = checkpoints
+        if checkpoints is not None:
+            stored = checkpoints.load()
+            for token in self.subscriptions.tokens():
+                key = token_key(token)
+                if key in stored:
+                    self.timestamps[token] = stored[key]
+        self.max_in_flight = max_in_flight
+        self.executor = ThreadPoolExecutor(max_workers=max_in_flight)
+        self._semaphore = None
+        self._semaphore_loop = None
+
+    @property
+    def semaphore(self):
+        loop = asyncio.get_running_loop()
+        if self._semaphore_loop is not loop:
+            self._semaphore = asyncio.Semaphore(self.max_in_flight)
+            self._semaphore_loop = loop
+        return self._semaphore
+
+    async def poll(self, token):
+        """Running one iteration for a token, returns the delay.
+
+        Concurrent calls for the same token share a single request.
+        """
+        poll = self.polls.get(token)
+        if poll is None:
+            poll = self.polls[token] = asyncio.ensure_future(
+                self.poll_token(token)
+            )
+            poll.add_done_callback(lambda _: self.polls.pop(token, None))
+        return await asyncio.shield(poll)
+
+    def status_index(self, token):
+        statuses = self.statuses.get(token)
+        if statuses is None:
+            statuses = self.statuses[token] = StatusIndex(self.history)
+        return statuses
+
+    async def poll_token(self, token):
+        timestamp = self.timestamps.get(token, 0)
+        statuses = self.status_index(token)
+        policy = self.policies.get(token)
+        if policy is None:
+            policy = self.policies[token] = self.policy_factory()
+            if self.cadence is not None:
+                policy.set_cadence(*self.cadence)
+        async with self.semaphore:
+            try:
+                notifications, current_date, validators = (
+                    await self.fetch_changes(token, timestamp, statuses)
+                )
+                to_send = homework.notifications_to_send(
+                    notifications, timestamp
+                )
+                for chat_id in self.subscriptions.chats(token):
+                    await self.deliver(chat_id, to_send)
+                homework.commit_changes(notifications, statuses)
+                if validators is not None:
+                    self.cache.put(token, validators)
+                self.timestamps[token] = current_date
+                if self.checkpoints is not None:
+                    self.checkpoints.set(token_key(token), current_date)
+            except Exception as error:
+                log_error(
+                    LazyMessage(LOGGING_MESSAGE_ERROR, error=error),
+                    error
+                )
+                return policy.on_error(error)
+        return policy.on_success(statuses)
+
+    def blocking(self, function):
+        """`function` for the executor, sampled by the profiler if any."""
+        if self.profiler is None:
+            return function
+        return self.profiler.wrap(function)
+
+    async def fetch_changes(self, token, timestamp, statuses):
+        """Returning notifications, the new `current_date` and validators."""
+        if self.streaming:
+            return await asyncio.get_running_loop().run_in_executor(
+                self.executor,
+                self.blocking(poll_stream_changes),
+                self.url,
+                timestamp,
+                token,
+                statuses
+            )
+        if self.cache is not None:
+            return await asyncio.get_running_loop().run_in_executor(
+                self.executor,
+                self.blocking(poll_cached_changes),
+                self.url,
+                timestamp,
+                token,
+                statuses,
+                self.cache
+            )
+        api_answer = await get_api_answer(
+            self.url,
+            timestamp,
+            token,
+            self.executor
+        )
+        notifications = await check_response_changes(api_answer, statuses)
+        return notifications, api_answer.get('current_date', timestamp), None
+
+    async def deliver(self, chat_id, notifications):
+        """Handing notifications to the outbox and the outbound queue."""
+        if self.outbound is None:
+            for notification in notifications:
+                await send_message(
+                    self.bot,
+                    chat_id,
+                    notification.message,
+                    self.executor
+                )
+            return
+        if self.outbox is None:
+            entries = [(None, notification) for notification in notifications]
+        else:
+            entries = await asyncio.get_running_loop().run_in_executor(
+                self.executor,
+                self.outbox.add,
+                chat_id,
+                notifications
+            )
+        for id, notification in entries:
+            self.outbound.put(
+                chat_id,
+                notification.message,
+                notification.status,
+                id
+            )
+
+    def push(self, account, homeworks):
+        """Handing validated homeworks from the webhook thread to the loop.
+
+        Returns False for an account nobody is subscribed to.
+        """
+        token = self.accounts.get(account)
+        if token is None:
+            return False
+        if self.loop is None:
+            raise RuntimeError(ENGINE_NOT_RUNNING_MESSAGE)
+        asyncio.run_coroutine_threadsafe(
+            self.ingest(token, homeworks),
+            self.loop
+        )
+        return True
+
+    async def ingest(self, token, homeworks):
+        """Notifying about pushed homeworks like about a polled answer.
+
+        A poll in flight for the token is awaited first, so both never
+        compare statuses at the same time.
+        """
+        poll = self.polls.get(token)
+        while poll is not None and not poll.done():
+            await asyncio.wait({poll})
+            poll = self.polls.get(token)
+        statuses = self.status_index(token)
+        notifications = [
+            homework.make_notification(item, statuses)
+            for item in statuses.changes(homeworks)
+        ]
+        for chat_id in self.subscriptions.chats(token):
+            await self.deliver(chat_id, notifications)
+        homework.commit_changes(notifications, statuses)
+
+    async def poll_all(self):
+        """Running one iteration for every token."""
+        return await asyncio.gather(
+            *(self.poll(token) for token in self.subscriptions.tokens())
+        )
+
+    def add_subscription(self, subscription, spread=INITIAL_SPREAD):
+        """Adding a subscription, a new token starts being polled."""
+        if not self.subscriptions.add(subscription):
+            return False
+        token = subscription.token
+        self.accounts[token_key(token)] = token
+        if self.checkpoints is not None and token not in self.timestamps:
+            self.timestamps[token] = self.checkpoints.get(token_key(token))
+        if self.wheel is not None:
+            self.wheel.schedule_spread(token, spread)
+        elif self.tasks is not None:
+            self.tasks.add(asyncio.ensure_future(self.run_token(token)))
+        return True
+
+    def remove_subscription(self, subscription):
+        """Removing a subscription, a token without chats is not polled."""
+        if not self.subscriptions.remove(subscription):
+            return False
+        token = subscription.token
+        self.accounts.pop(token_key(token), None)
+        if self.wheel is not None:
+            self.wheel.cancel(token)
+        for state in (self.timestamps, self.statuses, self.policies):
+            state.pop(token, None)
+        if self.cache is not None:
+            self.cache.discard(token)
+        return True
+
+    def set_cadence(self, retry_time, error_retry_time):
+        """Changing poll delays of every token from its next poll on."""
+        self.cadence = retry_time, error_retry_time
+        for policy in self.policies.values():
+            policy.set_cadence(retry_time, error_retry_time)
+
+    async def run_token(self, token):
+        while token in self.subscriptions:
+            delay = await self.poll(token)
+            if token not in self.subscriptions:
+                return
+            await self.sleep(delay)
+
+    async def poll_and_reschedule(self, token):
+        """Polling a due token, skipped while its shard lease may be lost.
+
+        `holds_lease(token)` is set by a shard worker; a token whose lease
+        has expired locally is checked again after `LEASE_RECHECK_TIME`.
+        """
+        if self.holds_lease is not None and not self.holds_lease(token):
+            delay = LEASE_RECHECK_TIME
+        else:
+            delay = await self.poll(token)
+        if token in self.subscriptions:
+            self.wheel.schedule(token, delay)
+
+    async def dispatch(self, spread=INITIAL_SPREAD):
+        """Polling due tokens in batches taken from the timer wheel."""
+        for token in self.subscriptions.tokens():
+            self.wheel.schedule_spread(token, spread)
+        running = set()
+        while True:
+            for token in self.wheel.advance():
+                task = asyncio.ensure_future(self.poll_and_reschedule(token))
+                running.add(task)
+                task.add_done_callback(running.discard)
+            await self.sleep(self.wheel.next_tick_in())
+
+    async def wait_tokens(self):
+        while True:
+            done, self.tasks = await asyncio.wait(
+                self.tasks or {asyncio.ensure_future(asyncio.sleep(1))},
+                return_when=asyncio.FIRST_COMPLETED
+            )
+
+    async def flush_checkpoints(self, interval=CHECKPOINT_FLUSH_INTERVAL):
+        """Writing checkpoints of all subscribers in periodic batches."""
+        while True:
+            await asyncio.sleep(interval)
+            self.checkpoints.flush()
+
+    async def flush_history(self, interval=HISTORY_FLUSH_INTERVAL):
+        """Appending buffered transitions to the history in batches."""
+        loop = asyncio.get_running_loop()
+        while True:
+            await asyncio.sleep(interval)
+            await loop.run_in_executor(self.executor, self.history.flush)
+
+    async def retry_outbox(self, interval=OUTBOX_RETRY_INTERVAL,
+                           prune_interval=OUTBOX_PRUNE_INTERVAL):
+        """Re-sending undelivered notifications in bulk.
+
+        Old delivered and dead rows are pruned every `prune_interval`.
+        """
+        loop = asyncio.get_running_loop()
+        pruned = None
+        while True:
+            await loop.run_in_executor(
+                self.executor,
+                self.outbox.requeue,
+                self.outbound
+            )
+            if pruned is None or loop.time() - pruned >= prune_interval:
+                pruned = loop.time()
+                await loop.run_in_executor(self.executor, self.outbox.prune)
+            await asyncio.sleep(interval)
+
+    async def run(self, *background):
+        """Polling every subscription forever."""
+        self.loop = asyncio.get_running_loop()
+        if self.wheel is None:
+            self.tasks = {
+                asyncio.ensure_future(self.run_token(token))
+                for token in self.subscriptions.tokens()
+            }
+            tasks = [self.wait_tokens()]
+        else:
+            tasks = [self.dispatch()]
+        tasks.extend(background)
+        if self.checkpoints is not None:
+            tasks.append(self.flush_checkpoints())
+        if self.outbox is not None and self.outbound is not None:
+            tasks.append(self.retry_outbox())
+        if self.history is not None:
+            tasks.append(self.flush_history())
+        try:
+            await asyncio.gather(*tasks)
+        finally:
+            if self.checkpoints is not None:
+                self.checkpoints.flush()
+            if self.history is not None:
+                self.history.flush()
+            if self.profiler is not None:
+                self.profiler.close()
+            self.loop = None
+            self.executor.shutdown(wait=False)
+
+
+def build_engine(subscriptions, metrics_port=METRICS_PORT,
+                 outbox_path=OUTBOX_FILE, history_path=HISTORY_DIR,
+                 serve_webhook=True):
+    """Building an engine with production clients and stores.
+
+    Shard workers do not bind the webhook port, the supervisor routes
+    events to them.
+    """
+    from http_session import PooledSession
+
+    homework.use_session(
+        recorded(PooledSession(pool_maxsize=MAX_IN_FLIGHT))
+    )
+    start_http_server(metrics_port)
+    bot = LazyClient(partial(
+        homework.make_bot, TELEGRAM_TOKEN, MAX_IN_FLIGHT
+    ))
+    outbox = Outbox(outbox_path)
+    outbound = OutboundQueue(
+        partial(homework.send_message_to, bot),
+        outbox=outbox,
+        is_permanent=homework.is_rejected_message,
+        is_transient=homework.is_telegram_failure
+    )
+    outbound.start(SENDER_WORKERS)
+    profiler = Profiler()
+    profiler.install_signals()
+    policy_factory = None
+    if WEBHOOK_PORT is not None:
+        policy_factory = partial(
+            PollingPolicy, WEBHOOK_RECONCILE_TIME, ERROR_RETRY_TIME,
+            reviewing_retry_time=WEBHOOK_RECONCILE_TIME
+        )
+    engine = PollingEngine(
+        subscriptions,
+        bot,
+        checkpoints=CheckpointStore(),
+        outbound=outbound,
+        outbox=outbox,
+        streaming=STREAMING_ANSWERS,
+        wheel=TimerWheel(),
+        cache=ResponseCache(),
+        history=HistoryStore(history_path),
+        profiler=profiler,
+        policy_factory=policy_factory
+    )
+    if serve_webhook:
+        start_webhook_server(engine.push)
+    return engine
+
+
+def main():
+    """Multi-tenant entry point."""
+    from live_config import ConfigWatcher, config_source
+
+    homework.require_tokens(('TELEGRAM_TOKEN',))
+    source = config_source()
+    if source is None:
+        asyncio.run(build_engine(load_subscriptions()).run())
+        return
+    engine = build_engine(())
+    watcher = ConfigWatcher(source, engine)
+    watcher.load()
+    asyncio.run(engine.run(watcher.run()))
+
+
+if __name__ == '__main__':
+    configure_logging(__file__ + '.log', logging.DEBUG)
+    main()
@@ -0,0 +1,420 @@
+"""Columnar history of status transitions and review-time statistics.
+
+    python history.py [--path history] [--project NAME] [--json]
+"""
+import argparse
+import array
+import json
+import mmap
+import os
+import threading
+import time
+import zlib
+from datetime import datetime, timezone
+from functools import lru_cache
+
+HISTORY_DIR = os.getenv('HISTORY_DIR', 'history')
+HISTORY_FLUSH_INTERVAL = float(os.getenv('HISTORY_FLUSH_INTERVAL', 5))
+STATUSES = (None, 'reviewing', 'rejected', 'approved')
+STATUS_CODES = {status: code for code, status in enumerate(STATUSES)}
+UNKNOWN_STATUS = 255
+REVIEWING = STATUS_CODES['reviewing']
+REJECTED = STATUS_CODES['rejected']
+APPROVED = STATUS_CODES['approved']
+COLUMNS = (
+    ('at', 'd'),
+    ('homework', 'q'),
+    ('project', 'I'),
+    ('from_status', 'B'),
+    ('to_status', 'B'),
+    ('comment_offset', 'q'),
+    ('comment_size', 'I'),
+)
+PROJECTS_FILE = 'projects.txt'
+COMMENTS_FILE = 'comments.txt'
+DATE_FORMAT = '%Y-%m-%dT%H:%M:%SZ'
+PERCENTILES = (50, 90, 99)
+NO_HISTORY_MESSAGE = 'История переходов пуста: {path}'
+
+
+@lru_cache(maxsize=None)
+def vectorized():
+    """numpy for the scans, None when it is not installed.
+
+    numpy is pinned in requirements.txt; the loop fallback is only for
+    trimmed installs and is slow at millions of rows. Imported on the first
+    query only, the bot itself never pays for it.
+    """
+    try:
+        import numpy
+    except ImportError:
+        return None
+    return numpy
+
+
+def parse_date(value):
+    """`date_updated` as a timestamp, None when it is missing or invalid."""
+    if isinstance(value, (int, float)):
+        return float(value)
+    try:
+        return datetime.strptime(value, DATE_FORMAT).replace(
+            tzinfo=timezone.utc
+        ).timestamp()
+    except (TypeError, ValueError):
+        return None
+
+
+def homework_number(homework):
+    number = homework.get('id')
+    if isinstance(number, int):
+        return number
+    return zlib.crc32(str(homework.get('homework_name')).encode())
+
+
+def empty_column(code):
+    numpy = vectorized()
+    if numpy is not None:
+        return numpy.zeros(0, dtype=code)
+    return array.array(code)
+
+
+class HistoryStore:
+    """Append-only column files, one fixed-width value per transition."""
+
+    def __init__(self, path=HISTORY_DIR):
+        os.makedirs(path, exist_ok=True)
+        self.path = path
+        self.buffers = {name: array.array(code) for name, code in COLUMNS}
+        self.comments = bytearray()
+        self.projects = {}
+        self.new_projects = []
+        projects = os.path.join(path, PROJECTS_FILE)
+        if os.path.exists(projects):
+            with open(projects, encoding='utf-8') as file:
+                for code, name in enumerate(file.read().splitlines()):
+                    self.projects[name] = code
+        comments = os.path.join(path, COMMENTS_FILE)
+        self.comment_offset = (
+            os.path.getsize(comments) if os.path.exists(comments) else 0
+        )
+        self._lock = threading.Lock()
+
+    def column_path(self, name):
+        return os.path.join(self.path, name + '.col')
+
+    def project_code(self, name):
+        code = self.projects.get(name)
+        if code is None:
+            code = self.projects[name] = len(self.projects)
+            self.new_projects.append(name)
+        return code
+
+    def append(self, homework, previous, observed=None):
+        """Buffering one transition until the next `flush`."""
+        at = parse_date(homework.get('date_updated'))
+        if at is None:
+            at = observed or time.time()
+        comment = (homework.get('reviewer_comment') or '').encode()
+        project = str(
+            homework.get('lesson_name') or homework.get('homework_name')
+        ).replace('\n', ' ')
+        with self._lock:
+            buffers = self.buffers
+            buffers['at'].append(at)
+            buffers['homework'].append(homework_number(homework))
+            buffers['project'].append(self.project_code(project))
+            buffers['from_status'].append(
+                STATUS_CODES.get(previous, UNKNOWN_STATUS)
+            )
+            buffers['to_status'].append(
+                STATUS_CODES.get(homework.get('status'), UNKNOWN_STATUS)
+            )
+            buffers['comment_offset'].append(
+                self.comment_offset + len(self.comments)
+            )
+            buffers['comment_size'].append(len(comment))
+            self.comments += comment
+
+    def flush(self):
+        """Appending buffered transitions to the column files."""
+        with self._lock:
+            buffers, self.buffers = self.buffers, {
+                name: array.array(code) for name, code in COLUMNS
+            }
+            comments, self.comments = self.comments, bytearray()
+            projects, self.new_projects = self.new_projects, []
+            self.comment_offset += len(comments)
+            rows = len(buffers['at'])
+            if not rows:
+                return 0
+            if projects:
+                with open(os.path.join(self.path, PROJECTS_FILE), 'a',
+                          encoding='utf-8') as file:
+                    file.writelines(name + '\n' for name in projects)
+            with open(os.path.join(self.path, COMMENTS_FILE), 'ab') as file:
+                file.write(comments)
+            for name, _ in COLUMNS:
+                with open(self.column_path(name), 'ab') as file:
+                    buffers[name].tofile(file)
+        return rows
+
+    def close(self):
+        self.flush()
+
+    def project_names(self):
+        names = [None] * len(self.projects)
+        for name, code in self.projects.items():
+            names[code] = name
+        return names
+
+    def columns(self):
+        """Memory-mapped columns cut to the rows written completely.
+
+        Values are numpy arrays when numpy is installed and memoryviews of
+        the mapped files otherwise; nothing is copied into Python objects.
+        """
+        views = {}
+        numpy = vectorized()
+        for name, code in COLUMNS:
+            path = self.column_path(name)
+            if not os.path.exists(path) or not os.path.getsize(path):
+                return {name: empty_column(code) for name, code in COLUMNS}
+            with open(path, 'rb') as file:
+                mapped = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+            size = array.array(code).itemsize
+            if numpy is not None:
+                views[name] = numpy.frombuffer(
+                    mapped, dtype=code, count=len(mapped) // size
+                )
+            else:
+                views[name] = memoryview(mapped)[
+                    :len(mapped) // size * size
+                ].cast(code)
+        rows = min(len(view) for view in views.values())
+        return {name: view[:rows] for name, view in views.items()}
+
+    def comment(self, offset, size):
+        with open(os.path.join(self.path, COMMENTS_FILE), 'rb') as file:
+            file.seek(offset)
+            return file.read(size).decode()
+
+
+def store_paths(path=HISTORY_DIR):
+    """`path` and its subdirectories that hold transitions.
+
+    Shard workers each write to their own subdirectory, so no file has two
+    writers.
+    """
+    paths = [path]
+    if os.path.isdir(path):
+        for entry in sorted(os.scandir(path), key=lambda entry: entry.name):
+            if entry.is_dir() and os.path.exists(
+                    os.path.join(entry.path, COLUMNS[0][0] + '.col')):
+                paths.append(entry.path)
+    return paths
+
+
+def concatenate(parts, code):
+    numpy = vectorized()
+    if numpy is not None:
+        return numpy.concatenate(parts).astype(code, copy=False)
+    joined = array.array(code)
+    for part in parts:
+        joined.extend(part)
+    return joined
+
+
+class MergedHistory:
+    """Read-only view over a history directory and its shard stores.
+
+    Project codes are mapped onto one table and rows are ordered by time;
+    `store` holds the index of the store whose comments a row points to.
+    """
+
+    def __init__(self, path=HISTORY_DIR):
+        self.stores = [HistoryStore(store) for store in store_paths(path)]
+        self.names = []
+        self.codes = []
+        merged = {}
+        for store in self.stores:
+            codes = []
+            for name in store.project_names():
+                if name not in merged:
+                    merged[name] = len(self.names)
+                    self.names.append(name)
+                codes.append(merged[name])
+            self.codes.append(codes)
+
+    def project_names(self):
+        return list(self.names)
+
+    def columns(self):
+        parts = [store.columns() for store in self.stores]
+        numpy = vectorized()
+        if len(parts) == 1:
+            rows = len(parts[0]['at'])
+            parts[0]['store'] = (
+                numpy.zeros(rows, dtype='H') if numpy is not None
+                else array.array('H', [0]) * rows
+            )
+            return parts[0]
+        for index, (columns, codes) in enumerate(zip(parts, self.codes)):
+            rows = len(columns['at'])
+            if numpy is not None:
+                columns['project'] = numpy.asarray(
+                    codes, dtype='I'
+                )[columns['project']] if rows else columns['project']
+                columns['store'] = numpy.full(rows, index, dtype='H')
+            else:
+                columns['project'] = array.array(
+                    'I', (codes[code] for code in columns['project'])
+                )
+                columns['store'] = array.array('H', [index]) * rows
+        merged = {
+            name: concatenate([columns[name] for columns in parts], code)
+            for name, code in COLUMNS + (('store', 'H'),)
+        }
+        at = merged['at']
+        if numpy is not None:
+            order = numpy.argsort(at, kind='stable')
+            return {name: values[order] for name, values in merged.items()}
+        order = sorted(range(len(at)), key=at.__getitem__)
+        return {
+            name: array.array(values.typecode, map(values.__getitem__, order))
+            for name, values in merged.items()
+        }
+
+    def comment(self, offset, size, store=0):
+        return self.stores[store].comment(offset, size)
+
+
+def percentiles(values, shares=PERCENTILES):
+    """Nearest-rank percentiles of a numpy array or a list."""
+    numpy = vectorized()
+    if not len(values):
+        return {f'p{share}': None for share in shares}
+    if numpy is not None:
+        return {
+            f'p{share}': float(numpy.percentile(values, share,
+                                                method='inverted_cdf'))
+            for share in shares
+        }
+    ordered = sorted(values)
+    return {
+        f'p{share}': ordered[max(0, min(
+            len(ordered) - 1, round(share / 100 * len(ordered)) - 1
+        ))]
+        for share in shares
+    }
+
+
+def review_times(columns):
+    """Durations from `reviewing` to a verdict, their projects and verdicts.
+
+    Transitions of a homework are appended in the order they were observed,
+    so a verdict is paired with the previous row of the same homework.
+    """
+    homework = columns['homework']
+    numpy = vectorized()
+    if numpy is not None:
+        order = numpy.argsort(homework, kind='stable')
+        homework = homework[order]
+        at = columns['at'][order]
+        from_status = columns['from_status'][order]
+        to_status = columns['to_status'][order]
+        project = columns['project'][order]
+        verdict = to_status[1:]
+        mask = (
+            (homework[1:] == homework[:-1])
+            & (to_status[:-1] == REVIEWING)
+            & (from_status[1:] == REVIEWING)
+            & ((verdict == APPROVED) | (verdict == REJECTED))
+        )
+        return (at[1:][mask] - at[:-1][mask], project[1:][mask],
+                verdict[mask])
+    started = {}
+    durations, projects, verdicts = [], [], []
+    at, to_status = columns['at'], columns['to_status']
+    from_status, project = columns['from_status'], columns['project']
+    for row in range(len(homework)):
+        status = to_status[row]
+        if status == REVIEWING:
+            started[homework[row]] = at[row]
+        elif (status in (APPROVED, REJECTED)
+                and from_status[row] == REVIEWING
+                and homework[row] in started):
+            durations.append(at[row] - started.pop(homework[row]))
+            projects.append(project[row])
+            verdicts.append(status)
+    return durations, projects, verdicts
+
+
+def statistics(store, project=None):
+    """Overall and per-project review statistics."""
+    columns = store.columns()
+    numpy = vectorized()
+    names = store.project_names()
+    durations, projects, verdicts = review_times(columns)
+    per_project = {}
+    if numpy is not None:
+        counts = numpy.bincount(columns['project'], minlength=len(names))
+        for code in numpy.unique(projects):
+            mask = projects == code
+            per_project[int(code)] = (durations[mask], verdicts[mask])
+    else:
+        counts = [0] * len(names)
+        for code in columns['project']:
+            counts[code] += 1
+        for duration, code, verdict in zip(durations, projects, verdicts):
+            group = per_project.setdefault(code, ([], []))
+            group[0].append(duration)
+            group[1].append(verdict)
+    rows = []
+    for code, (group_durations, group_verdicts) in sorted(
+            per_project.items()):
+        if project is not None and names[code] != project:
+            continue
+        if numpy is not None:
+            approved = int(numpy.count_nonzero(group_verdicts == APPROVED))
+        else:
+            approved = group_verdicts.count(APPROVED)
+        rows.append(dict(
+            project=names[code],
+            transitions=int(counts[code]),
+            reviews=len(group_durations),
+            approved_share=round(approved / len(group_durations), 3),
+            **{name: None if value is None else round(value / 3600, 2)
+               for name, value in percentiles(group_durations).items()}
+        ))
+    return dict(
+        transitions=len(columns['homework']),
+        reviews=len(durations),
+        review_hours={
+            name: None if value is None else round(value / 3600, 2)
+            for name, value in percentiles(durations).items()
+        },
+        projects=rows,
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--path', default=HISTORY_DIR)
+    parser.add_argument('--project')
+    parser.add_argument('--json', action='store_true')
+    args = parser.parse_args()
+    if not os.path.isdir(args.path):
+        raise SystemExit(NO_HISTORY_MESSAGE.format(path=args.path))
+    result = statistics(MergedHistory(args.path), args.project)
+    if args.json:
+        print(json.dumps(result, ensure_ascii=False))
+        return
+    print(f"transitions: {result['transitions']}, "
+          f"reviews: {result['reviews']}, "
+          f"review hours: {result['review_hours']}")
+    for row in result['projects']:
+        print(', '.join(f'{key}: {value}' for key, value in row.items()))
+
+
+if __name__ == '__main__':
+    main()
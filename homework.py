@@ -1,10 +1,30 @@
+import json
 import logging
 import os
-import time
+import sys
+from collections import namedtuple
+from functools import lru_cache, partial
+from http import HTTPStatus
 
-import requests
 from dotenv import load_dotenv
-from telegram import Bot
+
+from checkpoints import CheckpointStore, token_key
+from circuit import CircuitBreaker, log_error
+from history import HistoryStore
+from lazy import LazyClient
+from log_pipeline import LazyMessage, configure_logging
+from metrics import (API_ERROR_KEYS, RESPONSE_CACHE, UNEXPECTED_STATUSES,
+                     Stage, start_http_server)
+from outbound import OutboundQueue
+from outbox import Outbox
+from profiling import Profiler
+from recording import recorded
+from records import HomeworkRecord, record_hook
+from response_cache import (ResponseCache, Validators, body_digest,
+                            conditional_headers)
+from scheduling import PollingPolicy
+from status_index import StatusIndex
+from streaming import CHUNK_SIZE, AnswerStream
 
 load_dotenv()
 
@@ -14,6 +34,8 @@ TELEGRAM_TOKEN = os.getenv('TELEGRAM_TOKEN')
 CHAT_ID = os.getenv('TELEGRAM_CHAT_ID')
 HEADERS = {'Authorization': f'OAuth {PRAKTIKUM_TOKEN}'}
 RETRY_TIME = 300
+MESSAGE_CACHE_SIZE = int(os.getenv('MESSAGE_CACHE_SIZE', 4096))
+ERROR_RETRY_TIME = 30
 HOMEWORK_STATUSES_URL = ('https://practicum.yandex.ru/'
                          'api/user_api/homework_statuses/')
 UNEXPECTED_STATUS = ('Обнаружен неожиданный статус: \"{status}\"')
@@ -41,107 +63,374 @@ ERROR_RESPONSE_JSON_KEY = (
     'params: \"{params}\"')
 LOGGING_MESSAGE_ERROR = ('Не удалось выполнить итерацию. Ошибка: \"{error}\".')
 EMPTY_RESPONSE_MESSAGE = 'Ответ от сервера не содержит домашние работы'
+MISSING_TOKENS_MESSAGE = (
+    'Отсутствуют обязательные переменные окружения: {names}'
+)
+REQUIRED_TOKENS = ('PRAKTIKUM_TOKEN', 'TELEGRAM_TOKEN', 'TELEGRAM_CHAT_ID')
+
+Notification = namedtuple(
+    'Notification', ['key', 'status', 'message', 'homework'],
+    defaults=(None,)
+)
+
+session = None
+
+
+def is_api_failure(error):
+    """Network errors and server-side status codes open the circuit."""
+    status_code = getattr(error, 'status_code', None)
+    if status_code is None:
+        return isinstance(error, ConnectionError)
+    return status_code >= 500 or status_code == 429
+
+
+def is_telegram_failure(error):
+    """Network errors open the circuit, rejected messages do not."""
+    from telegram.error import BadRequest, NetworkError
+
+    return (isinstance(error, NetworkError)
+            and not isinstance(error, BadRequest))
+
+
+def is_rejected_message(error):
+    """Messages Telegram refused to accept, retrying them cannot help."""
+    from telegram.error import BadRequest
+
+    return isinstance(error, BadRequest)
+
+
+practicum_circuit = CircuitBreaker('practicum', is_failure=is_api_failure)
+telegram_circuit = CircuitBreaker('telegram', is_failure=is_telegram_failure)
+
+
+class UnexpectedStatusCodeError(RuntimeError):
+    """Non-200 answer, keeps the status code and `Retry-After` header."""
+
+    def __init__(self, message, status_code, retry_after=None):
+        super().__init__(message)
+        self.status_code = status_code
+        self.retry_after = retry_after
+
+
+def check_tokens(names=REQUIRED_TOKENS):
+    """Checking the environment, returns names of missing variables."""
+    return [name for name in names if not os.getenv(name)]
+
+
+def require_tokens(names=REQUIRED_TOKENS):
+    """Stopping before any heavy import when the environment is incomplete."""
+    missing = check_tokens(names)
+    if missing:
+        message = MISSING_TOKENS_MESSAGE.format(names=', '.join(missing))
+        logging.critical(message)
+        sys.exit(message)
+
+
+def make_bot(token, con_pool_size=None):
+    """Building the telegram client, `telegram` is imported only here."""
+    import telegram
+    from telegram.utils.request import Request
+
+    return telegram.Bot(
+        token=token,
+        request=None if con_pool_size is None else Request(
+            con_pool_size=con_pool_size
+        )
+    )
+
+
+def use_session(new_session):
+    """Routing API requests through a session, None means `requests.get`."""
+    global session
+    session = new_session
 
 
 def parse_status(homework):
     """Parsing servers answer."""
     status = homework['status']
     if status not in VERDICTS:
+        UNEXPECTED_STATUSES.inc()
         raise ValueError(
             UNEXPECTED_STATUS.format(
                 status=status
             )
         )
-    return PROJECT_CHECKED.format(
-        verdict=VERDICTS[status],
-        name=homework['homework_name']
-    )
+    return render_status(homework['homework_name'], status)
+
+
+@lru_cache(maxsize=MESSAGE_CACHE_SIZE)
+def render_status(name, status):
+    """`PROJECT_CHECKED` for a homework, memoized by (name, status).
+
+    Subscribers of one token share the rendered string; the cache is
+    cleared when `VERDICTS` is replaced.
+    """
+    return PROJECT_CHECKED.format(verdict=VERDICTS[status], name=name)
+
+
+def make_headers(token):
+    """Building authorization headers for a Practicum token."""
+    return {'Authorization': f'OAuth {token}'}
 
 
 def get_api_answer(url, current_timestamp):
     """Getting statuses from the server."""
-    params = {'from_date': current_timestamp}
+    return request_api_answer(url, current_timestamp, HEADERS)
+
+
+def request_api_answer(url, current_timestamp, headers):
+    """Getting statuses from the server with the given headers."""
     request_parameters = dict(
         url=url,
-        headers=HEADERS,
-        params=params
+        headers=headers,
+        params={'from_date': current_timestamp}
     )
-    try:
-        response = requests.get(**request_parameters)
-    except requests.exceptions.RequestException as error:
-        raise ConnectionError(
-            CONNECTION_ERROR_MESSAGE.format(
-                error=error,
-                **request_parameters
-            )
-        )
-    if response.status_code != 200:
-        raise RuntimeError(
-            UNEXPECTED_RESPONSE_STATUS_CODE.format(
-                status_code=response.status_code,
-                **request_parameters
-            )
-        )
-    json = response.json()
+    response = send_request(request_parameters)
+    with Stage('json_decode'):
+        json = response.json()
     json_error_keys = ['error', 'code']
     for key in json_error_keys:
         if key in json:
-            raise RuntimeError(
-                ERROR_RESPONSE_JSON_KEY.format(
-                    key=key,
-                    value=json[key],
-                    url=url,
-                    headers=HEADERS,
-                    params=params
+            raise error_key_found(key, json[key], request_parameters)
+    return json
+
+
+def request_cached_answer(url, current_timestamp, headers, validators=None):
+    """Getting statuses unless they are the same as in the last answer.
+
+    Returns the answer, `current_date` and validators to cache once the
+    answer is processed; the answer is None when the server replied
+    `304 Not Modified` or the body matches the digest of the last one.
+    """
+    request_parameters = dict(
+        url=url,
+        headers={**headers, **conditional_headers(validators)},
+        params={'from_date': current_timestamp}
+    )
+    response = send_request(
+        request_parameters,
+        accepted=(HTTPStatus.OK, HTTPStatus.NOT_MODIFIED)
+    )
+    if response.status_code == HTTPStatus.NOT_MODIFIED:
+        RESPONSE_CACHE.inc('not_modified')
+        return None, current_timestamp, validators
+    digest, current_date = body_digest(response.content)
+    new_validators = Validators(
+        response.headers.get('ETag'),
+        response.headers.get('Last-Modified'),
+        digest
+    )
+    if current_date is None:
+        current_date = current_timestamp
+    if validators is not None and validators.digest == digest:
+        RESPONSE_CACHE.inc('same_body')
+        return None, current_date, new_validators
+    RESPONSE_CACHE.inc('miss')
+    with Stage('json_decode'):
+        answer = json.loads(response.content, object_hook=record_hook)
+    for key in ('error', 'code'):
+        if key in answer:
+            raise error_key_found(key, answer[key], request_parameters)
+    return answer, answer.get('current_date', current_date), new_validators
+
+
+def stream_api_answer(url, current_timestamp, headers):
+    """Getting statuses from the server as a lazily decoded stream."""
+    request_parameters = dict(
+        url=url,
+        headers=headers,
+        params={'from_date': current_timestamp}
+    )
+    response = send_request(request_parameters, stream=True)
+    return AnswerStream(
+        response.iter_content(CHUNK_SIZE),
+        partial(error_key_found, request_parameters=request_parameters),
+        response.close,
+        HomeworkRecord.from_dict
+    )
+
+
+def send_request(request_parameters, accepted=(HTTPStatus.OK,), **kwargs):
+    """Sending the request and checking the status code."""
+    import requests
+
+    get = requests.get if session is None else session.get
+    with practicum_circuit:
+        with Stage('request') as stage:
+            try:
+                response = get(**request_parameters, **kwargs)
+            except requests.exceptions.RequestException as error:
+                stage.outcome = 'connection_error'
+                raise ConnectionError(
+                    CONNECTION_ERROR_MESSAGE.format(
+                        error=error,
+                        **request_parameters
+                    )
                 )
+            stage.outcome = str(response.status_code)
+        if response.status_code not in accepted:
+            raise UnexpectedStatusCodeError(
+                UNEXPECTED_RESPONSE_STATUS_CODE.format(
+                    status_code=response.status_code,
+                    **request_parameters
+                ),
+                response.status_code,
+                getattr(response, 'headers', {}).get('Retry-After')
             )
-    return json
+    return response
+
+
+def error_key_found(key, value, request_parameters):
+    """Building the error for an error key in the answer."""
+    API_ERROR_KEYS.inc(key)
+    return RuntimeError(
+        ERROR_RESPONSE_JSON_KEY.format(
+            key=key,
+            value=value,
+            **request_parameters
+        )
+    )
 
 
 def check_response(response):
     """Checking RESPONSEs."""
-    if 'homeworks' not in response:
-        raise ValueError(EMPTY_RESPONSE_MESSAGE)
-    homeworks = response['homeworks']
-    if len(homeworks) == 0:
-        raise ValueError(EMPTY_RESPONSE_MESSAGE)
-    return parse_status(homeworks[0])
+    with Stage('check_response'):
+        if 'homeworks' not in response:
+            raise ValueError(EMPTY_RESPONSE_MESSAGE)
+        homeworks = response['homeworks']
+        if len(homeworks) == 0:
+            raise ValueError(EMPTY_RESPONSE_MESSAGE)
+        return parse_status(homeworks[0])
+
+
+def check_response_changes(response, index):
+    """Returning notifications for homeworks whose status has changed.
+
+    The index is updated by `commit_changes` once the notifications are
+    stored.
+    """
+    with Stage('check_response'):
+        if 'homeworks' not in response:
+            raise ValueError(EMPTY_RESPONSE_MESSAGE)
+        return [
+            make_notification(homework, index)
+            for homework in index.changes(response['homeworks'])
+        ]
+
+
+def check_stream_changes(stream, index):
+    """Returning notifications while homeworks are being decoded."""
+    with Stage('check_response'):
+        notifications = [
+            make_notification(homework, index)
+            for homework in index.changes(stream.homeworks())
+        ]
+        if not stream.seen_homeworks:
+            raise ValueError(EMPTY_RESPONSE_MESSAGE)
+        return notifications
+
+
+def notifications_to_send(notifications, current_timestamp):
+    """Only the latest change when the poll had no checkpoint.
+
+    An answer `from_date=0` holds the whole history, the rest of it is
+    committed to the index without messages.
+    """
+    if current_timestamp:
+        return notifications
+    return notifications[:1]
+
+
+def commit_changes(notifications, index):
+    """Recording homeworks of stored notifications as seen."""
+    index.commit(notification.homework for notification in notifications)
+
+
+def make_notification(homework, index):
+    """Building a notification with a deduplication key."""
+    return Notification(
+        '{}:{}:{}'.format(
+            index.homework_key(homework),
+            homework['status'],
+            homework.get('date_updated')
+        ),
+        homework['status'],
+        parse_status(homework),
+        homework
+    )
 
 
 def send_message(bot, message):
     """Sending a message via telegram."""
-    return bot.send_message(CHAT_ID, message)
+    return send_message_to(bot, CHAT_ID, message)
+
+
+def send_message_to(bot, chat_id, message):
+    """Sending a message via telegram to the given chat."""
+    with telegram_circuit, Stage('send_message'):
+        return bot.send_message(chat_id, message)
 
 
 def main():
     """Main entry point."""
-    timestamp = 0
-    bot = Bot(token=TELEGRAM_TOKEN)
+    require_tokens()
+    from http_session import PooledSession
+
+    checkpoints = CheckpointStore()
+    checkpoint_key = token_key(PRAKTIKUM_TOKEN)
+    timestamp = checkpoints.get(checkpoint_key)
+    history = HistoryStore()
+    statuses = StatusIndex(history)
+    cache = ResponseCache(max_size=1)
+    policy = PollingPolicy(RETRY_TIME, ERROR_RETRY_TIME)
+    use_session(recorded(PooledSession()))
+    start_http_server()
+    bot = LazyClient(partial(make_bot, TELEGRAM_TOKEN))
+    outbox = Outbox()
+    outbox.prune()
+    outbound = OutboundQueue(
+        partial(send_message_to, bot),
+        outbox=outbox,
+        is_permanent=is_rejected_message,
+        is_transient=is_telegram_failure
+    )
+    outbound.start(workers=1)
+    profiler = Profiler()
+    profiler.install_signals()
     while True:
         try:
-            api_answer = get_api_answer(
-                HOMEWORK_STATUSES_URL,
-                timestamp
-            )
-            message = check_response(api_answer)
-            timestamp = api_answer.get('current_date', timestamp)
-            send_message(bot, message)
-            time.sleep(RETRY_TIME)
+            with profiler.cycle():
+                outbox.requeue(outbound)
+                api_answer, current_date, validators = request_cached_answer(
+                    HOMEWORK_STATUSES_URL,
+                    timestamp,
+                    HEADERS,
+                    cache.get(checkpoint_key)
+                )
+                notifications = [] if api_answer is None else (
+                    check_response_changes(api_answer, statuses)
+                )
+                to_send = notifications_to_send(notifications, timestamp)
+                for id, notification in outbox.add(CHAT_ID, to_send):
+                    outbound.put(
+                        CHAT_ID,
+                        notification.message,
+                        notification.status,
+                        id
+                    )
+                commit_changes(notifications, statuses)
+                cache.put(checkpoint_key, validators)
+                timestamp = current_date
+                checkpoints.set(checkpoint_key, timestamp)
+                checkpoints.flush()
+                history.flush()
+            policy.clock.sleep(policy.on_success(statuses))
 
         except Exception as error:
-            logging.error(
-                msg=LOGGING_MESSAGE_ERROR.format(
-                    error=error
-                ),
-                exc_info=True
-            )
-            time.sleep(30)
+            log_error(LazyMessage(LOGGING_MESSAGE_ERROR, error=error), error)
+            policy.clock.sleep(policy.on_error(error))
 
 
 if __name__ == '__main__':
-    logging.basicConfig(
-        level=logging.DEBUG,
-        filename=__file__ + '.log',
-        format='%(asctime)s, %(levelname)s, %(message)s, %(name)s'
-    )
+    configure_logging(__file__ + '.log', logging.DEBUG)
     main()
@@ -0,0 +1,89 @@
+import os
+import threading
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+POOL_CONNECTIONS = int(os.getenv('HTTP_POOL_CONNECTIONS', 4))
+POOL_MAXSIZE = int(os.getenv('HTTP_POOL_MAXSIZE', 64))
+CONNECT_TIMEOUT = float(os.getenv('HTTP_CONNECT_TIMEOUT', 3.05))
+READ_TIMEOUT = float(os.getenv('HTTP_READ_TIMEOUT', 10))
+RETRIES = int(os.getenv('HTTP_RETRIES', 2))
+RETRY_BACKOFF = 0.3
+RETRY_STATUSES = (502, 503, 504)
+
+
+class ConnectionStats:
+    """Thread-safe counters of new and reused connections."""
+
+    def __init__(self):
+        self.requests = 0
+        self.reused = 0
+        self._lock = threading.Lock()
+
+    @property
+    def new_connections(self):
+        return self.requests - self.reused
+
+    def record(self, reused):
+        with self._lock:
+            self.requests += 1
+            self.reused += reused
+
+    def snapshot(self):
+        with self._lock:
+            return dict(
+                requests=self.requests,
+                reused=self.reused,
+                new_connections=self.requests - self.reused
+            )
+
+
+class CountingAdapter(HTTPAdapter):
+    """HTTPAdapter marking every response with `connection_reused`."""
+
+    def __init__(self, stats, **kwargs):
+        self.stats = stats
+        super().__init__(**kwargs)
+
+    def send(self, request, **kwargs):
+        response = super().send(request, **kwargs)
+        connection = getattr(response.raw, 'connection', None)
+        served = getattr(connection, 'requests_served', 0)
+        if connection is not None:
+            connection.requests_served = served + 1
+        response.connection_reused = served > 0
+        self.stats.record(response.connection_reused)
+        return response
+
+
+class PooledSession(requests.Session):
+    """Keep-alive session with a bounded pool, timeouts and retries."""
+
+    def __init__(self, pool_connections=POOL_CONNECTIONS,
+                 pool_maxsize=POOL_MAXSIZE,
+                 timeout=(CONNECT_TIMEOUT, READ_TIMEOUT),
+                 retries=RETRIES):
+        super().__init__()
+        self.timeout = timeout
+        self.stats = ConnectionStats()
+        adapter = CountingAdapter(
+            self.stats,
+            pool_connections=pool_connections,
+            pool_maxsize=pool_maxsize,
+            max_retries=Retry(
+                total=retries,
+                backoff_factor=RETRY_BACKOFF,
+                status_forcelist=RETRY_STATUSES,
+                allowed_methods=frozenset(['GET', 'POST']),
+                respect_retry_after_header=False,
+                raise_on_status=False
+            )
+        )
+        self.mount('https://', adapter)
+        self.mount('http://', adapter)
+
+    def request(self, method, url, **kwargs):
+        kwargs.setdefault('timeout', self.timeout)
+        return super().request(method, url, **kwargs)
@@ -0,0 +1,31 @@
+import threading
+
+
+class LazyClient:
+    """Proxy that builds the real client on first attribute access."""
+
+    def __init__(self, factory):
+        self._factory = factory
+        self._client = None
+        self._lock = threading.Lock()
+
+    @property
+    def client(self):
+        if self._client is None:
+            with self._lock:
+                if self._client is None:
+                    self._client = self._factory()
+        return self._client
+
+    def reset(self, factory):
+        """Replacing the factory, the client is rebuilt on next use."""
+        with self._lock:
+            self._factory = factory
+            self._client = None
+
+    @property
+    def built(self):
+        return self._client is not None
+
+    def __getattr__(self, name):
+        return getattr(self.client, name)
@@ -0,0 +1,265 @@
+import asyncio
+import json
+import logging
+import os
+import sqlite3
+import threading
+from collections import namedtuple
+from functools import partial
+
+import homework
+from lazy import LazyClient
+from log_pipeline import LazyMessage
+from subscriptions import Subscription
+
+CONFIG_FILE = os.getenv('CONFIG_FILE')
+CONFIG_DATABASE = os.getenv('CONFIG_DATABASE')
+CONFIG_POLL_INTERVAL = float(os.getenv('CONFIG_POLL_INTERVAL', 5))
+SETTINGS = ('PRAKTIKUM_TOKEN', 'TELEGRAM_TOKEN', 'TELEGRAM_CHAT_ID',
+            'RETRY_TIME', 'ERROR_RETRY_TIME', 'VERDICTS')
+CONFIG_APPLIED_MESSAGE = (
+    'Конфигурация обновлена: подписок добавлено {added}, удалено '
+    '{removed}, изменены настройки: {settings}'
+)
+CADENCE_IGNORED_MESSAGE = (
+    'RETRY_TIME и ERROR_RETRY_TIME не применены: при WEBHOOK_PORT опрос '
+    'идёт раз в WEBHOOK_RECONCILE_TIME'
+)
+CONFIG_ERROR_MESSAGE = (
+    'Новая конфигурация не применена, остаётся прежняя. Ошибка: \"{error}\"'
+)
+
+Config = namedtuple('Config', ['subscriptions', 'settings'])
+
+
+def default_settings():
+    """Settings the bot was started with."""
+    return dict(
+        PRAKTIKUM_TOKEN=homework.PRAKTIKUM_TOKEN,
+        TELEGRAM_TOKEN=homework.TELEGRAM_TOKEN,
+        TELEGRAM_CHAT_ID=homework.CHAT_ID,
+        RETRY_TIME=homework.RETRY_TIME,
+        ERROR_RETRY_TIME=homework.ERROR_RETRY_TIME,
+        VERDICTS=homework.VERDICTS,
+    )
+
+
+def parse_settings(values):
+    """Typed settings over the defaults, unknown names are ignored."""
+    settings = default_settings()
+    for name in SETTINGS:
+        value = values.get(name)
+        if value is None or value == '':
+            continue
+        if name in ('RETRY_TIME', 'ERROR_RETRY_TIME'):
+            value = int(value)
+            if value <= 0:
+                raise ValueError(f'{name}={value}')
+        elif name == 'VERDICTS':
+            value = json.loads(value)
+            if not isinstance(value, dict) or not value:
+                raise ValueError(f'{name}={value}')
+        settings[name] = value
+    return settings
+
+
+def file_version(path):
+    if path is None:
+        return None
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return stat.st_mtime_ns, stat.st_size, stat.st_ino
+
+
+class FileSource:
+    """Settings from a dotenv file and subscriptions from a CSV file."""
+
+    def __init__(self, path=CONFIG_FILE, subscriptions_path=None):
+        from engine import SUBSCRIPTIONS_FILE
+
+        self.path = path
+        self.subscriptions_path = subscriptions_path or SUBSCRIPTIONS_FILE
+
+    def version(self):
+        return file_version(self.path), file_version(self.subscriptions_path)
+
+    def load(self):
+        from dotenv import dotenv_values
+        from engine import load_subscriptions
+
+        settings = parse_settings(
+            {} if self.path is None else dotenv_values(self.path)
+        )
+        return Config(
+            load_subscriptions(
+                self.subscriptions_path,
+                settings['PRAKTIKUM_TOKEN'],
+                settings['TELEGRAM_CHAT_ID']
+            ),
+            settings
+        )
+
+
+class SqliteSource:
+    """Settings and subscriptions kept in SQLite tables.
+
+    `PRAGMA data_version` changes whenever another connection commits, so
+    checking for changes does not read the tables.
+    """
+
+    def __init__(self, path=CONFIG_DATABASE):
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        with self.connection:
+            self.connection.execute(
+                'CREATE TABLE IF NOT EXISTS subscriptions ('
+                'token TEXT NOT NULL, chat_id TEXT NOT NULL, '
+                'PRIMARY KEY (token, chat_id))'
+            )
+            self.connection.execute(
+                'CREATE TABLE IF NOT EXISTS settings ('
+                'name TEXT PRIMARY KEY, value TEXT NOT NULL)'
+            )
+        self._lock = threading.Lock()
+
+    def version(self):
+        with self._lock:
+            return self.connection.execute('PRAGMA data_version').fetchone()
+
+    def load(self):
+        from engine import NO_SUBSCRIPTIONS_MESSAGE
+
+        with self._lock, self.connection:
+            settings = parse_settings(dict(self.connection.execute(
+                'SELECT name, value FROM settings'
+            )))
+            subscriptions = [
+                Subscription(token, chat_id)
+                for token, chat_id in self.connection.execute(
+                    'SELECT token, chat_id FROM subscriptions '
+                    'ORDER BY rowid'
+                )
+            ]
+        if not subscriptions and settings['PRAKTIKUM_TOKEN'] and (
+                settings['TELEGRAM_CHAT_ID']):
+            subscriptions = [Subscription(settings['PRAKTIKUM_TOKEN'],
+                                          settings['TELEGRAM_CHAT_ID'])]
+        if not subscriptions:
+            raise ValueError(NO_SUBSCRIPTIONS_MESSAGE)
+        return Config(subscriptions, settings)
+
+    def close(self):
+        self.connection.close()
+
+
+def config_source():
+    """The configured source, None when nothing can change at runtime."""
+    from engine import SUBSCRIPTIONS_FILE
+
+    if CONFIG_DATABASE:
+        return SqliteSource(CONFIG_DATABASE)
+    if CONFIG_FILE or SUBSCRIPTIONS_FILE:
+        return FileSource(CONFIG_FILE, SUBSCRIPTIONS_FILE)
+    return None
+
+
+class ConfigWatcher:
+    """Applying changes of a config source to a running engine.
+
+    New subscriptions are added and removed ones stop being polled after
+    their poll in flight; queued messages are still delivered. Sessions,
+    timestamps and statuses of the remaining tokens are kept, and the
+    Telegram client is rebuilt only when its token changes.
+    """
+
+    def __init__(self, source, engine, shard=None):
+        self.source = source
+        self.engine = engine
+        self.shard = shard
+        self.version = None
+        self.config = Config((), default_settings())
+
+    def check(self):
+        """The new config when the source has changed, None otherwise."""
+        version = self.source.version()
+        if version == self.version:
+            return None
+        config = self.source.load()
+        self.version = version
+        return config
+
+    def apply(self, config):
+        """Applying a config, returns added and removed subscriptions."""
+        previous = self.config
+        self.config = config
+        changed = [name for name in SETTINGS
+                   if config.settings[name] != previous.settings[name]]
+        self.apply_settings(config.settings, changed)
+        if self.shard is not None:
+            added, removed = self.shard.update(config.subscriptions)
+        else:
+            added, removed = self.apply_subscriptions(
+                previous.subscriptions, config.subscriptions
+            )
+        logging.info(LazyMessage(
+            CONFIG_APPLIED_MESSAGE, added=len(added), removed=len(removed),
+            settings=', '.join(changed) or '-'
+        ))
+        return added, removed
+
+    def apply_subscriptions(self, previous, current):
+        kept = set(current)
+        removed = [subscription for subscription in previous
+                   if subscription not in kept]
+        known = set(previous)
+        added = [subscription for subscription in current
+                 if subscription not in known]
+        for subscription in removed:
+            self.engine.remove_subscription(subscription)
+        for subscription in added:
+            self.engine.add_subscription(subscription)
+        return added, removed
+
+    def apply_settings(self, settings, changed):
+        from webhook import WEBHOOK_PORT
+
+        if 'VERDICTS' in changed:
+            homework.VERDICTS = settings['VERDICTS']
+            homework.render_status.cache_clear()
+        if 'RETRY_TIME' in changed or 'ERROR_RETRY_TIME' in changed:
+            if WEBHOOK_PORT is None:
+                self.engine.set_cadence(
+                    settings['RETRY_TIME'], settings['ERROR_RETRY_TIME']
+                )
+            else:
+                logging.warning(CADENCE_IGNORED_MESSAGE)
+        if 'TELEGRAM_TOKEN' in changed and isinstance(self.engine.bot,
+                                                      LazyClient):
+            from engine import MAX_IN_FLIGHT
+
+            self.engine.bot.reset(partial(
+                homework.make_bot, settings['TELEGRAM_TOKEN'], MAX_IN_FLIGHT
+            ))
+
+    def load(self):
+        """Applying the current config of the source."""
+        config = self.check()
+        if config is not None:
+            self.apply(config)
+        return self.config
+
+    async def run(self, interval=CONFIG_POLL_INTERVAL):
+        """Checking the source for changes every `interval` seconds."""
+        loop = asyncio.get_running_loop()
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                config = await loop.run_in_executor(
+                    self.engine.executor, self.check
+                )
+            except (OSError, ValueError, sqlite3.Error) as error:
+                logging.error(LazyMessage(CONFIG_ERROR_MESSAGE, error=error))
+                continue
+            if config is not None:
+                self.apply(config)
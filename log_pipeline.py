@@ -0,0 +1,134 @@
+import atexit
+import logging
+import os
+import queue
+import re
+import time
+from logging.handlers import (QueueHandler, QueueListener, RotatingFileHandler,
+                              TimedRotatingFileHandler)
+
+LOG_LEVEL = os.getenv('LOG_LEVEL')
+LOG_FORMAT = '%(asctime)s, %(levelname)s, %(message)s, %(name)s'
+LOG_MAX_BYTES = int(os.getenv('LOG_MAX_BYTES', 10 * 1024 * 1024))
+LOG_BACKUP_COUNT = int(os.getenv('LOG_BACKUP_COUNT', 5))
+LOG_ROTATE_WHEN = os.getenv('LOG_ROTATE_WHEN')
+LOG_DEDUP_WINDOW = float(os.getenv('LOG_DEDUP_WINDOW', 60))
+LOG_QUEUE_SIZE = int(os.getenv('LOG_QUEUE_SIZE', 10000))
+DEDUP_KEYS_LIMIT = 10000
+REPEATED_MESSAGE = '(повторилось ещё {count} раз)'
+SECRETS = (
+    (re.compile(r'(OAuth\s+)[^\s\'"]+'), r'\1***'),
+    (re.compile(r'(bot\d+:)[\w-]+'), r'\1***'),
+)
+
+
+class LazyMessage:
+    """`str.format` message rendered only if the record is written."""
+
+    __slots__ = ('message', 'kwargs')
+
+    def __init__(self, message, **kwargs):
+        self.message = message
+        self.kwargs = kwargs
+
+    def __str__(self):
+        return self.message.format(**self.kwargs)
+
+
+def redact(text):
+    """Hiding OAuth and bot tokens."""
+    for pattern, replacement in SECRETS:
+        text = pattern.sub(replacement, text)
+    return text
+
+
+class RedactingFormatter(logging.Formatter):
+    """Formatter that never writes tokens, tracebacks included."""
+
+    def format(self, record):
+        return redact(super().format(record))
+
+
+class DuplicateFilter(logging.Filter):
+    """Suppressing identical warnings and errors within a time window."""
+
+    def __init__(self, window=LOG_DEDUP_WINDOW, clock=time.monotonic):
+        super().__init__()
+        self.window = window
+        self.clock = clock
+        self.seen = {}
+
+    def filter(self, record):
+        if record.levelno < logging.WARNING or not self.window:
+            return True
+        message = record.getMessage()
+        key = (record.levelno, message)
+        now = self.clock()
+        entry = self.seen.get(key)
+        if entry is not None and now - entry[0] < self.window:
+            entry[1] += 1
+            return False
+        if len(self.seen) >= DEDUP_KEYS_LIMIT:
+            self.seen = {
+                key: entry for key, entry in self.seen.items()
+                if now - entry[0] < self.window
+            }
+        self.seen[key] = [now, 0]
+        if entry is not None and entry[1]:
+            record.msg = ' '.join(
+                (message, REPEATED_MESSAGE.format(count=entry[1]))
+            )
+            record.args = None
+        return True
+
+
+class LazyQueueHandler(QueueHandler):
+    """Queue handler that leaves formatting to the writer thread."""
+
+    def __init__(self, log_queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record):
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+def make_file_handler(filename, max_bytes=LOG_MAX_BYTES,
+                      backup_count=LOG_BACKUP_COUNT, when=LOG_ROTATE_WHEN):
+    """Rotating by time when `when` is set, by size otherwise."""
+    if when:
+        return TimedRotatingFileHandler(
+            filename, when=when, backupCount=backup_count,
+            encoding='utf-8', delay=True
+        )
+    return RotatingFileHandler(
+        filename, maxBytes=max_bytes, backupCount=backup_count,
+        encoding='utf-8', delay=True
+    )
+
+
+def configure_logging(filename, level=logging.DEBUG, handler=None,
+                      window=LOG_DEDUP_WINDOW):
+    """Routing the root logger through a queue to a background writer.
+
+    `LOG_LEVEL` overrides the level chosen by the entry point.
+    """
+    handler = handler or make_file_handler(filename)
+    handler.setFormatter(RedactingFormatter(LOG_FORMAT))
+    handler.addFilter(DuplicateFilter(window))
+    log_queue = queue.Queue(LOG_QUEUE_SIZE)
+    root = logging.getLogger()
+    for old in root.handlers[:]:
+        root.removeHandler(old)
+    root.addHandler(LazyQueueHandler(log_queue))
+    root.setLevel(LOG_LEVEL or level)
+    listener = QueueListener(log_queue, handler, respect_handler_level=True)
+    listener.start()
+    atexit.register(listener.stop)
+    return listener
@@ -0,0 +1,216 @@
+import os
+import threading
+import time
+from bisect import bisect_left
+
+METRICS_PORT = os.getenv('METRICS_PORT')
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5,
+                   1.0, 2.5, 5.0, 10.0)
+
+
+def format_labels(names, values, extra=''):
+    pairs = [f'{name}="{value}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+class Counter:
+    """Monotonic counter with labels."""
+
+    kind = 'counter'
+
+    def __init__(self, name, documentation, labels=()):
+        self.name = name
+        self.documentation = documentation
+        self.labels = tuple(labels)
+        self.values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *labels, amount=1):
+        with self._lock:
+            self.values[labels] = self.values.get(labels, 0) + amount
+
+    def get(self, *labels):
+        return self.values.get(labels, 0)
+
+    def samples(self):
+        with self._lock:
+            values = list(self.values.items())
+        for labels, value in values:
+            yield self.name + format_labels(self.labels, labels), value
+
+
+class Histogram:
+    """Cumulative histogram with labels."""
+
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, labels=(),
+                 buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labels = tuple(labels)
+        self.buckets = tuple(buckets)
+        self.values = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, *labels):
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            state = self.values.get(labels)
+            if state is None:
+                state = self.values[labels] = [
+                    [0] * (len(self.buckets) + 1), 0.0, 0
+                ]
+            state[0][index] += 1
+            state[1] += value
+            state[2] += 1
+
+    def count(self, *labels):
+        state = self.values.get(labels)
+        return 0 if state is None else state[2]
+
+    def samples(self):
+        with self._lock:
+            values = [(labels, (list(state[0]), state[1], state[2]))
+                      for labels, state in self.values.items()]
+        for labels, (counts, total, count) in values:
+            cumulative = 0
+            bounds = [str(bound) for bound in self.buckets] + ['+Inf']
+            for bound, bucket_count in zip(bounds, counts):
+                cumulative += bucket_count
+                yield self.name + '_bucket' + format_labels(
+                    self.labels, labels, f'le="{bound}"'
+                ), cumulative
+            yield self.name + '_sum' + format_labels(
+                self.labels, labels
+            ), total
+            yield self.name + '_count' + format_labels(
+                self.labels, labels
+            ), count
+
+
+class Registry:
+    """In-process collection of metrics."""
+
+    def __init__(self):
+        self.metrics = {}
+        self._lock = threading.Lock()
+
+    def register(self, metric):
+        with self._lock:
+            return self.metrics.setdefault(metric.name, metric)
+
+    def counter(self, name, documentation, labels=()):
+        return self.register(Counter(name, documentation, labels))
+
+    def histogram(self, name, documentation, labels=(),
+                  buckets=LATENCY_BUCKETS):
+        return self.register(Histogram(name, documentation, labels, buckets))
+
+    def exposition(self):
+        """Rendering all metrics in the Prometheus text format."""
+        lines = []
+        for metric in list(self.metrics.values()):
+            lines.append(f'# HELP {metric.name} {metric.documentation}')
+            lines.append(f'# TYPE {metric.name} {metric.kind}')
+            lines.extend(f'{name} {value}' for name, value in metric.samples())
+        return '\n'.join(lines) + '\n'
+
+
+REGISTRY = Registry()
+STAGE_SECONDS = REGISTRY.histogram(
+    'homework_stage_seconds',
+    'Latency of every stage of the poll cycle.',
+    ('stage', 'outcome')
+)
+API_ERROR_KEYS = REGISTRY.counter(
+    'homework_api_error_keys_total',
+    'Answers of the API containing an error key.',
+    ('key',)
+)
+UNEXPECTED_STATUSES = REGISTRY.counter(
+    'homework_unexpected_statuses_total',
+    'Homeworks with a status missing from VERDICTS.'
+)
+RESPONSE_CACHE = REGISTRY.counter(
+    'homework_response_cache_total',
+    'Polls by outcome of the response cache: not_modified, same_body, miss.',
+    ('result',)
+)
+CIRCUIT_REJECTED = REGISTRY.counter(
+    'homework_circuit_rejected_total',
+    'Calls rejected by an open circuit breaker.',
+    ('circuit',)
+)
+CIRCUIT_TRANSITIONS = REGISTRY.counter(
+    'homework_circuit_transitions_total',
+    'Circuit breaker state changes.',
+    ('circuit', 'state')
+)
+WEBHOOK_EVENTS = REGISTRY.counter(
+    'homework_webhook_events_total',
+    'Pushed events by outcome: accepted, invalid, unknown, forbidden.',
+    ('outcome',)
+)
+
+
+class Stage:
+    """Times a block and records it with its outcome."""
+
+    __slots__ = ('name', 'outcome', 'started')
+
+    def __init__(self, name):
+        self.name = name
+        self.outcome = None
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        if self.outcome is None:
+            self.outcome = 'ok' if exc_type is None else exc_type.__name__
+        STAGE_SECONDS.observe(
+            time.perf_counter() - self.started,
+            self.name,
+            self.outcome
+        )
+        return False
+
+
+def make_handler(registry=REGISTRY):
+    """Building the `/metrics` handler, `http.server` is imported only here."""
+    from http.server import BaseHTTPRequestHandler
+
+    class MetricsHandler(BaseHTTPRequestHandler):
+
+        def do_GET(self):
+            if self.path.split('?')[0] != '/metrics':
+                self.send_error(404)
+                return
+            body = registry.exposition().encode()
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/plain; version=0.0.4')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    return MetricsHandler
+
+
+def start_http_server(port=METRICS_PORT, address='127.0.0.1',
+                      registry=REGISTRY):
+    """Serving `/metrics` from a daemon thread, None when port is unset."""
+    if port is None:
+        return None
+    from http.server import ThreadingHTTPServer
+
+    server = ThreadingHTTPServer((address, int(port)), make_handler(registry))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
@@ -0,0 +1,261 @@
+import heapq
+import itertools
+import os
+import threading
+import time
+
+from circuit import CircuitOpenError, log_error
+from log_pipeline import LazyMessage
+
+GLOBAL_RATE = float(os.getenv('TELEGRAM_GLOBAL_RATE', 25))
+CHAT_RATE = float(os.getenv('TELEGRAM_CHAT_RATE', 1))
+CHAT_BURST = 3
+SENDER_WORKERS = int(os.getenv('SENDER_WORKERS', 4))
+FINAL_STATUSES = ('approved', 'rejected')
+COALESCE_SEPARATOR = '\n\n'
+TELEGRAM_MESSAGE_LIMIT = 4096
+SEND_ERROR_MESSAGE = ('Не удалось отправить сообщение в чат \"{chat_id}\". '
+                      'Ошибка: \"{error}\".')
+
+
+def message_priority(status):
+    """Final verdicts go before `reviewing` notifications."""
+    return 0 if status in FINAL_STATUSES else 1
+
+
+def split_message(message, limit=TELEGRAM_MESSAGE_LIMIT):
+    """Parts of at most `limit` characters, cut at line breaks if possible."""
+    parts = []
+    while len(message) > limit:
+        cut = message.rfind('\n', 0, limit + 1)
+        if cut <= 0:
+            cut = limit
+        parts.append(message[:cut])
+        message = message[cut:].lstrip('\n')
+    parts.append(message)
+    return parts
+
+
+class TokenBucket:
+    """Classic token bucket, safe to share between threads."""
+
+    def __init__(self, rate, capacity=1, clock=time.monotonic):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.clock = clock
+        self.updated = clock()
+        self._lock = threading.Lock()
+
+    def _refill(self):
+        now = self.clock()
+        self.tokens = min(
+            self.capacity,
+            self.tokens + (now - self.updated) * self.rate
+        )
+        self.updated = now
+
+    def delay(self):
+        """Seconds until a token is available, without taking it."""
+        with self._lock:
+            self._refill()
+            return max(0.0, (1 - self.tokens) / self.rate)
+
+    def take(self):
+        """Taking a token, returns 0 or the seconds to wait for one."""
+        with self._lock:
+            self._refill()
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return 0.0
+            return (1 - self.tokens) / self.rate
+
+
+class OutboundQueue:
+    """Rate-limited, coalescing queue of outgoing Telegram messages.
+
+    Messages of a chat are merged while the text fits `message_limit`;
+    longer messages are split, and the outbox id goes with the last part.
+    Errors for which `is_permanent(error)` is true are not retried; an open
+    circuit and errors for which `is_transient(error)` is true do not count
+    as delivery attempts, so outages of any length are flushed afterwards.
+    """
+
+    def __init__(self, send, global_rate=GLOBAL_RATE, chat_rate=CHAT_RATE,
+                 chat_burst=CHAT_BURST, clock=time.monotonic,
+                 sleep=time.sleep, outbox=None,
+                 message_limit=TELEGRAM_MESSAGE_LIMIT, is_permanent=None,
+                 is_transient=None):
+        self.send = send
+        self.outbox = outbox
+        self.is_permanent = is_permanent
+        self.is_transient = is_transient
+        self.message_limit = message_limit
+        self.global_bucket = TokenBucket(global_rate, global_rate, clock)
+        self.chat_rate = chat_rate
+        self.chat_burst = chat_burst
+        self.clock = clock
+        self.sleep = sleep
+        self.chat_buckets = {}
+        self.pending = {}
+        self.priorities = {}
+        self.heap = []
+        self.sent = 0
+        self.counter = itertools.count()
+        self.condition = threading.Condition()
+        self.workers = []
+        self.stopped = False
+
+    def __len__(self):
+        with self.condition:
+            return sum(len(batch) for batch in self.pending.values())
+
+    def put(self, chat_id, message, status=None, outbox_id=None):
+        """Queueing a message, merging it with pending ones for the chat."""
+        priority = message_priority(status)
+        parts = split_message(message, self.message_limit)
+        entries = [(part, None) for part in parts[:-1]]
+        entries.append((parts[-1], outbox_id))
+        with self.condition:
+            if chat_id in self.pending:
+                self.pending[chat_id].extend(entries)
+                if priority >= self.priorities[chat_id]:
+                    return
+            else:
+                self.pending[chat_id] = entries
+            self.priorities[chat_id] = priority
+            heapq.heappush(self.heap, (priority, next(self.counter), chat_id))
+            self.condition.notify()
+
+    def chat_bucket(self, chat_id):
+        bucket = self.chat_buckets.get(chat_id)
+        if bucket is None:
+            bucket = self.chat_buckets[chat_id] = TokenBucket(
+                self.chat_rate, self.chat_burst, self.clock
+            )
+        return bucket
+
+    def _pop_ready(self):
+        """Taking the best chat whose own rate limit allows a message."""
+        postponed = []
+        wait = None
+        found = None
+        while self.heap:
+            entry = heapq.heappop(self.heap)
+            priority, _, chat_id = entry
+            if (chat_id not in self.pending
+                    or self.priorities[chat_id] != priority):
+                continue
+            delay = self.chat_bucket(chat_id).take()
+            if delay == 0:
+                found = chat_id
+                break
+            postponed.append(entry)
+            wait = delay if wait is None else min(wait, delay)
+        for entry in postponed:
+            heapq.heappush(self.heap, entry)
+        return found, wait
+
+    def get(self, wait_for_messages=True):
+        """Waiting for the next coalesced batch of a chat."""
+        with self.condition:
+            while True:
+                chat_id, wait = self._pop_ready()
+                if chat_id is not None:
+                    break
+                if not self.pending and (
+                        self.stopped or not wait_for_messages):
+                    return None
+                self.condition.wait(wait)
+            batch = self.take_batch(chat_id)
+        return (
+            chat_id,
+            COALESCE_SEPARATOR.join(message for message, _ in batch),
+            [id for _, id in batch if id is not None]
+        )
+
+    def take_batch(self, chat_id):
+        """Taking the pending messages of a chat that fit one message.
+
+        The rest stays pending with the same priority.
+        """
+        pending = self.pending[chat_id]
+        size = len(pending[0][0])
+        taken = 1
+        while taken < len(pending):
+            size += len(COALESCE_SEPARATOR) + len(pending[taken][0])
+            if size > self.message_limit:
+                break
+            taken += 1
+        if taken == len(pending):
+            del self.pending[chat_id]
+            del self.priorities[chat_id]
+            return pending
+        self.pending[chat_id] = pending[taken:]
+        heapq.heappush(
+            self.heap, (self.priorities[chat_id], next(self.counter), chat_id)
+        )
+        self.condition.notify()
+        return pending[:taken]
+
+    def deliver(self, chat_id, text, outbox_ids=()):
+        delay = self.global_bucket.take()
+        while delay:
+            self.sleep(delay)
+            delay = self.global_bucket.take()
+        try:
+            self.send(chat_id, text)
+        except Exception as error:
+            log_error(
+                LazyMessage(SEND_ERROR_MESSAGE, chat_id=chat_id, error=error),
+                error
+            )
+            if self.outbox is not None and outbox_ids:
+                self.settle_failure(outbox_ids, error)
+            return False
+        if self.outbox is not None and outbox_ids:
+            self.outbox.ack(outbox_ids)
+        with self.condition:
+            self.sent += 1
+        return True
+
+    def settle_failure(self, outbox_ids, error):
+        """Counting a failed attempt unless the error is transient."""
+        if isinstance(error, CircuitOpenError) or (
+                self.is_transient and self.is_transient(error)):
+            self.outbox.release(outbox_ids)
+            return
+        self.outbox.fail(outbox_ids, permanent=bool(
+            self.is_permanent and self.is_permanent(error)
+        ))
+
+    def drain(self):
+        """Sending everything queued right now in the calling thread."""
+        while True:
+            batch = self.get(wait_for_messages=False)
+            if batch is None:
+                return
+            self.deliver(*batch)
+
+    def work(self):
+        while True:
+            batch = self.get()
+            if batch is None:
+                return
+            self.deliver(*batch)
+
+    def start(self, workers=SENDER_WORKERS):
+        """Starting background sender threads."""
+        for _ in range(workers):
+            worker = threading.Thread(target=self.work, daemon=True)
+            worker.start()
+            self.workers.append(worker)
+
+    def stop(self, timeout=None):
+        """Delivering what is pending and stopping the workers."""
+        with self.condition:
+            self.stopped = True
+            self.condition.notify_all()
+        for worker in self.workers:
+            worker.join(timeout)
+        self.workers = []
@@ -0,0 +1,140 @@
+import os
+import sqlite3
+import threading
+import time
+
+OUTBOX_FILE = os.getenv('OUTBOX_FILE', 'outbox.sqlite3')
+OUTBOX_RETRY_INTERVAL = float(os.getenv('OUTBOX_RETRY_INTERVAL', 60))
+OUTBOX_BATCH_SIZE = 500
+OUTBOX_KEEP_DELIVERED = 7 * 24 * 60 * 60
+OUTBOX_MAX_ATTEMPTS = int(os.getenv('OUTBOX_MAX_ATTEMPTS', 20))
+OUTBOX_PRUNE_INTERVAL = float(os.getenv('OUTBOX_PRUNE_INTERVAL', 60 * 60))
+
+
+class Outbox:
+    """Durable notifications, acknowledged only after Telegram accepts them.
+
+    Rows that failed `max_attempts` times or were rejected by Telegram are
+    marked `dead` and are not retried; they are pruned like delivered ones.
+    Transient failures are `release`d and do not count as attempts.
+    """
+
+    def __init__(self, path=OUTBOX_FILE, max_attempts=OUTBOX_MAX_ATTEMPTS):
+        self.max_attempts = max_attempts
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        self.connection.execute('PRAGMA journal_mode=WAL')
+        with self.connection:
+            self.connection.execute(
+                'CREATE TABLE IF NOT EXISTS outbox ('
+                'id INTEGER PRIMARY KEY AUTOINCREMENT, '
+                'dedup_key TEXT NOT NULL UNIQUE, '
+                'chat_id TEXT NOT NULL, '
+                'status TEXT, '
+                'message TEXT NOT NULL, '
+                'created REAL NOT NULL, '
+                'attempts INTEGER NOT NULL DEFAULT 0, '
+                'delivered REAL, '
+                'dead REAL)'
+            )
+            columns = {row[1] for row in self.connection.execute(
+                'PRAGMA table_info(outbox)'
+            )}
+            if 'dead' not in columns:
+                self.connection.execute(
+                    'ALTER TABLE outbox ADD COLUMN dead REAL'
+                )
+            self.connection.execute(
+                'CREATE INDEX IF NOT EXISTS outbox_pending '
+                'ON outbox (delivered, id)'
+            )
+        self.queued = set()
+        self._lock = threading.Lock()
+
+    def add(self, chat_id, notifications):
+        """Storing notifications, returns (id, notification) of new ones."""
+        added = []
+        now = time.time()
+        with self._lock, self.connection:
+            for notification in notifications:
+                cursor = self.connection.execute(
+                    'INSERT OR IGNORE INTO outbox '
+                    '(dedup_key, chat_id, status, message, created) '
+                    'VALUES (?, ?, ?, ?, ?)',
+                    (f'{chat_id}:{notification.key}', str(chat_id),
+                     notification.status, notification.message, now)
+                )
+                if cursor.rowcount:
+                    added.append((cursor.lastrowid, notification))
+                    self.queued.add(cursor.lastrowid)
+        return added
+
+    def pending(self, limit=OUTBOX_BATCH_SIZE):
+        """Undelivered rows that are not waiting in the outbound queue."""
+        with self._lock:
+            rows = self.connection.execute(
+                'SELECT id, chat_id, status, message FROM outbox '
+                'WHERE delivered IS NULL AND dead IS NULL '
+                'ORDER BY id LIMIT ?',
+                (limit + len(self.queued),)
+            ).fetchall()
+            rows = [row for row in rows if row[0] not in self.queued][:limit]
+            self.queued.update(row[0] for row in rows)
+        return rows
+
+    def ack(self, ids):
+        """Marking rows as delivered in one transaction."""
+        now = time.time()
+        with self._lock, self.connection:
+            self.connection.executemany(
+                'UPDATE outbox SET delivered = ?, attempts = attempts + 1 '
+                'WHERE id = ?',
+                [(now, id) for id in ids]
+            )
+            self.queued.difference_update(ids)
+
+    def fail(self, ids, permanent=False):
+        """Leaving rows for the next retry, or marking them dead.
+
+        Rows die when the error is `permanent` or attempts run out.
+        """
+        now = time.time()
+        with self._lock, self.connection:
+            self.connection.executemany(
+                'UPDATE outbox SET attempts = attempts + 1, '
+                'dead = CASE WHEN ? OR attempts + 1 >= ? THEN ? END '
+                'WHERE id = ?',
+                [(permanent, self.max_attempts, now, id) for id in ids]
+            )
+            self.queued.difference_update(ids)
+
+    def release(self, ids):
+        """Leaving rows for the next retry without counting an attempt."""
+        with self._lock:
+            self.queued.difference_update(ids)
+
+    def dead(self):
+        """Rows that will not be retried."""
+        with self._lock:
+            return self.connection.execute(
+                'SELECT id, chat_id, status, message, attempts FROM outbox '
+                'WHERE dead IS NOT NULL ORDER BY id'
+            ).fetchall()
+
+    def requeue(self, outbound, limit=OUTBOX_BATCH_SIZE):
+        """Handing undelivered rows to the outbound queue in one batch."""
+        rows = self.pending(limit)
+        for id, chat_id, status, message in rows:
+            outbound.put(chat_id, message, status, id)
+        return len(rows)
+
+    def prune(self, older_than=OUTBOX_KEEP_DELIVERED):
+        """Dropping old delivered and dead rows with their dedup keys."""
+        threshold = time.time() - older_than
+        with self._lock, self.connection:
+            return self.connection.execute(
+                'DELETE FROM outbox WHERE delivered < ? OR dead < ?',
+                (threshold, threshold)
+            ).rowcount
+
+    def close(self):
+        self.connection.close()
@@ -0,0 +1,222 @@
+"""Sampling profiler of poll cycles.
+
+cProfile, pstats and tracemalloc are imported on first use, so importing
+the bot does not load them while profiling is off.
+"""
+import itertools
+import logging
+import os
+import signal
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+from functools import partial
+
+from log_pipeline import LazyMessage
+
+PROFILE_DIR = os.getenv('PROFILE_DIR', 'profiles')
+PROFILE_EVERY = int(os.getenv('PROFILE_EVERY', 0))
+PROFILE_MEMORY_EVERY = int(os.getenv('PROFILE_MEMORY_EVERY', 0))
+PROFILE_DUMP_INTERVAL = float(os.getenv('PROFILE_DUMP_INTERVAL', 300))
+PROFILE_BURST = int(os.getenv('PROFILE_BURST', 100))
+MEMORY_FRAMES = 10
+MEMORY_TOP = 25
+PROFILE_DUMPED_MESSAGE = 'Профиль {cycles} циклов записан: {path}'
+MEMORY_DUMPED_MESSAGE = 'Разница снимков памяти записана: {path}'
+
+PROFILE_SIGNALS = ('SIGUSR1', 'SIGUSR2')
+NOT_SAMPLED = nullcontext()
+
+
+def snapshot_filters():
+    """Filters dropping allocations of tracemalloc and the import system."""
+    import tracemalloc
+
+    return (
+        tracemalloc.Filter(False, tracemalloc.__file__),
+        tracemalloc.Filter(False, '<frozen importlib._bootstrap*>'),
+    )
+
+
+class Profiler:
+    """Opt-in sampling of poll cycles with cProfile and tracemalloc.
+
+    Every `every`-th cycle and the next `PROFILE_BURST` cycles after SIGUSR1
+    are profiled; profiles are merged and dumped every `dump_interval`
+    seconds. Every `memory_every`-th cycle and after SIGUSR2 the traced
+    memory is compared with the previous snapshot. When nothing is enabled
+    `cycle` and `wrap` cost an attribute check.
+    """
+
+    def __init__(self, path=PROFILE_DIR, every=PROFILE_EVERY,
+                 memory_every=PROFILE_MEMORY_EVERY,
+                 dump_interval=PROFILE_DUMP_INTERVAL, burst=PROFILE_BURST,
+                 clock=time.monotonic):
+        self.path = path
+        self.every = every
+        self.memory_every = memory_every
+        self.dump_interval = dump_interval
+        self.burst = burst
+        self.clock = clock
+        self.pending = 0
+        self.snapshot_requested = False
+        self.profiles = []
+        self.snapshot = None
+        self.started_tracing = False
+        self.dumped = clock()
+        self.cycles = itertools.count(1)
+        self._lock = threading.Lock()
+        if memory_every:
+            self.start_tracing()
+
+    @property
+    def active(self):
+        return bool(self.every or self.memory_every or self.pending
+                    or self.snapshot_requested)
+
+    def install_signals(self):
+        """SIGUSR1 profiles the next cycles, SIGUSR2 diffs memory."""
+        for name, handler in zip(PROFILE_SIGNALS, (self.request_profile,
+                                                   self.request_snapshot)):
+            if hasattr(signal, name):
+                signal.signal(getattr(signal, name), handler)
+
+    def request_profile(self, *signal_args):
+        self.pending = self.burst
+
+    def request_snapshot(self, *signal_args):
+        self.snapshot_requested = True
+
+    def cycle(self):
+        """Context of one poll cycle, sampled when profiling is enabled."""
+        if not self.active:
+            return NOT_SAMPLED
+        return self.sampled()
+
+    def wrap(self, function):
+        """`function` itself, or a sampled call when profiling is enabled."""
+        if not self.active:
+            return function
+        return partial(self.call, function)
+
+    def call(self, function, *args, **kwargs):
+        with self.sampled():
+            return function(*args, **kwargs)
+
+    @contextmanager
+    def sampled(self):
+        number = next(self.cycles)
+        profile = None
+        if self.pending or (self.every and not number % self.every):
+            import cProfile
+
+            profile = cProfile.Profile()
+            try:
+                profile.enable()
+            except ValueError:
+                profile = None
+        try:
+            yield
+        finally:
+            if profile is not None:
+                profile.disable()
+                self.collect(profile)
+            self.after_cycle(number)
+
+    def collect(self, profile):
+        with self._lock:
+            self.profiles.append(profile)
+            burst_done = self.pending == 1
+            self.pending = max(0, self.pending - 1)
+        if burst_done:
+            self.dump()
+
+    def after_cycle(self, number):
+        if self.snapshot_requested or (
+                self.memory_every and not number % self.memory_every):
+            self.snapshot_requested = False
+            self.diff_memory()
+        if self.profiles and (
+                self.clock() - self.dumped >= self.dump_interval):
+            self.dump()
+
+    def file_path(self, prefix, suffix):
+        os.makedirs(self.path, exist_ok=True)
+        return os.path.join(self.path, '{}-{}-{}{}'.format(
+            prefix, os.getpid(), time.strftime('%Y%m%d-%H%M%S'), suffix
+        ))
+
+    def dump(self):
+        """Writing merged profiles to a pstats file, returns its path."""
+        with self._lock:
+            profiles, self.profiles = self.profiles, []
+            self.dumped = self.clock()
+        if not profiles:
+            return None
+        import pstats
+
+        stats = pstats.Stats(profiles[0])
+        for profile in profiles[1:]:
+            stats.add(profile)
+        path = self.file_path('profile', '.prof')
+        stats.dump_stats(path)
+        logging.info(LazyMessage(
+            PROFILE_DUMPED_MESSAGE, cycles=len(profiles), path=path
+        ))
+        return path
+
+    def start_tracing(self):
+        import tracemalloc
+
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(MEMORY_FRAMES)
+            self.started_tracing = True
+
+    def diff_memory(self):
+        """Writing the largest allocation changes since the last snapshot.
+
+        The first request starts tracing and takes the baseline.
+        """
+        import tracemalloc
+
+        with self._lock:
+            self.start_tracing()
+            snapshot = tracemalloc.take_snapshot().filter_traces(
+                snapshot_filters()
+            )
+            previous, self.snapshot = self.snapshot, snapshot
+        if previous is None:
+            return None
+        path = self.file_path('memory', '.txt')
+        with open(path, 'w', encoding='utf-8') as file:
+            for difference in snapshot.compare_to(
+                    previous, 'lineno')[:MEMORY_TOP]:
+                file.write(f'{difference}\n')
+        logging.info(LazyMessage(MEMORY_DUMPED_MESSAGE, path=path))
+        return path
+
+    def close(self):
+        """Dumping the collected profiles and stopping own tracing."""
+        self.dump()
+        if self.started_tracing:
+            import tracemalloc
+
+            tracemalloc.stop()
+            self.started_tracing = False
+            self.snapshot = None
+
+
+def forward_signals(processes):
+    """Passing profiling signals of a supervisor on to its live workers."""
+    supervisor = os.getpid()
+
+    def forward(signum, frame):
+        if os.getpid() != supervisor:
+            return
+        for process in list(processes.values()):
+            if process.is_alive():
+                os.kill(process.pid, signum)
+
+    for name in PROFILE_SIGNALS:
+        if hasattr(signal, name):
+            signal.signal(getattr(signal, name), forward)
@@ -0,0 +1,109 @@
+import os
+import struct
+import threading
+import time
+import zlib
+from collections import namedtuple
+
+RECORD_FILE = os.getenv('RECORD_FILE')
+RECORD_HEADER = struct.Struct('>dfqHBHI')
+COMPRESSED = 1
+
+Record = namedtuple(
+    'Record', ['at', 'elapsed', 'from_date', 'status_code', 'key', 'body']
+)
+
+
+def authorization_key(headers):
+    """Token hash of a request, the token itself is never written."""
+    from checkpoints import token_key
+
+    return token_key(headers.get('Authorization', '').split(' ')[-1])
+
+
+def pack_record(record):
+    """Packing a record, bodies are compressed when it makes them smaller."""
+    key = record.key.encode()
+    body = zlib.compress(record.body)
+    flags = COMPRESSED
+    if len(body) >= len(record.body):
+        body, flags = record.body, 0
+    return b''.join((
+        RECORD_HEADER.pack(record.at, record.elapsed, record.from_date,
+                           record.status_code, flags, len(key), len(body)),
+        key,
+        body
+    ))
+
+
+def read_records(path):
+    """Reading records from an append-only capture, a torn tail is skipped."""
+    with open(path, 'rb') as file:
+        while True:
+            header = file.read(RECORD_HEADER.size)
+            if len(header) < RECORD_HEADER.size:
+                return
+            (at, elapsed, from_date, status_code, flags, key_size,
+             body_size) = RECORD_HEADER.unpack(header)
+            key = file.read(key_size)
+            body = file.read(body_size)
+            if len(body) < body_size:
+                return
+            if flags & COMPRESSED:
+                body = zlib.decompress(body)
+            yield Record(at, elapsed, from_date, status_code, key.decode(),
+                         body)
+
+
+class Recorder:
+    """Appending records to a capture file from many threads."""
+
+    def __init__(self, path=RECORD_FILE):
+        self.file = open(path, 'ab')
+        self.count = 0
+        self._lock = threading.Lock()
+
+    def write(self, record):
+        data = pack_record(record)
+        with self._lock:
+            self.file.write(data)
+            self.file.flush()
+            self.count += 1
+
+    def close(self):
+        with self._lock:
+            self.file.close()
+
+
+class RecordingSession:
+    """Session wrapper capturing every answer of the Practicum API."""
+
+    def __init__(self, session, recorder, clock=time.time):
+        self.session = session
+        self.recorder = recorder
+        self.clock = clock
+
+    def get(self, url, headers, params, **kwargs):
+        started = time.perf_counter()
+        response = self.session.get(url, headers=headers, params=params,
+                                    **kwargs)
+        body = response.content
+        self.recorder.write(Record(
+            self.clock(),
+            time.perf_counter() - started,
+            int(params.get('from_date') or 0),
+            response.status_code,
+            authorization_key(headers),
+            body
+        ))
+        return response
+
+    def __getattr__(self, name):
+        return getattr(self.session, name)
+
+
+def recorded(session, path=RECORD_FILE):
+    """Wrapping the session in a recorder when a capture file is set."""
+    if path is None:
+        return session
+    return RecordingSession(session, Recorder(path))
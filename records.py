@@ -0,0 +1,50 @@
+FIELDS = ('id', 'homework_name', 'status', 'date_updated', 'lesson_name',
+          'reviewer_comment')
+
+
+class HomeworkRecord:
+    """Homework with only the fields the bot uses, read like a dict.
+
+    Fields missing from the answer stay unset, so `record['status']` raises
+    `KeyError` and `record.get('status')` returns the default, as for the
+    decoded JSON object.
+    """
+
+    __slots__ = FIELDS
+
+    @classmethod
+    def from_dict(cls, homework):
+        record = cls()
+        for field in FIELDS:
+            if field in homework:
+                setattr(record, field, homework[field])
+        return record
+
+    def __getitem__(self, field):
+        try:
+            return getattr(self, field)
+        except AttributeError:
+            raise KeyError(field) from None
+
+    def __contains__(self, field):
+        return hasattr(self, field)
+
+    def get(self, field, default=None):
+        return getattr(self, field, default)
+
+    def to_dict(self):
+        return {field: getattr(self, field) for field in FIELDS
+                if hasattr(self, field)}
+
+    def __repr__(self):
+        return f'HomeworkRecord({self.to_dict()!r})'
+
+
+def record_hook(value):
+    """`object_hook` turning decoded homeworks into records.
+
+    Any object with a `status` is a homework in the API answers.
+    """
+    if 'status' in value:
+        return HomeworkRecord.from_dict(value)
+    return value
@@ -0,0 +1,69 @@
+import hashlib
+import os
+import re
+import threading
+from collections import OrderedDict, namedtuple
+
+RESPONSE_CACHE_SIZE = int(os.getenv('RESPONSE_CACHE_SIZE', 10000))
+CURRENT_DATE = re.compile(rb'"current_date"\s*:\s*(-?\d+)')
+
+Validators = namedtuple('Validators', ['etag', 'last_modified', 'digest'])
+
+
+def body_digest(body):
+    """Digest of an answer without `current_date`, and `current_date`.
+
+    `current_date` changes on every poll, so it is left out of the digest
+    and read with a regular expression instead of decoding the body.
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    match = CURRENT_DATE.search(body)
+    if match is None:
+        digest.update(body)
+        return digest.digest(), None
+    view = memoryview(body)
+    digest.update(view[:match.start()])
+    digest.update(view[match.end():])
+    return digest.digest(), int(match.group(1))
+
+
+def conditional_headers(validators):
+    """`If-None-Match`/`If-Modified-Since` for the last answer, if any."""
+    headers = {}
+    if validators is None:
+        return headers
+    if validators.etag:
+        headers['If-None-Match'] = validators.etag
+    if validators.last_modified:
+        headers['If-Modified-Since'] = validators.last_modified
+    return headers
+
+
+class ResponseCache:
+    """Validators of the last processed answer per token, LRU bounded."""
+
+    def __init__(self, max_size=RESPONSE_CACHE_SIZE):
+        self.max_size = max_size
+        self.entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.entries)
+
+    def get(self, key):
+        with self._lock:
+            validators = self.entries.get(key)
+            if validators is not None:
+                self.entries.move_to_end(key)
+            return validators
+
+    def put(self, key, validators):
+        with self._lock:
+            self.entries[key] = validators
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_size:
+                self.entries.popitem(last=False)
+
+    def discard(self, key):
+        with self._lock:
+            self.entries.pop(key, None)
@@ -0,0 +1,97 @@
+import os
+import random
+import time
+
+REVIEWING_RETRY_TIME = int(os.getenv('REVIEWING_RETRY_TIME', 60))
+IDLE_RETRY_FACTOR = float(os.getenv('IDLE_RETRY_FACTOR', 3))
+MAX_ERROR_RETRY_TIME = int(os.getenv('MAX_ERROR_RETRY_TIME', 1800))
+JITTER = 0.1
+
+
+class SystemClock:
+    """Wall clock, replaced by a fake one in tests."""
+
+    def time(self):
+        return time.time()
+
+    def sleep(self, seconds):
+        time.sleep(seconds)
+
+
+def parse_retry_after(value, now):
+    """Converting a `Retry-After` header into seconds, None if invalid."""
+    if value is None:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    from email.utils import parsedate_to_datetime
+
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - now)
+    except (TypeError, ValueError):
+        return None
+
+
+class PollingPolicy:
+    """Chooses the delay before the next poll of one subscription."""
+
+    def __init__(self, retry_time, error_retry_time,
+                 reviewing_retry_time=REVIEWING_RETRY_TIME,
+                 idle_retry_time=None,
+                 max_error_retry_time=MAX_ERROR_RETRY_TIME,
+                 jitter=JITTER, clock=None, rand=random.random):
+        self.retry_time = retry_time
+        self.reviewing_retry_time = reviewing_retry_time
+        self.configured_idle_retry_time = idle_retry_time
+        self.idle_retry_time = idle_retry_time or (
+            retry_time * IDLE_RETRY_FACTOR
+        )
+        self.error_retry_time = error_retry_time
+        self.max_error_retry_time = max_error_retry_time
+        self.jitter = jitter
+        self.clock = clock or SystemClock()
+        self.rand = rand
+        self.failures = 0
+
+    def set_cadence(self, retry_time, error_retry_time):
+        """Changing base delays, used from the next poll on.
+
+        An explicitly configured `idle_retry_time` is kept.
+        """
+        self.retry_time = retry_time
+        self.idle_retry_time = self.configured_idle_retry_time or (
+            retry_time * IDLE_RETRY_FACTOR
+        )
+        self.error_retry_time = error_retry_time
+
+    def spread(self, delay):
+        return delay * (1 + self.jitter * (2 * self.rand() - 1))
+
+    def on_success(self, statuses=None):
+        """Delay after a successful poll, depends on homeworks in review."""
+        self.failures = 0
+        if statuses is None or len(statuses) == 0:
+            delay = self.retry_time
+        elif statuses.in_review:
+            delay = self.reviewing_retry_time
+        else:
+            delay = self.idle_retry_time
+        return self.spread(delay)
+
+    def on_error(self, error):
+        """Exponential backoff with jitter, never shorter than Retry-After."""
+        self.failures += 1
+        ceiling = min(
+            self.max_error_retry_time,
+            self.error_retry_time * 2 ** (self.failures - 1)
+        )
+        delay = ceiling / 2 + self.rand() * ceiling / 2
+        retry_after = parse_retry_after(
+            getattr(error, 'retry_after', None),
+            self.clock.time()
+        )
+        if retry_after is not None:
+            delay = max(delay, retry_after)
+        return delay
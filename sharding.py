@@ -0,0 +1,384 @@
+import argparse
+import asyncio
+import bisect
+import logging
+import multiprocessing
+import os
+import socket
+import sqlite3
+import threading
+import time
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+
+from checkpoints import token_key
+from log_pipeline import LazyMessage, configure_logging
+from profiling import forward_signals
+
+SHARD_COORDINATOR_FILE = os.getenv('SHARD_COORDINATOR_FILE',
+                                   'coordinator.sqlite3')
+SHARD_WORKERS = int(os.getenv('SHARD_WORKERS', 1))
+SHARD_HEARTBEAT = float(os.getenv('SHARD_HEARTBEAT', 5))
+SHARD_TIMEOUT = float(os.getenv('SHARD_TIMEOUT', 3 * SHARD_HEARTBEAT))
+RING_REPLICAS = 64
+SHARD_MESSAGE = 'Воркер {worker}: токенов {owned}, воркеров {workers}'
+WORKER_DIED_MESSAGE = 'Воркер {number} завершился с кодом {code}, перезапуск'
+EVENT_DROPPED_MESSAGE = (
+    'Воркер {worker}: событие для {account} пропущено, его подберёт опрос'
+)
+
+
+def worker_name(pid=None):
+    """Id of a worker process in the coordinator."""
+    return f'{socket.gethostname()}:{pid or os.getpid()}'
+
+
+def ring_hash(key):
+    return zlib.crc32(key.encode())
+
+
+class HashRing:
+    """Consistent hashing of tokens onto workers."""
+
+    def __init__(self, nodes=(), replicas=RING_REPLICAS):
+        self.replicas = replicas
+        self.points = []
+        self.owners = []
+        for node in sorted(nodes):
+            for replica in range(replicas):
+                point = ring_hash(f'{node}#{replica}')
+                index = bisect.bisect(self.points, point)
+                self.points.insert(index, point)
+                self.owners.insert(index, node)
+
+    def __len__(self):
+        return len(set(self.owners))
+
+    def owner(self, key):
+        """Worker owning a key, None when the ring is empty."""
+        if not self.points:
+            return None
+        index = bisect.bisect(self.points, ring_hash(key))
+        return self.owners[index % len(self.owners)]
+
+
+class Coordinator:
+    """Worker heartbeats and token leases in a shared SQLite file."""
+
+    def __init__(self, path=SHARD_COORDINATOR_FILE, timeout=SHARD_TIMEOUT,
+                 clock=time.time):
+        self.connection = sqlite3.connect(path, timeout=30,
+                                          check_same_thread=False)
+        self.connection.execute('PRAGMA journal_mode=WAL')
+        with self.connection:
+            self.connection.execute(
+                'CREATE TABLE IF NOT EXISTS workers ('
+                'id TEXT PRIMARY KEY, heartbeat REAL NOT NULL)'
+            )
+            self.connection.execute(
+                'CREATE TABLE IF NOT EXISTS leases ('
+                'key TEXT PRIMARY KEY, worker TEXT NOT NULL, '
+                'expires REAL NOT NULL)'
+            )
+        self.timeout = timeout
+        self.clock = clock
+        self._lock = threading.Lock()
+
+    def heartbeat(self, worker):
+        """Marking a worker alive, returns ids of all live workers."""
+        now = self.clock()
+        with self._lock, self.connection:
+            self.connection.execute(
+                'INSERT INTO workers (id, heartbeat) VALUES (?, ?) '
+                'ON CONFLICT(id) DO UPDATE SET heartbeat = excluded.heartbeat',
+                (worker, now)
+            )
+            self.connection.execute(
+                'DELETE FROM workers WHERE heartbeat < ?',
+                (now - self.timeout,)
+            )
+            return [worker for worker, in self.connection.execute(
+                'SELECT id FROM workers ORDER BY id'
+            )]
+
+    def claim(self, worker, keys):
+        """Taking or renewing leases, returns the keys held by the worker.
+
+        A lease of another worker is taken over only after it expires, so
+        two workers with different views of the ring never poll one token.
+        """
+        now = self.clock()
+        with self._lock, self.connection:
+            self.connection.executemany(
+                'INSERT INTO leases (key, worker, expires) VALUES (?, ?, ?) '
+                'ON CONFLICT(key) DO UPDATE SET '
+                'worker = excluded.worker, expires = excluded.expires '
+                'WHERE leases.worker = excluded.worker OR leases.expires < ?',
+                [(key, worker, now + self.timeout, now) for key in keys]
+            )
+            return {key for key, in self.connection.execute(
+                'SELECT key FROM leases WHERE worker = ?', (worker,)
+            )} & set(keys)
+
+    def owner(self, key):
+        """Worker holding a live lease on the key, None otherwise."""
+        with self._lock:
+            row = self.connection.execute(
+                'SELECT worker FROM leases WHERE key = ? AND expires >= ?',
+                (key, self.clock())
+            ).fetchone()
+        return None if row is None else row[0]
+
+    def release(self, worker, keys=None):
+        """Giving leases back, all of the worker's leases by default."""
+        with self._lock, self.connection:
+            if keys is None:
+                self.connection.execute(
+                    'DELETE FROM workers WHERE id = ?', (worker,)
+                )
+                self.connection.execute(
+                    'DELETE FROM leases WHERE worker = ?', (worker,)
+                )
+                return
+            self.connection.executemany(
+                'DELETE FROM leases WHERE key = ? AND worker = ?',
+                [(key, worker) for key in keys]
+            )
+
+    def close(self):
+        self.connection.close()
+
+
+class ShardWorker:
+    """Keeping an engine's subscriptions equal to the worker's shard.
+
+    Coordinator calls run on their own thread, so heartbeats are not queued
+    behind blocking polls in the engine's executor. Until the next renewal
+    the engine skips tokens once the leases may have expired.
+    """
+
+    def __init__(self, engine, subscriptions, coordinator, worker=None,
+                 interval=SHARD_HEARTBEAT):
+        self.engine = engine
+        self.subscriptions = list(subscriptions)
+        self.coordinator = coordinator
+        self.worker = worker or worker_name()
+        self.interval = interval
+        self.owned = set()
+        self.expires = 0.0
+        self.executor = ThreadPoolExecutor(
+            max_workers=1, thread_name_prefix='coordinator'
+        )
+        engine.holds_lease = self.holds_lease
+
+    def holds_lease(self, token):
+        """Whether the leases taken by the last claim are still valid."""
+        return self.coordinator.clock() < self.expires
+
+    def update(self, subscriptions):
+        """Replacing the subscription list, owned tokens follow at once.
+
+        Tokens that are new to the ring are claimed on the next rebalance.
+        Returns added and removed subscriptions of owned tokens.
+        """
+        def owned(subscriptions):
+            return {subscription for subscription in subscriptions
+                    if token_key(subscription.token) in self.owned}
+
+        before = owned(self.subscriptions)
+        self.subscriptions = list(subscriptions)
+        after = owned(self.subscriptions)
+        for subscription in before - after:
+            self.engine.remove_subscription(subscription)
+        for subscription in after - before:
+            self.engine.add_subscription(subscription)
+        return after - before, before - after
+
+    def claim(self):
+        """Heartbeat and leases for tokens the ring assigns to the worker."""
+        started = self.coordinator.clock()
+        ring = HashRing(self.coordinator.heartbeat(self.worker))
+        keys = {}
+        for subscription in self.subscriptions:
+            keys.setdefault(token_key(subscription.token), []).append(
+                subscription
+            )
+        mine = [key for key in keys if ring.owner(key) == self.worker]
+        logging.debug(LazyMessage(
+            SHARD_MESSAGE, worker=self.worker, owned=len(mine),
+            workers=len(ring)
+        ))
+        leased = self.coordinator.claim(self.worker, mine)
+        self.expires = started + self.coordinator.timeout
+        return keys, leased
+
+    def apply(self, keys, leased):
+        """Adding and removing engine subscriptions, returns lost keys."""
+        lost = self.owned - leased
+        for key in lost:
+            for subscription in keys.get(key, ()):
+                self.engine.remove_subscription(subscription)
+        for key in leased - self.owned:
+            for subscription in keys[key]:
+                self.engine.add_subscription(subscription)
+        self.owned = leased
+        return lost
+
+    def release(self, lost):
+        if self.engine.checkpoints is not None:
+            self.engine.checkpoints.flush()
+        self.coordinator.release(self.worker, lost)
+
+    async def finish_polls(self, keys, lost):
+        """Waiting for in-flight polls of tokens handed to other workers."""
+        polls = [self.engine.polls[subscription.token]
+                 for key in lost for subscription in keys.get(key, ())
+                 if subscription.token in self.engine.polls]
+        if polls:
+            await asyncio.wait(polls)
+
+    def rebalance(self):
+        """Syncing owned tokens with the ring and the leases."""
+        lost = self.apply(*self.claim())
+        if lost:
+            self.release(lost)
+        return self.owned
+
+    async def run(self):
+        loop = asyncio.get_running_loop()
+        try:
+            while True:
+                claimed = await loop.run_in_executor(
+                    self.executor, self.claim
+                )
+                lost = self.apply(*claimed)
+                if lost:
+                    await self.finish_polls(claimed[0], lost)
+                    await loop.run_in_executor(
+                        self.executor, self.release, lost
+                    )
+                await asyncio.sleep(self.interval)
+        finally:
+            self.coordinator.release(self.worker)
+            self.executor.shutdown(wait=False)
+
+
+class EventRouter:
+    """Handing webhook events to the worker that polls the token.
+
+    Only the supervisor binds the webhook port; the owner is the worker
+    holding the token's lease, and events reach it through its queue.
+    """
+
+    def __init__(self, coordinator, processes, queues):
+        self.coordinator = coordinator
+        self.processes = processes
+        self.queues = queues
+
+    def push(self, account, homeworks):
+        """Same contract as `PollingEngine.push`."""
+        owner = self.coordinator.owner(account)
+        if owner is None:
+            return False
+        for number, process in list(self.processes.items()):
+            if worker_name(process.pid) == owner and process.is_alive():
+                self.queues[number].put((account, homeworks))
+                return True
+        raise RuntimeError(owner)
+
+
+def forward_events(engine, events):
+    """Pushing events routed by the supervisor into the worker's engine.
+
+    Events the engine cannot take yet are dropped: the reconciliation poll
+    picks the changes up.
+    """
+    for account, homeworks in iter(events.get, None):
+        try:
+            accepted = engine.push(account, homeworks)
+        except RuntimeError:
+            accepted = False
+        if not accepted:
+            logging.warning(LazyMessage(
+                EVENT_DROPPED_MESSAGE, worker=os.getpid(), account=account
+            ))
+
+
+def run_worker(number, path=SHARD_COORDINATOR_FILE, events=None):
+    """Worker process: an engine that only polls its shard."""
+    from engine import build_engine, load_subscriptions
+    from history import HISTORY_DIR
+    from live_config import ConfigWatcher, config_source
+    from metrics import METRICS_PORT
+    from outbox import OUTBOX_FILE
+
+    configure_logging(f'{__file__}.{number}.log', logging.DEBUG)
+    source = config_source()
+    port = None if METRICS_PORT is None else int(METRICS_PORT) + number
+    root, extension = os.path.splitext(OUTBOX_FILE)
+    engine = build_engine(
+        (),
+        metrics_port=port,
+        outbox_path=f'{root}.{number}{extension}',
+        history_path=os.path.join(HISTORY_DIR, f'shard.{number}'),
+        serve_webhook=False
+    )
+    if events is not None:
+        threading.Thread(
+            target=forward_events, args=(engine, events), daemon=True
+        ).start()
+    if source is None:
+        shard = ShardWorker(engine, load_subscriptions(), Coordinator(path))
+        asyncio.run(engine.run(shard.run()))
+        return
+    shard = ShardWorker(engine, (), Coordinator(path))
+    watcher = ConfigWatcher(source, engine, shard)
+    watcher.load()
+    asyncio.run(engine.run(shard.run(), watcher.run()))
+
+
+def main():
+    """Starting shard workers and restarting the ones that die."""
+    parser = argparse.ArgumentParser(description=main.__doc__)
+    parser.add_argument('--workers', type=int, default=SHARD_WORKERS)
+    parser.add_argument('--coordinator', default=SHARD_COORDINATOR_FILE)
+    args = parser.parse_args()
+    configure_logging(f'{__file__}.log', logging.INFO)
+    import homework
+    from engine import load_subscriptions
+    from live_config import config_source
+    from webhook import start_webhook_server
+
+    homework.require_tokens(('TELEGRAM_TOKEN',))
+    source = config_source()
+    if source is None:
+        load_subscriptions()
+    else:
+        source.load()
+    processes = {}
+    queues = {}
+    forward_signals(processes)
+    start_webhook_server(
+        EventRouter(Coordinator(args.coordinator), processes, queues).push
+    )
+    while True:
+        for number in range(args.workers):
+            process = processes.get(number)
+            if process is not None and process.is_alive():
+                continue
+            if process is not None:
+                logging.warning(WORKER_DIED_MESSAGE.format(
+                    number=number, code=process.exitcode
+                ))
+            queues[number] = multiprocessing.Queue()
+            process = multiprocessing.Process(
+                target=run_worker,
+                args=(number, args.coordinator, queues[number])
+            )
+            process.start()
+            processes[number] = process
+        time.sleep(SHARD_HEARTBEAT)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,55 @@
+class StatusIndex:
+    """Last seen status of every homework, keyed by id or name.
+
+    Transitions are also appended to `history` when it is given.
+    """
+
+    def __init__(self, history=None):
+        self.statuses = {}
+        self.in_review = 0
+        self.history = history
+
+    def __len__(self):
+        return len(self.statuses)
+
+    @staticmethod
+    def homework_key(homework):
+        return homework.get('id', homework.get('homework_name'))
+
+    def changes(self, homeworks):
+        """Returning homeworks whose status differs from the last seen one.
+
+        The index is not updated until `commit`, so changes whose
+        notifications were not stored are found again on the next poll.
+        """
+        changes = []
+        seen = {}
+        for homework in homeworks:
+            key = self.homework_key(homework)
+            status = homework.get('status')
+            previous = seen[key] if key in seen else self.statuses.get(key)
+            if previous != status:
+                seen[key] = status
+                changes.append(homework)
+        return changes
+
+    def commit(self, homeworks):
+        """Recording changed homeworks as seen."""
+        for homework in homeworks:
+            key = self.homework_key(homework)
+            status = homework.get('status')
+            previous = self.statuses.get(key)
+            if previous == status:
+                continue
+            self.statuses[key] = status
+            self.in_review += (
+                (status == 'reviewing') - (previous == 'reviewing')
+            )
+            if self.history is not None:
+                self.history.append(homework, previous)
+
+    def diff(self, homeworks):
+        """Returning changed homeworks and recording them as seen at once."""
+        changes = self.changes(homeworks)
+        self.commit(changes)
+        return changes
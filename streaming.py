@@ -0,0 +1,152 @@
+import codecs
+import json
+
+CHUNK_SIZE = 64 * 1024
+ERROR_KEYS = ('error', 'code')
+WHITESPACE = ' \t\n\r'
+INVALID_JSON_MESSAGE = 'Некорректный JSON в ответе сервера, позиция {position}'
+
+decoder = json.JSONDecoder()
+
+
+class ErrorKeyFound(RuntimeError):
+    """The answer contains `error` or `code` at the top level."""
+
+    def __init__(self, key, value):
+        super().__init__(f'{key}: {value}')
+        self.key = key
+        self.value = value
+
+
+class AnswerStream:
+    """Lazily decoded `homework_statuses` answer read from byte chunks.
+
+    Homeworks are yielded one by one by `homeworks()`, other top-level
+    fields are collected into `fields`; an error key stops decoding at once.
+    """
+
+    def __init__(self, chunks, error_factory=ErrorKeyFound, close=None,
+                 record=None):
+        self.chunks = iter(chunks)
+        self.error_factory = error_factory
+        self.close = close
+        self.record = record
+        self.text_decoder = codecs.getincrementaldecoder('utf-8')()
+        self.buffer = ''
+        self.position = 0
+        self.finished = False
+        self.consumed = False
+        self.seen_homeworks = False
+        self.fields = {}
+
+    def _fill(self):
+        """Appending the next chunk to the buffer, False at end of input."""
+        if self.finished:
+            return False
+        self.buffer = self.buffer[self.position:]
+        self.position = 0
+        for chunk in self.chunks:
+            if chunk:
+                self.buffer += self.text_decoder.decode(chunk)
+                return True
+        self.buffer += self.text_decoder.decode(b'', final=True)
+        self.finished = True
+        return False
+
+    def _invalid(self):
+        return ValueError(INVALID_JSON_MESSAGE.format(position=self.position))
+
+    def _peek(self):
+        """Next significant character, None at end of input."""
+        while True:
+            buffer = self.buffer
+            while (self.position < len(buffer)
+                   and buffer[self.position] in WHITESPACE):
+                self.position += 1
+            if self.position < len(buffer):
+                return buffer[self.position]
+            if not self._fill():
+                return None
+
+    def _expect(self, characters):
+        character = self._peek()
+        if character is None or character not in characters:
+            raise self._invalid()
+        self.position += 1
+        return character
+
+    def _value(self):
+        """Decoding one complete JSON value, reading more input if needed."""
+        if self._peek() is None:
+            raise self._invalid()
+        while True:
+            try:
+                value, end = decoder.raw_decode(self.buffer, self.position)
+            except json.JSONDecodeError:
+                if self._fill():
+                    continue
+                raise self._invalid()
+            if end == len(self.buffer) and self._fill():
+                continue
+            self.position = end
+            return value
+
+    def homeworks(self):
+        """Yielding homeworks one at a time."""
+        if self.consumed:
+            return
+        self.consumed = True
+        try:
+            yield from self._decode()
+        finally:
+            if self.close is not None:
+                self.close()
+
+    def _homework(self):
+        value = self._value()
+        if self.record is None or not isinstance(value, dict):
+            return value
+        return self.record(value)
+
+    def _decode(self):
+        self._expect('{')
+        if self._peek() == '}':
+            self.position += 1
+            return
+        while True:
+            key = self._value()
+            if not isinstance(key, str):
+                raise self._invalid()
+            self._expect(':')
+            if key == 'homeworks' and self._peek() == '[':
+                self.seen_homeworks = True
+                self.position += 1
+                if self._peek() == ']':
+                    self.position += 1
+                else:
+                    while True:
+                        yield self._homework()
+                        if self._expect(',]') == ']':
+                            break
+            else:
+                value = self._value()
+                if key in ERROR_KEYS:
+                    raise self.error_factory(key, value)
+                self.fields[key] = value
+            if self._expect(',}') == '}':
+                return
+
+    def read(self):
+        """Materialising the whole answer like `response.json()`."""
+        homeworks = list(self.homeworks())
+        answer = dict(self.fields)
+        if self.seen_homeworks:
+            answer['homeworks'] = homeworks
+        return answer
+
+
+def iter_bytes(body, chunk_size=CHUNK_SIZE):
+    """Splitting an in-memory body into chunks."""
+    view = memoryview(body)
+    for start in range(0, len(body), chunk_size):
+        yield bytes(view[start:start + chunk_size])
@@ -0,0 +1,51 @@
+from collections import namedtuple
+
+Subscription = namedtuple('Subscription', ['token', 'chat_id'])
+
+
+class SubscriptionIndex:
+    """Practicum tokens with the chats following each of them."""
+
+    def __init__(self, subscriptions=()):
+        self.chats_by_token = {}
+        for subscription in subscriptions:
+            self.add(subscription)
+
+    def __len__(self):
+        return sum(len(chats) for chats in self.chats_by_token.values())
+
+    def __iter__(self):
+        for token, chats in self.chats_by_token.items():
+            for chat_id in chats:
+                yield Subscription(token, chat_id)
+
+    def __contains__(self, token):
+        return token in self.chats_by_token
+
+    def add(self, subscription):
+        """Adding a subscription, True when its token is new."""
+        chats = self.chats_by_token.get(subscription.token)
+        if chats is None:
+            self.chats_by_token[subscription.token] = {
+                subscription.chat_id: None
+            }
+            return True
+        chats[subscription.chat_id] = None
+        return False
+
+    def remove(self, subscription):
+        """Removing a subscription, True when its token has no chats left."""
+        chats = self.chats_by_token.get(subscription.token)
+        if chats is None:
+            return False
+        chats.pop(subscription.chat_id, None)
+        if chats:
+            return False
+        del self.chats_by_token[subscription.token]
+        return True
+
+    def tokens(self):
+        return list(self.chats_by_token)
+
+    def chats(self, token):
+        return tuple(self.chats_by_token.get(token, ()))
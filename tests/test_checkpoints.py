@@ -0,0 +1,75 @@
+import asyncio
+from http import HTTPStatus
+
+import requests
+
+
+class FakeResponse:
+
+    def __init__(self, data):
+        self.data = data
+        self.status_code = HTTPStatus.OK
+
+    def json(self):
+        return self.data
+
+
+class FakeBot:
+
+    def send_message(self, chat_id, text):
+        pass
+
+
+class TestCheckpointStore:
+
+    def test_flush_is_batched(self, tmp_path):
+        from checkpoints import CheckpointStore
+
+        path = str(tmp_path / 'checkpoints.sqlite3')
+        store = CheckpointStore(path)
+        store.set('a', 10)
+        store.set('b', 20)
+        store.set('a', 30)
+        assert store.get('a') == 30, (
+            'Несохранённая отметка должна быть видна через `get`'
+        )
+        assert CheckpointStore(path).load() == {}, (
+            'До `flush` отметки не должны попадать на диск'
+        )
+        assert store.flush() == 2
+        assert CheckpointStore(path).load() == {'a': 30, 'b': 20}, (
+            'После `flush` отметки должны читаться из файла'
+        )
+
+    def test_engine_resumes(self, monkeypatch, tmp_path, api_url,
+                            random_timestamp):
+        from checkpoints import CheckpointStore
+        import engine
+
+        dates = []
+
+        def fake_get(url, headers, params):
+            dates.append(params['from_date'])
+            return FakeResponse({
+                'homeworks': [{'homework_name': 'hw', 'status': 'approved'}],
+                'current_date': random_timestamp
+            })
+
+        monkeypatch.setattr(requests, 'get', fake_get)
+        path = str(tmp_path / 'checkpoints.sqlite3')
+        subscription = engine.Subscription('token', 'chat')
+
+        store = CheckpointStore(path)
+        asyncio.run(engine.PollingEngine(
+            [subscription], FakeBot(), api_url, checkpoints=store
+        ).poll(subscription.token))
+        store.close()
+
+        restarted = engine.PollingEngine(
+            [subscription], FakeBot(), api_url,
+            checkpoints=CheckpointStore(path)
+        )
+        asyncio.run(restarted.poll(subscription.token))
+        assert dates == [0, random_timestamp], (
+            'После перезапуска опрос должен продолжаться с `current_date`'
+        )
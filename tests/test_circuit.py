@@ -0,0 +1,94 @@
+import pytest
+import requests
+
+
+class FakeClock:
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def fail(breaker):
+    with pytest.raises(ConnectionError):
+        with breaker:
+            raise ConnectionError('down')
+
+
+class TestCircuitBreaker:
+
+    def test_opens_and_recovers(self):
+        from circuit import CLOSED, HALF_OPEN, OPEN, CircuitBreaker
+        from circuit import CircuitOpenError
+
+        clock = FakeClock()
+        breaker = CircuitBreaker('api', failure_threshold=3,
+                                 reset_timeout=10, half_open_probes=1,
+                                 clock=clock)
+        for _ in range(3):
+            fail(breaker)
+        assert breaker.state == OPEN, (
+            'После серии ошибок цепь должна размыкаться'
+        )
+        with pytest.raises(CircuitOpenError) as error:
+            breaker.acquire()
+        assert error.value.retry_after == 10
+
+        clock.now = 10
+        breaker.acquire()
+        assert breaker.state == HALF_OPEN
+        with pytest.raises(CircuitOpenError):
+            breaker.acquire()
+        breaker.record_failure()
+        assert breaker.state == OPEN, (
+            'Неудачная пробная попытка должна снова размыкать цепь'
+        )
+
+        clock.now = 20
+        with breaker:
+            pass
+        assert breaker.state == CLOSED, (
+            'Удачная пробная попытка должна замыкать цепь'
+        )
+
+    def test_ignored_errors_do_not_count(self):
+        from circuit import CLOSED, CircuitBreaker
+
+        breaker = CircuitBreaker(
+            'api', failure_threshold=1,
+            is_failure=lambda error: isinstance(error, ConnectionError)
+        )
+        with pytest.raises(ValueError):
+            with breaker:
+                raise ValueError('bad answer')
+        assert breaker.state == CLOSED
+
+
+class TestApiCircuit:
+
+    def test_fails_fast_without_network(self, monkeypatch, api_url,
+                                        current_timestamp):
+        import homework
+        from circuit import CircuitBreaker, CircuitOpenError
+
+        calls = []
+
+        def fake_get(*args, **kwargs):
+            calls.append(kwargs)
+            raise requests.exceptions.ConnectTimeout('timeout')
+
+        monkeypatch.setattr(requests, 'get', fake_get)
+        monkeypatch.setattr(homework, 'practicum_circuit', CircuitBreaker(
+            'practicum', failure_threshold=2, reset_timeout=60,
+            is_failure=homework.is_api_failure
+        ))
+        for _ in range(2):
+            with pytest.raises(ConnectionError):
+                homework.get_api_answer(api_url, current_timestamp)
+        with pytest.raises(CircuitOpenError):
+            homework.get_api_answer(api_url, current_timestamp)
+        assert len(calls) == 2, (
+            'При разомкнутой цепи запрос не должен уходить в сеть'
+        )
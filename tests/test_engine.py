@@ -0,0 +1,116 @@
+import asyncio
+from functools import partial
+from http import HTTPStatus
+
+import requests
+
+
+class FakeResponse:
+
+    def __init__(self, data, status_code=HTTPStatus.OK):
+        self.data = data
+        self.status_code = status_code
+
+    def json(self):
+        return self.data
+
+
+class FakeBot:
+
+    def __init__(self):
+        self.sent = []
+
+    def send_message(self, chat_id, text):
+        self.sent.append((chat_id, text))
+
+
+class TestPollingEngine:
+
+    def test_polls_every_subscription(self, monkeypatch, api_url,
+                                      random_timestamp):
+        tokens = []
+
+        def fake_get(url, headers, params):
+            token = headers['Authorization'].split()[1]
+            tokens.append(token)
+            return FakeResponse({
+                'homeworks': [{'homework_name': token, 'status': 'approved'}],
+                'current_date': random_timestamp
+            })
+
+        monkeypatch.setattr(requests, 'get', fake_get)
+        import engine
+
+        subscriptions = [
+            engine.Subscription(f'token{i}', f'chat{i}') for i in range(20)
+        ]
+        bot = FakeBot()
+        polling = engine.PollingEngine(
+            subscriptions, bot, api_url, max_in_flight=4,
+            policy_factory=partial(engine.PollingPolicy, 300, 30, jitter=0)
+        )
+        delays = asyncio.run(polling.poll_all())
+
+        assert delays == [900] * 20, (
+            'Все подписки должны быть успешно опрошены'
+        )
+        assert sorted(tokens) == sorted(s.token for s in subscriptions), (
+            'Каждый токен должен быть опрошен ровно один раз'
+        )
+        assert {chat for chat, _ in bot.sent} == {
+            s.chat_id for s in subscriptions
+        }, 'Сообщение должно уйти в чат подписки'
+        assert set(polling.timestamps.values()) == {random_timestamp}, (
+            'Для каждого токена должен сохраняться `current_date`'
+        )
+
+    def test_error_keeps_timestamp(self, monkeypatch, api_url):
+        def fake_get(url, headers, params):
+            return FakeResponse({}, HTTPStatus.INTERNAL_SERVER_ERROR)
+
+        monkeypatch.setattr(requests, 'get', fake_get)
+        import engine
+
+        subscription = engine.Subscription('token', 'chat')
+        polling = engine.PollingEngine(
+            [subscription], FakeBot(), api_url,
+            policy_factory=partial(engine.PollingPolicy, 300, 30,
+                                   rand=lambda: 1.0)
+        )
+        delays = [asyncio.run(polling.poll(subscription.token))
+                  for _ in range(3)]
+
+        assert delays == [30, 60, 120], (
+            'После ошибок опрос должен откладываться экспоненциально'
+        )
+        assert subscription.token not in polling.timestamps, (
+            'После ошибки `current_date` не должен обновляться'
+        )
+
+    def test_load_subscriptions(self, tmp_path):
+        import engine
+
+        path = tmp_path / 'subscriptions.csv'
+        path.write_text('# token,chat\ntoken1,chat1\ntoken2, chat2\n')
+        assert engine.load_subscriptions(str(path)) == [
+            engine.Subscription('token1', 'chat1'),
+            engine.Subscription('token2', 'chat2'),
+        ], 'Подписки должны читаться из CSV файла'
+
+    def test_first_poll_does_not_replay_history(self):
+        import engine
+        from benchmarks.standins import PracticumStandIn
+
+        bot = FakeBot()
+        subscription = engine.Subscription('token', 'chat')
+        with PracticumStandIn(homeworks=30, stable=True) as practicum:
+            polling = engine.PollingEngine(
+                [subscription], bot, practicum.url
+            )
+            asyncio.run(polling.poll(subscription.token))
+            asyncio.run(polling.poll(subscription.token))
+        assert len(bot.sent) == 1, (
+            'Новый подписчик без контрольной точки не должен получать '
+            'сообщение о каждой работе из истории'
+        )
+        assert len(polling.statuses[subscription.token]) == 30
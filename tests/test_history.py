@@ -0,0 +1,136 @@
+import pytest
+
+
+def transition(number, status, at, lesson='project', comment=''):
+    return {
+        'id': number,
+        'homework_name': f'homework{number}.zip',
+        'lesson_name': lesson,
+        'status': status,
+        'date_updated': at,
+        'reviewer_comment': comment,
+    }
+
+
+@pytest.fixture(params=[True, False], ids=['numpy', 'python'])
+def history(request, monkeypatch):
+    import history
+
+    if not request.param:
+        monkeypatch.setattr(history, 'vectorized', lambda: None)
+    elif history.vectorized() is None:
+        pytest.skip('numpy не установлен')
+    return history
+
+
+class TestHistoryStore:
+
+    def test_round_trip(self, history, tmp_path):
+        store = history.HistoryStore(tmp_path)
+        store.append(transition(1, 'reviewing', 100), None)
+        store.append(
+            transition(1, 'rejected', 3700, comment='Поправьте тесты'),
+            'reviewing'
+        )
+        assert store.flush() == 2
+        reopened = history.HistoryStore(tmp_path)
+        columns = reopened.columns()
+        assert list(columns['to_status']) == [
+            history.REVIEWING, history.REJECTED
+        ], 'Переходы должны читаться из файлов в порядке записи'
+        assert reopened.comment(
+            int(columns['comment_offset'][1]),
+            int(columns['comment_size'][1])
+        ) == 'Поправьте тесты'
+        assert reopened.project_names() == ['project']
+
+    def test_torn_column_is_cut(self, history, tmp_path):
+        store = history.HistoryStore(tmp_path)
+        store.append(transition(1, 'reviewing', 100), None)
+        store.flush()
+        with open(store.column_path('at'), 'ab') as file:
+            file.write(b'\x00\x01\x02')
+        assert len(store.columns()['homework']) == 1, (
+            'Недописанные строки не должны попадать в выборку'
+        )
+
+    def test_empty_history(self, history, tmp_path):
+        statistics = history.statistics(history.HistoryStore(tmp_path))
+        assert statistics['transitions'] == 0
+        assert statistics['review_hours']['p50'] is None
+
+    def test_shard_stores_are_merged(self, history, tmp_path):
+        first = history.HistoryStore(tmp_path / 'shard.0')
+        second = history.HistoryStore(tmp_path / 'shard.1')
+        first.append(transition(1, 'reviewing', 100, lesson='a'), None)
+        second.append(transition(2, 'reviewing', 50, lesson='b'), None)
+        second.append(
+            transition(2, 'approved', 3650, lesson='b', comment='Отлично'),
+            'reviewing'
+        )
+        first.append(transition(1, 'rejected', 7300, lesson='a'), 'reviewing')
+        first.flush()
+        second.flush()
+        merged = history.MergedHistory(tmp_path)
+        assert merged.project_names() == ['a', 'b'], (
+            'Коды проектов разных шардов должны сводиться в одну таблицу'
+        )
+        columns = merged.columns()
+        assert list(columns['homework']) == [2, 1, 2, 1]
+        assert merged.comment(
+            int(columns['comment_offset'][2]),
+            int(columns['comment_size'][2]),
+            int(columns['store'][2])
+        ) == 'Отлично', 'Комментарий должен читаться из файла своего шарда'
+        statistics = history.statistics(merged)
+        assert statistics['reviews'] == 2
+        assert [(row['project'], row['p50'])
+                for row in statistics['projects']] == [('a', 2.0), ('b', 1.0)]
+
+
+class TestStatistics:
+
+    def test_review_percentiles_per_project(self, history, tmp_path):
+        store = history.HistoryStore(tmp_path)
+        for number, lesson in ((1, 'first'), (2, 'first'), (3, 'second')):
+            store.append(transition(number, 'reviewing', 0, lesson), None)
+        for number, hours, lesson, verdict in (
+                (3, 5, 'second', 'approved'),
+                (1, 1, 'first', 'approved'),
+                (2, 3, 'first', 'rejected')):
+            store.append(
+                transition(number, verdict, hours * 3600, lesson),
+                'reviewing'
+            )
+        store.append(transition(4, 'approved', 0, 'second'), None)
+        store.flush()
+        statistics = history.statistics(store)
+        assert (statistics['transitions'], statistics['reviews']) == (7, 3)
+        assert statistics['review_hours']['p50'] == 3.0, (
+            'Медиана должна считаться по времени от `reviewing` до вердикта'
+        )
+        first, second = statistics['projects']
+        assert (first['project'], first['reviews'],
+                first['approved_share'], first['p90']) == (
+            'first', 2, 0.5, 3.0
+        )
+        assert (second['transitions'], second['reviews']) == (3, 1)
+        only = history.statistics(store, project='second')['projects']
+        assert [row['project'] for row in only] == ['second']
+
+
+class TestStatusIndexHistory:
+
+    def test_only_changes_are_recorded(self, tmp_path):
+        from history import HistoryStore
+        from status_index import StatusIndex
+
+        store = HistoryStore(tmp_path)
+        statuses = StatusIndex(store)
+        statuses.diff([transition(1, 'reviewing', 0)])
+        statuses.diff([transition(1, 'reviewing', 0)])
+        statuses.diff([transition(1, 'approved', 60)])
+        store.flush()
+        assert list(store.columns()['to_status']) == [1, 3], (
+            'В историю должны попадать только смены статуса'
+        )
@@ -0,0 +1,62 @@
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+
+class StatusesHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        body = json.dumps({'homeworks': [], 'current_date': 1}).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def local_url():
+    server = ThreadingHTTPServer(('127.0.0.1', 0), StatusesHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f'http://127.0.0.1:{server.server_port}/homework_statuses/'
+    server.shutdown()
+    server.server_close()
+
+
+class TestPooledSession:
+
+    def test_connection_is_reused(self, local_url):
+        import homework
+        from http_session import PooledSession
+
+        session = PooledSession()
+        homework.use_session(session)
+        try:
+            for _ in range(3):
+                result = homework.get_api_answer(local_url, 0)
+        finally:
+            homework.use_session(None)
+
+        assert result['current_date'] == 1, (
+            'Ответ должен приходить через подменённую сессию'
+        )
+        assert session.stats.snapshot() == dict(
+            requests=3, reused=2, new_connections=1
+        ), 'Соединение должно переиспользоваться между запросами'
+
+    def test_default_timeout(self, local_url):
+        from http_session import PooledSession
+
+        session = PooledSession(timeout=1.5)
+        response = session.get(local_url)
+        assert response.connection_reused is False, (
+            'Первый запрос должен открывать новое соединение'
+        )
+        assert session.timeout == 1.5
@@ -0,0 +1,165 @@
+import sqlite3
+
+import pytest
+
+
+class Bot:
+
+    def send_message(self, chat_id, text):
+        pass
+
+
+@pytest.fixture
+def engine():
+    import engine as engine_module
+
+    polling = engine_module.PollingEngine((), Bot())
+    yield polling
+    polling.executor.shutdown()
+
+
+def write(path, text):
+    with open(path, 'w') as file:
+        file.write(text)
+
+
+class TestFileSource:
+
+    def test_subscriptions_diff_keeps_state(self, tmp_path, engine):
+        from live_config import ConfigWatcher, FileSource
+        from subscriptions import Subscription
+
+        csv = tmp_path / 'subscriptions.csv'
+        write(csv, 'token1,chat1\ntoken2,chat2\n')
+        watcher = ConfigWatcher(FileSource(None, str(csv)), engine)
+        watcher.load()
+        assert sorted(engine.subscriptions) == [
+            Subscription('token1', 'chat1'), Subscription('token2', 'chat2')
+        ]
+        state = engine.statuses['token1'] = object()
+        assert watcher.check() is None, (
+            'Без изменений файла конфигурация не должна перечитываться'
+        )
+        write(csv, 'token1,chat1\ntoken3,chat3\n# comment\n')
+        added, removed = watcher.apply(watcher.check())
+        assert (added, removed) == (
+            [Subscription('token3', 'chat3')],
+            [Subscription('token2', 'chat2')]
+        )
+        assert engine.subscriptions.tokens() == ['token1', 'token3']
+        assert engine.statuses['token1'] is state, (
+            'Состояние оставшихся подписок должно сохраняться'
+        )
+
+    def test_settings(self, tmp_path, engine, monkeypatch):
+        import homework
+        from lazy import LazyClient
+        from live_config import ConfigWatcher, FileSource
+
+        monkeypatch.setattr(homework, 'VERDICTS', homework.VERDICTS)
+        csv = tmp_path / 'subscriptions.csv'
+        write(csv, 'token1,chat1\n')
+        config = tmp_path / 'config.env'
+        write(config, 'RETRY_TIME=300\n')
+        engine.bot = LazyClient(Bot)
+        engine.bot.client
+        watcher = ConfigWatcher(FileSource(str(config), str(csv)), engine)
+        watcher.load()
+        policy = engine.policies['token1'] = engine.policy_factory()
+        assert engine.bot.built, (
+            'Клиент Telegram не должен пересоздаваться без смены токена'
+        )
+        write(config, 'RETRY_TIME=900\nTELEGRAM_TOKEN=123:new\n'
+                      'VERDICTS={"approved": "Ура"}\n')
+        watcher.apply(watcher.check())
+        assert policy.retry_time == 900, (
+            'Новый интервал опроса должен действовать со следующего опроса'
+        )
+        assert engine.cadence == (900, homework.ERROR_RETRY_TIME)
+        assert homework.VERDICTS == {'approved': 'Ура'}
+        assert not engine.bot.built
+
+    def test_cadence_is_not_changed_with_webhook(self, tmp_path, engine,
+                                                 monkeypatch, caplog):
+        import webhook
+        from live_config import ConfigWatcher, FileSource
+
+        monkeypatch.setattr(webhook, 'WEBHOOK_PORT', '8080')
+        csv = tmp_path / 'subscriptions.csv'
+        write(csv, 'token1,chat1\n')
+        config = tmp_path / 'config.env'
+        write(config, 'RETRY_TIME=300\n')
+        watcher = ConfigWatcher(FileSource(str(config), str(csv)), engine)
+        watcher.load()
+        write(config, 'RETRY_TIME=900\n')
+        watcher.apply(watcher.check())
+        assert engine.cadence is None
+        assert 'RETRY_TIME' in caplog.text, (
+            'Неприменённая смена интервала должна попадать в лог'
+        )
+
+    def test_invalid_config_is_not_applied(self, tmp_path, engine):
+        from live_config import ConfigWatcher, FileSource
+
+        csv = tmp_path / 'subscriptions.csv'
+        write(csv, 'token1,chat1\n')
+        config = tmp_path / 'config.env'
+        write(config, 'RETRY_TIME=300\n')
+        watcher = ConfigWatcher(FileSource(str(config), str(csv)), engine)
+        previous = watcher.load()
+        write(config, 'RETRY_TIME=often\n')
+        with pytest.raises(ValueError):
+            watcher.check()
+        write(csv, '')
+        write(config, 'RETRY_TIME=600\n')
+        with pytest.raises(ValueError):
+            watcher.check()
+        assert watcher.config is previous
+        assert engine.subscriptions.tokens() == ['token1']
+
+
+class TestSqliteSource:
+
+    def test_changes_by_other_connections(self, tmp_path, engine):
+        from live_config import ConfigWatcher, SqliteSource
+
+        path = str(tmp_path / 'config.sqlite3')
+        source = SqliteSource(path)
+        other = sqlite3.connect(path)
+        with other:
+            other.execute("INSERT INTO subscriptions VALUES ('token1', 'c')")
+        watcher = ConfigWatcher(source, engine)
+        watcher.load()
+        assert watcher.check() is None
+        with other:
+            other.execute("INSERT INTO subscriptions VALUES ('token2', 'c')")
+            other.execute("INSERT INTO settings VALUES ('RETRY_TIME', '60')")
+        watcher.apply(watcher.check())
+        assert engine.subscriptions.tokens() == ['token1', 'token2'], (
+            'Подписки из SQLite должны применяться без перезапуска'
+        )
+        assert engine.cadence[0] == 60
+        other.close()
+        source.close()
+
+
+class TestShardUpdate:
+
+    def test_owned_tokens_follow_the_list(self, tmp_path, engine):
+        from checkpoints import token_key
+        from sharding import Coordinator, ShardWorker
+        from subscriptions import Subscription
+
+        first = Subscription('token1', 'chat1')
+        shard = ShardWorker(engine, [first],
+                            Coordinator(str(tmp_path / 'c.sqlite3')), 'a')
+        shard.rebalance()
+        assert shard.owned == {token_key('token1')}
+        second = Subscription('token1', 'chat2')
+        added, removed = shard.update([second, Subscription('token2', 'c')])
+        assert (added, removed) == ({second}, {first}), (
+            'Изменения подписок своих токенов должны применяться сразу'
+        )
+        assert list(engine.subscriptions) == [second]
+        shard.rebalance()
+        assert engine.subscriptions.tokens() == ['token1', 'token2']
@@ -0,0 +1,90 @@
+import atexit
+import logging
+
+
+class FakeClock:
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def make_record(message, level=logging.ERROR):
+    return logging.LogRecord('root', level, __file__, 1, message, None, None)
+
+
+class TestLogPipeline:
+
+    def test_redact(self):
+        from log_pipeline import redact
+
+        text = redact("headers: \"{'Authorization': 'OAuth y0_secret'}\" "
+                      'https://api.telegram.org/bot123456:AAE-secret/send')
+        assert 'secret' not in text, 'Токены не должны попадать в лог'
+        assert 'OAuth ***' in text
+
+    def test_duplicates_are_suppressed(self):
+        from log_pipeline import DuplicateFilter
+
+        clock = FakeClock()
+        duplicates = DuplicateFilter(window=60, clock=clock)
+        written = [duplicates.filter(make_record('down'))
+                   for _ in range(5)]
+        assert written == [True, False, False, False, False], (
+            'Одинаковые ошибки внутри окна должны подавляться'
+        )
+        assert duplicates.filter(make_record('другая ошибка'))
+        assert duplicates.filter(make_record('debug', logging.DEBUG))
+        clock.now = 61
+        record = make_record('down')
+        assert duplicates.filter(record)
+        assert '4' in record.getMessage(), (
+            'После окна должно сообщаться число подавленных записей'
+        )
+
+    def test_lazy_message_is_not_rendered(self):
+        from log_pipeline import LazyMessage
+
+        class Explosive:
+            def __format__(self, spec):
+                raise AssertionError(
+                    'Сообщение отключённого уровня не должно форматироваться'
+                )
+
+        logger = logging.getLogger('tests.lazy')
+        logger.setLevel(logging.INFO)
+        logger.debug(LazyMessage('{value}', value=Explosive()))
+        assert str(LazyMessage('{a}-{b}', a=1, b=2)) == '1-2'
+
+    def test_background_writer(self, tmp_path):
+        from logging.handlers import RotatingFileHandler
+
+        from log_pipeline import LazyMessage, configure_logging
+
+        path = tmp_path / 'bot.log'
+        root = logging.getLogger()
+        handlers, level = root.handlers[:], root.level
+        try:
+            listener = configure_logging(
+                str(path),
+                handler=RotatingFileHandler(str(path), maxBytes=300,
+                                            backupCount=2)
+            )
+            for number in range(20):
+                logging.info(LazyMessage('запрос {number}: OAuth {token}',
+                                         number=number, token='secret'))
+            listener.stop()
+            atexit.unregister(listener.stop)
+        finally:
+            for handler in root.handlers[:]:
+                root.removeHandler(handler)
+            for handler in handlers:
+                root.addHandler(handler)
+            root.setLevel(level)
+        files = sorted(tmp_path.iterdir())
+        assert len(files) == 3, 'Лог должен ротироваться по размеру'
+        text = ''.join(file.read_text(encoding='utf-8') for file in files)
+        assert 'запрос 19' in text
+        assert 'secret' not in text
@@ -0,0 +1,67 @@
+import requests
+
+
+class TestMetrics:
+
+    def test_histogram_exposition(self):
+        from metrics import Registry
+
+        registry = Registry()
+        histogram = registry.histogram('stage_seconds', 'Stage latency.',
+                                       ('stage',), buckets=(0.1, 1.0))
+        histogram.observe(0.05, 'request')
+        histogram.observe(0.5, 'request')
+        histogram.observe(5, 'request')
+        counter = registry.counter('errors_total', 'Errors.', ('key',))
+        counter.inc('code')
+        text = registry.exposition()
+        for line in (
+            '# TYPE stage_seconds histogram',
+            'stage_seconds_bucket{stage="request",le="0.1"} 1',
+            'stage_seconds_bucket{stage="request",le="1.0"} 2',
+            'stage_seconds_bucket{stage="request",le="+Inf"} 3',
+            'stage_seconds_count{stage="request"} 3',
+            'errors_total{key="code"} 1',
+        ):
+            assert line in text, f'В выводе метрик нет строки `{line}`'
+
+    def test_stages_are_recorded(self):
+        import homework
+        from benchmarks.standins import PracticumStandIn
+        from metrics import API_ERROR_KEYS, STAGE_SECONDS
+
+        requests_before = STAGE_SECONDS.count('request', '200')
+        decodes_before = STAGE_SECONDS.count('json_decode', 'ok')
+        errors_before = API_ERROR_KEYS.get('code')
+        with PracticumStandIn() as practicum:
+            homework.request_api_answer(
+                practicum.url, 0, homework.make_headers('token')
+            )
+            try:
+                homework.request_api_answer(practicum.url, 0, {})
+            except RuntimeError:
+                pass
+        assert STAGE_SECONDS.count('request', '200') == requests_before + 1
+        assert STAGE_SECONDS.count('json_decode', 'ok') == decodes_before + 1
+        assert STAGE_SECONDS.count('request', '401') >= 1, (
+            'Коды ответа должны попадать в метку `outcome`'
+        )
+        assert API_ERROR_KEYS.get('code') == errors_before, (
+            'Ошибка 401 не должна считаться ключом ошибки в JSON'
+        )
+
+    def test_http_endpoint(self):
+        from metrics import Registry, start_http_server
+
+        registry = Registry()
+        registry.counter('polls_total', 'Polls.').inc()
+        server = start_http_server(0, registry=registry)
+        try:
+            response = requests.get(
+                f'http://127.0.0.1:{server.server_port}/metrics'
+            )
+        finally:
+            server.shutdown()
+            server.server_close()
+        assert response.status_code == 200
+        assert 'polls_total 1' in response.text
@@ -0,0 +1,130 @@
+import time
+
+
+class FakeClock:
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += seconds
+
+
+class TestTokenBucket:
+
+    def test_refill(self):
+        from outbound import TokenBucket
+
+        clock = FakeClock()
+        bucket = TokenBucket(rate=2, capacity=2, clock=clock)
+        assert [bucket.take() for _ in range(2)] == [0, 0]
+        assert bucket.take() == 0.5, (
+            'Пустое ведро должно сообщать время ожидания токена'
+        )
+        clock.sleep(0.5)
+        assert bucket.take() == 0
+
+
+class TestOutboundQueue:
+
+    def test_coalescing_and_priority(self):
+        from outbound import OutboundQueue
+
+        sent = []
+        clock = FakeClock()
+        queue = OutboundQueue(lambda chat, text: sent.append((chat, text)),
+                              clock=clock, sleep=clock.sleep)
+        queue.put('chat1', 'first', 'reviewing')
+        queue.put('chat1', 'second', 'reviewing')
+        queue.put('chat2', 'verdict', 'approved')
+        assert len(queue) == 3
+        queue.drain()
+        assert sent == [
+            ('chat2', 'verdict'),
+            ('chat1', 'first\n\nsecond'),
+        ], (
+            'Вердикты должны уходить первыми, а сообщения одного чата '
+            'объединяться'
+        )
+
+    def test_batches_fit_message_limit(self):
+        from outbound import OutboundQueue
+
+        sent = []
+        clock = FakeClock()
+        queue = OutboundQueue(lambda chat, text: sent.append(text),
+                              clock=clock, sleep=clock.sleep,
+                              message_limit=12)
+        queue.put('chat', 'aaaa', outbox_id=1)
+        queue.put('chat', 'bbbb', outbox_id=2)
+        queue.put('chat', 'cccc', outbox_id=3)
+        batches = []
+        while True:
+            batch = queue.get(wait_for_messages=False)
+            if batch is None:
+                break
+            clock.sleep(10)
+            batches.append(batch)
+        assert batches == [
+            ('chat', 'aaaa\n\nbbbb', [1, 2]),
+            ('chat', 'cccc', [3]),
+        ], 'Объединённое сообщение не должно превышать лимит Telegram'
+
+    def test_long_message_is_split(self):
+        from outbound import OutboundQueue, split_message
+
+        assert split_message('abc\ndefgh', 5) == ['abc', 'defgh']
+        assert split_message('abcdefgh', 5) == ['abcde', 'fgh']
+        sent = []
+        clock = FakeClock()
+        queue = OutboundQueue(lambda chat, text: sent.append(text),
+                              clock=clock, sleep=clock.sleep,
+                              message_limit=5)
+        queue.put('chat', 'abcdefgh', outbox_id=1)
+        first = queue.get(wait_for_messages=False)
+        clock.sleep(10)
+        assert first == ('chat', 'abcde', []), (
+            'Идентификатор из outbox должен уходить с последней частью'
+        )
+        assert queue.get(wait_for_messages=False) == ('chat', 'fgh', [1])
+
+    def test_chat_rate_limit(self):
+        from outbound import OutboundQueue
+
+        sent = []
+        queue = OutboundQueue(lambda chat, text: sent.append(time.monotonic()),
+                              chat_rate=20, chat_burst=1)
+        queue.put('chat', 'first')
+        queue.drain()
+        queue.put('chat', 'second')
+        queue.drain()
+        assert sent[1] - sent[0] >= 0.04, (
+            'Сообщения в один чат должны ограничиваться по частоте'
+        )
+
+    def test_workers_drain_independently(self):
+        from outbound import OutboundQueue
+
+        sent = []
+        queue = OutboundQueue(lambda chat, text: sent.append(chat))
+        queue.start(workers=2)
+        for i in range(10):
+            queue.put(f'chat{i}', 'text')
+        queue.stop(timeout=5)
+        assert sorted(sent) == sorted(f'chat{i}' for i in range(10)), (
+            'Фоновые отправители должны доставить все сообщения'
+        )
+
+    def test_failed_send_is_logged(self):
+        from outbound import OutboundQueue
+
+        def broken(chat, text):
+            raise ConnectionError('telegram is down')
+
+        queue = OutboundQueue(broken)
+        queue.put('chat', 'text')
+        queue.drain()
+        assert queue.sent == 0
@@ -0,0 +1,163 @@
+class TestOutbox:
+
+    def make_notifications(self, *keys):
+        from homework import Notification
+
+        return [Notification(key, 'approved', f'text {key}') for key in keys]
+
+    def test_dedup_keys(self, tmp_path):
+        from outbox import Outbox
+
+        outbox = Outbox(str(tmp_path / 'outbox.sqlite3'))
+        added = outbox.add('chat', self.make_notifications('a', 'b'))
+        assert [notification.key for _, notification in added] == ['a', 'b']
+        assert outbox.add('chat', self.make_notifications('a')) == [], (
+            'Повторное уведомление с тем же ключом не должно сохраняться'
+        )
+        assert len(outbox.add('other', self.make_notifications('a'))) == 1, (
+            'Ключ дедупликации должен учитывать чат'
+        )
+
+    def test_failed_delivery_is_retried(self, tmp_path):
+        from outbound import OutboundQueue
+        from outbox import Outbox
+
+        path = str(tmp_path / 'outbox.sqlite3')
+        sent = []
+        telegram_is_down = True
+
+        def send(chat_id, text):
+            if telegram_is_down:
+                raise ConnectionError('telegram is down')
+            sent.append((chat_id, text))
+
+        outbox = Outbox(path)
+        queue = OutboundQueue(send, outbox=outbox)
+        for id, notification in outbox.add(
+                'chat', self.make_notifications('a', 'b')):
+            queue.put('chat', notification.message, notification.status, id)
+        queue.drain()
+        assert sent == []
+
+        restarted = Outbox(path)
+        queue = OutboundQueue(send, outbox=restarted)
+        telegram_is_down = False
+        assert restarted.requeue(queue) == 2, (
+            'Недоставленные уведомления должны переживать перезапуск'
+        )
+        assert restarted.requeue(queue) == 0, (
+            'Уведомления в очереди не должны ставиться в неё повторно'
+        )
+        queue.drain()
+        assert sent == [('chat', 'text a\n\ntext b')], (
+            'После восстановления связи уведомления уходят одной пачкой'
+        )
+        assert restarted.pending() == [], (
+            'Доставленные уведомления должны подтверждаться'
+        )
+
+    def test_dead_letters(self, tmp_path):
+        from outbound import OutboundQueue
+        from outbox import Outbox
+
+        class Rejected(Exception):
+            pass
+
+        def send(chat_id, text):
+            raise Rejected(text) if 'a' in text else ConnectionError(text)
+
+        outbox = Outbox(str(tmp_path / 'outbox.sqlite3'), max_attempts=2)
+        queue = OutboundQueue(
+            send, outbox=outbox,
+            is_permanent=lambda error: isinstance(error, Rejected)
+        )
+        for chat_id, key in (('chat1', 'a'), ('chat2', 'b')):
+            for id, notification in outbox.add(
+                    chat_id, self.make_notifications(key)):
+                queue.put(chat_id, notification.message, None, id)
+        for _ in range(3):
+            queue.drain()
+            outbox.requeue(queue)
+        assert [(row[1], row[4]) for row in outbox.dead()] == [
+            ('chat1', 1), ('chat2', 2)
+        ], (
+            'Отклонённые Telegram уведомления не должны повторяться, '
+            'остальные — после исчерпания попыток'
+        )
+        assert outbox.pending() == []
+        assert outbox.prune(older_than=-1) == 2, (
+            'Мёртвые уведомления должны удаляться вместе с доставленными'
+        )
+
+    def test_outage_longer_than_attempts(self, tmp_path):
+        from circuit import CircuitOpenError
+        from outbound import OutboundQueue
+        from outbox import Outbox
+
+        class TimedOut(Exception):
+            pass
+
+        sent = []
+        telegram = {'down': True, 'calls': 0}
+
+        def send(chat_id, text):
+            telegram['calls'] += 1
+            if telegram['down'] and telegram['calls'] % 2:
+                raise TimedOut(text)
+            if telegram['down']:
+                raise CircuitOpenError('open', 'telegram', 60)
+            sent.append(text)
+
+        outbox = Outbox(str(tmp_path / 'outbox.sqlite3'), max_attempts=3)
+        queue = OutboundQueue(
+            send, outbox=outbox, chat_rate=1000,
+            is_transient=lambda error: isinstance(error, TimedOut)
+        )
+        for id, notification in outbox.add(
+                'chat', self.make_notifications('a')):
+            queue.put('chat', notification.message, None, id)
+        for _ in range(10):
+            queue.drain()
+            outbox.requeue(queue)
+        assert outbox.dead() == [], (
+            'Открытый предохранитель не должен считаться попыткой доставки'
+        )
+        telegram['down'] = False
+        queue.drain()
+        assert sent == ['text a'], (
+            'После долгого сбоя уведомления должны быть доставлены'
+        )
+
+    def test_engine_prunes_outbox(self, tmp_path):
+        import asyncio
+
+        import engine
+        from outbound import OutboundQueue
+        from outbox import Outbox
+
+        outbox = Outbox(str(tmp_path / 'outbox.sqlite3'))
+        calls = []
+        outbox.prune = lambda: calls.append('prune')
+        outbox.requeue = lambda outbound: calls.append('requeue')
+        polling = engine.PollingEngine(
+            [], None, 'http://localhost',
+            outbox=outbox, outbound=OutboundQueue(print, outbox=outbox)
+        )
+
+        async def run(prune_interval):
+            calls.clear()
+            task = asyncio.ensure_future(polling.retry_outbox(
+                interval=0.01, prune_interval=prune_interval
+            ))
+            await asyncio.sleep(0.1)
+            task.cancel()
+            return calls.count('requeue'), calls.count('prune')
+
+        requeued, pruned = asyncio.run(run(3600))
+        assert requeued > 1 and pruned == 1, (
+            'Outbox должен очищаться при запуске, а не при каждом повторе'
+        )
+        requeued, pruned = asyncio.run(run(0))
+        assert pruned == requeued, (
+            'Старые записи outbox должны удаляться каждые `prune_interval`'
+        )
@@ -0,0 +1,105 @@
+import os
+import pstats
+import signal
+import tracemalloc
+
+import pytest
+
+
+def busy_cycle():
+    return sum(number * number for number in range(1000))
+
+
+class TestProfiler:
+
+    def test_disabled_costs_nothing(self, tmp_path):
+        from profiling import NOT_SAMPLED, Profiler
+
+        profiler = Profiler(tmp_path, every=0, memory_every=0)
+        assert profiler.wrap(busy_cycle) is busy_cycle, (
+            'Без профилирования функция должна вызываться без обёртки'
+        )
+        assert profiler.cycle() is NOT_SAMPLED
+        assert profiler.dump() is None
+        assert os.listdir(tmp_path) == []
+
+    def test_every_nth_cycle_is_profiled(self, tmp_path):
+        from profiling import Profiler
+
+        profiler = Profiler(tmp_path, every=2, memory_every=0)
+        for _ in range(4):
+            profiler.wrap(busy_cycle)()
+        assert len(profiler.profiles) == 2, (
+            'Профилироваться должен каждый `every`-й цикл'
+        )
+        stats = pstats.Stats(profiler.dump())
+        assert any(function == 'busy_cycle'
+                   for _, _, function in stats.stats), (
+            'В дамп профиля должны попадать функции цикла'
+        )
+        assert profiler.profiles == []
+
+    def test_dump_interval(self, tmp_path):
+        from profiling import Profiler
+
+        now = [0.0]
+        profiler = Profiler(tmp_path, every=1, memory_every=0,
+                            dump_interval=60, clock=lambda: now[0])
+        with profiler.cycle():
+            busy_cycle()
+        assert os.listdir(tmp_path) == []
+        now[0] = 61.0
+        with profiler.cycle():
+            busy_cycle()
+        assert len(os.listdir(tmp_path)) == 1, (
+            'Профили должны сбрасываться на диск раз в `dump_interval`'
+        )
+
+    @pytest.mark.skipif(not hasattr(signal, 'SIGUSR1'),
+                        reason='Нет сигналов SIGUSR1/SIGUSR2')
+    def test_signals(self, tmp_path):
+        from profiling import Profiler
+
+        previous = [signal.getsignal(signal.SIGUSR1),
+                    signal.getsignal(signal.SIGUSR2)]
+        profiler = Profiler(tmp_path, every=0, memory_every=0, burst=2)
+        try:
+            profiler.install_signals()
+            os.kill(os.getpid(), signal.SIGUSR1)
+            for _ in range(3):
+                with profiler.cycle():
+                    busy_cycle()
+            os.kill(os.getpid(), signal.SIGUSR2)
+            with profiler.cycle():
+                busy_cycle()
+        finally:
+            signal.signal(signal.SIGUSR1, previous[0])
+            signal.signal(signal.SIGUSR2, previous[1])
+            profiler.close()
+        names = os.listdir(tmp_path)
+        assert [name.split('-')[0] for name in names] == ['profile'], (
+            'SIGUSR1 должен профилировать `burst` циклов и записать дамп'
+        )
+        assert not profiler.active, (
+            'После серии и снимка профилирование должно выключиться'
+        )
+
+    def test_memory_diff(self, tmp_path):
+        from profiling import Profiler
+
+        if tracemalloc.is_tracing():
+            pytest.skip('tracemalloc уже запущен')
+        kept = []
+        profiler = Profiler(tmp_path, every=0, memory_every=2)
+        try:
+            for _ in range(4):
+                with profiler.cycle():
+                    kept.append(bytearray(100000))
+        finally:
+            profiler.close()
+        assert not tracemalloc.is_tracing()
+        (name,) = os.listdir(tmp_path)
+        with open(os.path.join(tmp_path, name), encoding='utf-8') as file:
+            assert 'test_profiling.py' in file.read(), (
+                'Разница снимков должна указывать на место утечки'
+            )
@@ -0,0 +1,56 @@
+class TestRecording:
+
+    def test_round_trip_and_torn_tail(self, tmp_path):
+        from recording import Record, Recorder, read_records
+
+        path = str(tmp_path / 'capture.bin')
+        records = [
+            Record(1.5, 0.25, 10, 200, 'key', b'{"homeworks": []}' * 10),
+            Record(2.5, 0.5, 20, 500, 'other', b'{}'),
+        ]
+        recorder = Recorder(path)
+        for record in records:
+            recorder.write(record)
+        recorder.close()
+        with open(path, 'ab') as file:
+            file.write(b'\x00' * 7)
+        assert list(read_records(path)) == records, (
+            'Записи должны читаться без изменений, оборванный хвост '
+            'должен пропускаться'
+        )
+
+    def test_session_records_answers(self, tmp_path):
+        import requests
+
+        from benchmarks.standins import PracticumStandIn
+        from checkpoints import token_key
+        from recording import read_records, recorded
+
+        path = str(tmp_path / 'capture.bin')
+        with PracticumStandIn(homeworks=2, seed=1) as practicum:
+            session = recorded(requests.Session(), path)
+            session.get(practicum.url, headers={'Authorization': 'OAuth t'},
+                        params={'from_date': 5})
+            session.recorder.close()
+        [record] = read_records(path)
+        assert record.key == token_key('t'), (
+            'В запись должен попадать хеш токена, а не сам токен'
+        )
+        assert (record.status_code, record.from_date) == (200, 5)
+        assert b'homeworks' in record.body
+
+
+class TestReplay:
+
+    def test_replay_delivers_every_change(self, tmp_path):
+        from benchmarks.replay import replay, synthesize
+
+        path = str(tmp_path / 'capture.bin')
+        synthesize(path, subscribers=20, days=0.1, changes_per_day=20,
+                   error_rate=0)
+        result, samples = replay(path, speed=5000, sample_interval=1800)
+        assert result.operations > 0
+        assert result.extra['notifications'] >= 20, (
+            'Каждый подписчик должен получить уведомление о первой работе'
+        )
+        assert samples and 'polls' in samples[0]
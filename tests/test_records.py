@@ -0,0 +1,96 @@
+import json
+
+import pytest
+
+HOMEWORK = {
+    'id': 7,
+    'status': 'approved',
+    'homework_name': 'student__project.zip',
+    'reviewer_comment': 'Всё нравится',
+    'date_updated': '2020-02-13T14:40:57Z',
+    'lesson_name': 'Проект',
+    'extra': 'не используется',
+}
+
+
+class TestHomeworkRecord:
+
+    def test_reads_like_a_dict(self):
+        from records import HomeworkRecord
+
+        record = HomeworkRecord.from_dict(HOMEWORK)
+        assert record['status'] == 'approved'
+        assert record.get('id') == 7
+        assert 'extra' not in record.to_dict(), (
+            'В записи должны оставаться только используемые поля'
+        )
+        assert not hasattr(record, '__dict__')
+        partial = HomeworkRecord.from_dict({'status': 'approved'})
+        assert partial.get('homework_name', 'default') == 'default'
+        assert 'homework_name' not in partial
+        with pytest.raises(KeyError):
+            partial['homework_name']
+
+    def test_object_hook(self):
+        from records import HomeworkRecord, record_hook
+
+        answer = json.loads(
+            json.dumps({'homeworks': [HOMEWORK], 'current_date': 1}),
+            object_hook=record_hook
+        )
+        assert isinstance(answer, dict)
+        (record,) = answer['homeworks']
+        assert isinstance(record, HomeworkRecord), (
+            'Работы из ответа должны декодироваться сразу в записи'
+        )
+
+    def test_records_pass_the_checks(self):
+        import homework
+        from records import record_hook
+        from status_index import StatusIndex
+
+        answer = json.loads(
+            json.dumps({'homeworks': [HOMEWORK], 'current_date': 1}),
+            object_hook=record_hook
+        )
+        (notification,) = homework.check_response_changes(
+            answer, StatusIndex()
+        )
+        assert notification.message == homework.parse_status(HOMEWORK)
+        assert homework.check_response(answer) == notification.message
+
+    def test_stream_yields_records(self):
+        from records import HomeworkRecord
+        from streaming import AnswerStream
+
+        body = json.dumps({'homeworks': [HOMEWORK], 'current_date': 1})
+        stream = AnswerStream([body.encode()],
+                              record=HomeworkRecord.from_dict)
+        (record,) = stream.homeworks()
+        assert record['homework_name'] == HOMEWORK['homework_name']
+
+
+class TestRenderedMessages:
+
+    def test_messages_are_shared(self):
+        import homework
+
+        first = homework.parse_status(dict(HOMEWORK))
+        second = homework.parse_status(dict(HOMEWORK, id=8))
+        assert first is second, (
+            'Сообщение для одной пары (название, статус) должно '
+            'формироваться один раз'
+        )
+
+    def test_cache_is_bounded_and_follows_verdicts(self, monkeypatch):
+        import homework
+
+        assert homework.render_status.cache_info().maxsize == (
+            homework.MESSAGE_CACHE_SIZE
+        )
+        homework.parse_status(HOMEWORK)
+        monkeypatch.setattr(homework, 'VERDICTS', {'approved': 'Ура'})
+        homework.render_status.cache_clear()
+        assert homework.parse_status(HOMEWORK).endswith('Ура')
+        monkeypatch.undo()
+        homework.render_status.cache_clear()
@@ -0,0 +1,102 @@
+import asyncio
+
+
+class Bot:
+
+    def __init__(self):
+        self.sent = []
+
+    def send_message(self, chat_id, text):
+        self.sent.append(chat_id)
+
+
+class TestResponseCache:
+
+    def test_digest_ignores_current_date(self):
+        from response_cache import body_digest
+
+        first = body_digest(b'{"homeworks": [], "current_date": 100}')
+        second = body_digest(b'{"homeworks": [], "current_date": 200}')
+        assert first[0] == second[0], (
+            'Дайджест не должен зависеть от `current_date`'
+        )
+        assert (first[1], second[1]) == (100, 200)
+        assert body_digest(b'{"homeworks": [1]}')[1] is None
+
+    def test_lru_eviction(self):
+        from response_cache import ResponseCache
+
+        cache = ResponseCache(max_size=2)
+        cache.put('a', 1)
+        cache.put('b', 2)
+        cache.get('a')
+        cache.put('c', 3)
+        assert cache.get('b') is None, (
+            'Из кэша должна вытесняться давно не использованная запись'
+        )
+        assert (cache.get('a'), cache.get('c'), len(cache)) == (1, 3, 2)
+
+
+class TestCachedPolling:
+
+    def poll_twice(self, **standin):
+        import engine
+        from benchmarks.standins import PracticumStandIn
+        from metrics import RESPONSE_CACHE
+        from response_cache import ResponseCache
+
+        before = dict(RESPONSE_CACHE.values)
+        subscription = engine.Subscription('token', 'chat')
+        bot = Bot()
+        with PracticumStandIn(homeworks=3, stable=True, **standin) as api:
+            polling = engine.PollingEngine(
+                [subscription], bot, api.url, cache=ResponseCache()
+            )
+            polling.timestamps[subscription.token] = 1
+            asyncio.run(polling.poll(subscription.token))
+            asyncio.run(polling.poll(subscription.token))
+        assert bot.sent == ['chat'] * 3
+        return {key[0]: value - before.get(key, 0)
+                for key, value in RESPONSE_CACHE.values.items()}, polling
+
+    def test_same_body_skips_decode(self):
+        counts, polling = self.poll_twice()
+        assert counts.get('same_body') == 1, (
+            'Неизменившийся ответ не должен декодироваться повторно'
+        )
+        assert polling.timestamps['token'] > 0, (
+            '`current_date` должен обновляться и без декодирования'
+        )
+
+    def test_etag(self):
+        counts, _ = self.poll_twice(etag=True)
+        assert counts.get('not_modified') == 1, (
+            'При поддержке ETag должен отправляться условный запрос'
+        )
+
+    def test_failed_delivery_keeps_validators(self):
+        import engine
+        from benchmarks.standins import PracticumStandIn
+        from response_cache import ResponseCache
+
+        class FailingBot(Bot):
+            def send_message(self, chat_id, text):
+                raise ConnectionError('telegram')
+
+        subscription = engine.Subscription('token', 'chat')
+        cache = ResponseCache()
+        with PracticumStandIn(homeworks=3, stable=True) as api:
+            polling = engine.PollingEngine(
+                [subscription], FailingBot(), api.url, cache=cache
+            )
+            polling.timestamps[subscription.token] = 1
+            asyncio.run(polling.poll(subscription.token))
+            assert cache.get(subscription.token) is None, (
+                'Валидаторы не должны сохраняться до отправки уведомлений'
+            )
+            polling.bot = Bot()
+            asyncio.run(polling.poll(subscription.token))
+        assert polling.bot.sent == ['chat'] * 3, (
+            'После ошибки отправки ответ должен разбираться повторно'
+        )
+        assert cache.get(subscription.token) is not None
@@ -0,0 +1,102 @@
+from email.utils import formatdate
+
+
+class FakeClock:
+
+    def __init__(self, now=1_000_000.0):
+        self.now = now
+        self.slept = []
+
+    def time(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.slept.append(seconds)
+        self.now += seconds
+
+
+class RetryError(RuntimeError):
+
+    def __init__(self, retry_after):
+        super().__init__('retry')
+        self.retry_after = retry_after
+
+
+class TestPollingPolicy:
+
+    def make_policy(self, **kwargs):
+        from scheduling import PollingPolicy
+
+        kwargs.setdefault('clock', FakeClock())
+        kwargs.setdefault('rand', lambda: 0.5)
+        return PollingPolicy(300, 30, reviewing_retry_time=60, **kwargs)
+
+    def test_cadence_depends_on_review(self):
+        from status_index import StatusIndex
+
+        policy = self.make_policy()
+        statuses = StatusIndex()
+        assert policy.on_success(statuses) == 300, (
+            'Пока статусы неизвестны, опрос идёт с `RETRY_TIME`'
+        )
+        statuses.diff([{'id': 1, 'status': 'reviewing'}])
+        assert policy.on_success(statuses) == 60, (
+            'Во время ревью опрос должен ускоряться'
+        )
+        statuses.diff([{'id': 1, 'status': 'approved'}])
+        assert policy.on_success(statuses) == 900, (
+            'Без работ на ревью опрос должен замедляться'
+        )
+
+    def test_set_cadence_keeps_idle_override(self):
+        policy = self.make_policy(idle_retry_time=3600)
+        policy.set_cadence(120, 20)
+        assert (policy.retry_time, policy.idle_retry_time) == (120, 3600), (
+            'Заданный явно `idle_retry_time` не должен пересчитываться'
+        )
+        policy = self.make_policy()
+        policy.set_cadence(120, 20)
+        assert policy.idle_retry_time == 360
+
+    def test_backoff_is_capped_and_reset(self):
+        policy = self.make_policy(rand=lambda: 1.0, max_error_retry_time=100)
+        delays = [policy.on_error(ValueError()) for _ in range(4)]
+        assert delays == [30, 60, 100, 100], (
+            'Задержка после ошибок должна расти экспоненциально до предела'
+        )
+        policy.on_success()
+        assert policy.on_error(ValueError()) == 30, (
+            'Успешный опрос должен сбрасывать счётчик ошибок'
+        )
+
+    def test_retry_after(self):
+        clock = FakeClock()
+        policy = self.make_policy(clock=clock, rand=lambda: 0.0)
+        assert policy.on_error(RetryError('120')) == 120, (
+            'Нужно учитывать `Retry-After` в секундах'
+        )
+        header = formatdate(clock.now + 600, usegmt=True)
+        assert policy.on_error(RetryError(header)) == 600, (
+            'Нужно учитывать `Retry-After` в формате даты'
+        )
+        assert policy.on_error(RetryError('garbage')) == 60
+
+    def test_status_code_error_keeps_retry_after(self):
+        import homework
+
+        class Response:
+            status_code = 429
+            headers = {'Retry-After': '42'}
+
+        homework.use_session(type('Session', (), {
+            'get': staticmethod(lambda **kwargs: Response())
+        }))
+        try:
+            homework.get_api_answer('http://localhost/', 0)
+        except homework.UnexpectedStatusCodeError as error:
+            assert error.status_code == 429
+            assert error.retry_after == '42'
+        else:
+            assert False, 'Ожидалась ошибка `UnexpectedStatusCodeError`'
+        finally:
+            homework.use_session(None)
@@ -0,0 +1,164 @@
+from collections import Counter
+
+
+class FakeClock:
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+class FakeEngine:
+
+    checkpoints = None
+
+    def __init__(self):
+        self.tokens = set()
+        self.polls = {}
+
+    def add_subscription(self, subscription):
+        self.tokens.add(subscription.token)
+
+    def remove_subscription(self, subscription):
+        self.tokens.discard(subscription.token)
+
+
+def make_subscriptions(count):
+    from subscriptions import Subscription
+
+    return [Subscription(f'token{number}', 'chat') for number in range(count)]
+
+
+class TestHashRing:
+
+    def test_balanced_and_stable(self):
+        from sharding import HashRing
+
+        keys = [f'token{number}' for number in range(3000)]
+        ring = HashRing(['a', 'b', 'c'])
+        owners = {key: ring.owner(key) for key in keys}
+        assert min(Counter(owners.values()).values()) > 600, (
+            'Токены должны распределяться между воркерами равномерно'
+        )
+        smaller = HashRing(['a', 'b'])
+        moved = [key for key in keys
+                 if owners[key] != 'c' and smaller.owner(key) != owners[key]]
+        assert moved == [], (
+            'При уходе воркера должны переезжать только его токены'
+        )
+        assert HashRing().owner('token') is None
+
+
+class TestShardWorker:
+
+    def test_shards_do_not_overlap_and_rebalance(self, tmp_path):
+        from sharding import Coordinator, ShardWorker
+
+        path = str(tmp_path / 'coordinator.sqlite3')
+        clock = FakeClock()
+        subscriptions = make_subscriptions(200)
+        workers = [
+            ShardWorker(FakeEngine(), subscriptions,
+                        Coordinator(path, timeout=15, clock=clock), name)
+            for name in ('a', 'b', 'c')
+        ]
+        for worker in workers:
+            worker.rebalance()
+        for _ in range(3):
+            clock.now += 5
+            for worker in workers:
+                worker.rebalance()
+        polled = [token for worker in workers for token in worker.engine.tokens]
+        assert sorted(polled) == sorted(s.token for s in subscriptions), (
+            'Каждый токен должен опрашиваться ровно одним воркером'
+        )
+
+        dead, alive = workers[0], workers[1:]
+        for _ in range(6):
+            clock.now += 5
+            for worker in alive:
+                worker.rebalance()
+                tokens = [token for other in alive
+                          for token in other.engine.tokens]
+                assert len(tokens) == len(set(tokens)), (
+                    'Во время перебалансировки токен не должен '
+                    'опрашиваться дважды'
+                )
+        polled = [token for worker in alive for token in worker.engine.tokens]
+        assert sorted(polled) == sorted(s.token for s in subscriptions), (
+            'Токены упавшего воркера должны перейти к живым'
+        )
+        assert dead.engine.tokens
+
+    def test_heartbeat_does_not_wait_for_polls(self, tmp_path):
+        import asyncio
+
+        from sharding import Coordinator, ShardWorker
+
+        engine = FakeEngine()
+        shard = ShardWorker(
+            engine, make_subscriptions(5),
+            Coordinator(str(tmp_path / 'coordinator.sqlite3')), 'a',
+            interval=0.01
+        )
+
+        async def run():
+            task = asyncio.ensure_future(shard.run())
+            await asyncio.sleep(0.2)
+            task.cancel()
+
+        asyncio.run(run())
+        assert len(engine.tokens) == 5, (
+            'Аренды должны продлеваться вне пула потоков опроса'
+        )
+
+    def test_expired_lease_is_not_polled(self, tmp_path):
+        import asyncio
+
+        import engine
+        from sharding import Coordinator, ShardWorker
+        from timer_wheel import TimerWheel
+
+        clock = FakeClock()
+        polled = []
+        polling = engine.PollingEngine(
+            [], None, wheel=TimerWheel(clock=clock)
+        )
+
+        async def poll(token):
+            polled.append(token)
+            return 60
+
+        polling.poll = poll
+        shard = ShardWorker(
+            polling, make_subscriptions(1),
+            Coordinator(str(tmp_path / 'coordinator.sqlite3'), timeout=15,
+                        clock=clock), 'a'
+        )
+        shard.rebalance()
+        asyncio.run(polling.poll_and_reschedule('token0'))
+        clock.now += 16
+        asyncio.run(polling.poll_and_reschedule('token0'))
+        assert polled == ['token0'], (
+            'Токен с истёкшей арендой не должен опрашиваться до её продления'
+        )
+        polling.executor.shutdown()
+
+
+class TestEngineSubscriptions:
+
+    def test_add_and_remove_live(self):
+        import engine
+        from timer_wheel import TimerWheel
+
+        wheel = TimerWheel(clock=FakeClock())
+        polling = engine.PollingEngine([], None, wheel=wheel)
+        subscription = engine.Subscription('token', 'chat')
+        assert polling.add_subscription(subscription) is True
+        assert 'token' in wheel, 'Новый токен должен планироваться в колесе'
+        assert polling.remove_subscription(subscription) is True
+        assert 'token' not in wheel, (
+            'Токен без подписок должен сниматься с расписания'
+        )
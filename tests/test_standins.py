@@ -0,0 +1,48 @@
+import pytest
+
+
+class TestStandIns:
+
+    def test_practicum_standin(self):
+        import homework
+        from benchmarks.standins import PracticumStandIn
+
+        with PracticumStandIn(homeworks=4, seed=1) as practicum:
+            answer = homework.request_api_answer(
+                practicum.url, 0, homework.make_headers('token')
+            )
+        assert len(answer['homeworks']) == 4, (
+            'Заглушка должна отдавать заданное количество работ'
+        )
+        assert homework.check_response(answer)
+
+    def test_practicum_standin_errors(self):
+        import homework
+        from benchmarks.standins import PracticumStandIn
+
+        with PracticumStandIn(error_rate=1.0) as practicum:
+            with pytest.raises(homework.UnexpectedStatusCodeError) as error:
+                homework.request_api_answer(
+                    practicum.url, 0, homework.make_headers('token')
+                )
+        assert error.value.retry_after == '1'
+
+    def test_telegram_standin(self):
+        import homework
+        from benchmarks.standins import TelegramStandIn
+
+        with TelegramStandIn() as telegram:
+            homework.send_message_to(telegram.bot(), '42', 'Привет')
+        assert telegram.messages == [('42', 'Привет')], (
+            'Заглушка Telegram должна принимать `sendMessage`'
+        )
+
+    def test_benchmark_runs(self):
+        from benchmarks import bench_poll
+
+        results = bench_poll.run(['sync', 'engine'], subscribers=5, cycles=1,
+                                 latency=0, error_rate=0, homeworks=2)
+        for result in results:
+            summary = result.summary()
+            assert summary['operations'] == 5
+            assert summary['api_requests'] == 5
@@ -0,0 +1,54 @@
+import subprocess
+import sys
+from os.path import abspath, dirname
+
+import pytest
+
+ROOT = dirname(dirname(abspath(__file__)))
+
+
+class TestStartup:
+
+    def test_import_is_light(self):
+        loaded = subprocess.run(
+            [sys.executable, '-c',
+             'import sys, engine; '
+             'print(",".join(name for name in ("telegram", "requests", '
+             '"cProfile", "pstats", "tracemalloc") '
+             'if name in sys.modules))'],
+            cwd=ROOT, capture_output=True, text=True, check=True
+        ).stdout.strip()
+        assert loaded == '', (
+            'Импорт модулей бота не должен загружать `telegram`, `requests` '
+            'и профилировщики'
+        )
+
+    def test_require_tokens(self, monkeypatch):
+        import homework
+
+        monkeypatch.setenv('PRAKTIKUM_TOKEN', 'token')
+        monkeypatch.delenv('TELEGRAM_TOKEN', raising=False)
+        monkeypatch.delenv('TELEGRAM_CHAT_ID', raising=False)
+        assert homework.check_tokens() == ['TELEGRAM_TOKEN',
+                                           'TELEGRAM_CHAT_ID']
+        with pytest.raises(SystemExit):
+            homework.require_tokens()
+
+    def test_lazy_client(self):
+        from lazy import LazyClient
+
+        built = []
+
+        class Client:
+            def ping(self):
+                return 'pong'
+
+        def factory():
+            built.append(True)
+            return Client()
+
+        client = LazyClient(factory)
+        assert not client.built, 'Клиент не должен создаваться заранее'
+        assert client.ping() == 'pong'
+        assert client.ping() == 'pong'
+        assert built == [True], 'Клиент должен создаваться один раз'
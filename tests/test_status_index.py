@@ -0,0 +1,120 @@
+import pytest
+
+
+class TestStatusIndex:
+
+    def test_only_transitions_are_returned(self):
+        from status_index import StatusIndex
+
+        index = StatusIndex()
+        first = [
+            {'id': 1, 'homework_name': 'hw1', 'status': 'reviewing'},
+            {'id': 2, 'homework_name': 'hw2', 'status': 'reviewing'},
+        ]
+        assert index.diff(first) == first, (
+            'Впервые увиденные работы должны считаться изменившимися'
+        )
+        assert index.diff(first) == [], (
+            'Работы без смены статуса не должны возвращаться'
+        )
+        second = [
+            {'id': 1, 'homework_name': 'hw1', 'status': 'approved'},
+            {'id': 2, 'homework_name': 'hw2', 'status': 'rejected'},
+        ]
+        assert index.diff(second) == second, (
+            'Одновременные переходы по нескольким работам не должны теряться'
+        )
+        assert len(index) == 2
+
+    def test_check_response_changes(self):
+        import homework
+        from status_index import StatusIndex
+
+        index = StatusIndex()
+        response = {
+            'homeworks': [{'homework_name': 'hw1', 'status': 'approved'}],
+            'current_date': 1
+        }
+        notifications = homework.check_response_changes(response, index)
+        assert len(notifications) == 1
+        assert homework.check_response_changes(response, index) == (
+            notifications
+        ), 'До сохранения уведомлений индекс не должен меняться'
+        homework.commit_changes(notifications, index)
+        assert homework.check_response_changes(response, index) == [], (
+            'Повторный опрос без изменений не должен порождать сообщений'
+        )
+        assert homework.check_response_changes(
+            {'homeworks': [], 'current_date': 2}, index
+        ) == [], 'Пустой список работ означает отсутствие изменений'
+        with pytest.raises(ValueError):
+            homework.check_response_changes({'current_date': 3}, index)
+
+    def test_unknown_status_keeps_other_changes(self):
+        import homework
+        from status_index import StatusIndex
+
+        index = StatusIndex()
+        response = {
+            'homeworks': [
+                {'id': 1, 'homework_name': 'hw1', 'status': 'approved'},
+                {'id': 2, 'homework_name': 'hw2', 'status': 'unknown'},
+            ],
+            'current_date': 1
+        }
+        with pytest.raises(ValueError):
+            homework.check_response_changes(response, index)
+        response['homeworks'].pop()
+        notifications = homework.check_response_changes(response, index)
+        assert [item.status for item in notifications] == ['approved'], (
+            'Смена статуса не должна теряться из-за ошибки в другой работе'
+        )
+
+    @pytest.mark.parametrize('tail', [b', "code": "err"}', b', "curr'])
+    def test_stream_error_keeps_changes(self, tail):
+        import homework
+        from status_index import StatusIndex
+        from streaming import AnswerStream
+
+        homeworks = (
+            b'{"homeworks": [{"id": 1, "homework_name": "hw1", '
+            b'"status": "approved"}]'
+        )
+        index = StatusIndex()
+        with pytest.raises((RuntimeError, ValueError)):
+            homework.check_stream_changes(
+                AnswerStream([homeworks + tail]), index
+            )
+        assert index.statuses == {}, (
+            'Ошибка после списка работ не должна отмечать их как увиденные'
+        )
+        notifications = homework.check_stream_changes(
+            AnswerStream([homeworks + b'}']),
+            index
+        )
+        assert len(notifications) == 1
+
+    def test_first_poll_sends_only_latest(self):
+        import homework
+        from status_index import StatusIndex
+
+        index = StatusIndex()
+        response = {
+            'homeworks': [
+                {'id': number, 'homework_name': f'hw{number}',
+                 'status': 'approved'}
+                for number in range(30)
+            ],
+            'current_date': 1
+        }
+        notifications = homework.check_response_changes(response, index)
+        to_send = homework.notifications_to_send(notifications, 0)
+        assert [item.homework['id'] for item in to_send] == [0], (
+            'Опрос без контрольной точки должен сообщать только о последней '
+            'работе, а не обо всей истории'
+        )
+        homework.commit_changes(notifications, index)
+        assert len(index) == 30, 'Вся история должна попасть в индекс'
+        assert homework.notifications_to_send(notifications, 1) == (
+            notifications
+        ), 'Опрос с контрольной точкой сообщает о каждом изменении'
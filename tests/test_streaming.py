@@ -0,0 +1,94 @@
+import asyncio
+import json
+
+import pytest
+
+
+def chunked(data, size):
+    body = json.dumps(data, ensure_ascii=False).encode()
+    return [body[start:start + size] for start in range(0, len(body), size)]
+
+
+class TestAnswerStream:
+
+    @pytest.mark.parametrize('size', [1, 7, 64, 100000])
+    def test_matches_json_loads(self, size):
+        from streaming import AnswerStream
+
+        data = {
+            'homeworks': [
+                {'id': number, 'status': 'approved',
+                 'homework_name': f'проект {number}', 'score': 1.5e3}
+                for number in range(20)
+            ],
+            'current_date': 1234567890
+        }
+        assert AnswerStream(chunked(data, size)).read() == data, (
+            'Потоковый разбор должен давать тот же результат, что и `json`'
+        )
+
+    def test_homeworks_are_lazy(self):
+        from streaming import AnswerStream
+
+        chunks = chunked({'homeworks': [{'id': 1}, {'id': 2}],
+                          'current_date': 5}, 4)
+        consumed = []
+
+        def source():
+            for chunk in chunks:
+                consumed.append(chunk)
+                yield chunk
+
+        stream = AnswerStream(source())
+        homeworks = stream.homeworks()
+        assert next(homeworks) == {'id': 1}
+        assert len(consumed) < len(chunks), (
+            'Работы должны выдаваться до чтения всего ответа'
+        )
+        assert list(homeworks) == [{'id': 2}]
+        assert stream.fields == {'current_date': 5}
+
+    def test_error_key_stops_early(self):
+        from streaming import AnswerStream, ErrorKeyFound
+
+        chunks = chunked({'code': 'not_authenticated',
+                          'homeworks': [{'id': number}
+                                        for number in range(1000)]}, 16)
+        source = iter(chunks)
+        with pytest.raises(ErrorKeyFound) as error:
+            AnswerStream(source).read()
+        assert error.value.key == 'code'
+        assert len(list(source)) > 0, (
+            'Ключ ошибки должен обнаруживаться без чтения всего ответа'
+        )
+
+    def test_invalid_json(self):
+        from streaming import AnswerStream
+
+        with pytest.raises(ValueError):
+            AnswerStream([b'{"homeworks": [{"id": 1}']).read()
+
+
+class TestStreamingEngine:
+
+    def test_engine_streaming_mode(self):
+        import engine
+        from benchmarks.standins import PracticumStandIn
+
+        sent = []
+
+        class Bot:
+            def send_message(self, chat_id, text):
+                sent.append(chat_id)
+
+        subscription = engine.Subscription('token', 'chat')
+        with PracticumStandIn(homeworks=3, seed=1) as practicum:
+            polling = engine.PollingEngine(
+                [subscription], Bot(), practicum.url, streaming=True
+            )
+            polling.timestamps[subscription.token] = 1
+            asyncio.run(polling.poll(subscription.token))
+        assert sent == ['chat'] * 3, (
+            'В потоковом режиме каждая работа должна дать уведомление'
+        )
+        assert polling.timestamps[subscription.token] > 0
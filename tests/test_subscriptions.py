@@ -0,0 +1,84 @@
+import asyncio
+import threading
+import time
+from http import HTTPStatus
+
+import requests
+
+
+class FakeResponse:
+
+    def __init__(self, data):
+        self.data = data
+        self.status_code = HTTPStatus.OK
+
+    def json(self):
+        return self.data
+
+
+class FakeBot:
+
+    def __init__(self):
+        self.sent = []
+
+    def send_message(self, chat_id, text):
+        self.sent.append(chat_id)
+
+
+class TestSubscriptionIndex:
+
+    def test_add_and_remove(self):
+        from subscriptions import Subscription, SubscriptionIndex
+
+        index = SubscriptionIndex([
+            Subscription('a', 'chat1'),
+            Subscription('a', 'chat2'),
+            Subscription('b', 'chat1'),
+        ])
+        assert index.tokens() == ['a', 'b']
+        assert index.chats('a') == ('chat1', 'chat2')
+        assert len(index) == 3
+        assert index.add(Subscription('a', 'chat3')) is False
+        assert index.add(Subscription('c', 'chat1')) is True
+        assert index.remove(Subscription('b', 'chat1')) is True, (
+            'Токен без чатов должен удаляться из индекса'
+        )
+        assert index.remove(Subscription('a', 'chat1')) is False
+        assert 'b' not in index
+
+
+class TestFanOut:
+
+    def test_one_request_per_token(self, monkeypatch, api_url):
+        import engine
+
+        calls = []
+        lock = threading.Lock()
+
+        def fake_get(url, headers, params):
+            with lock:
+                calls.append(headers['Authorization'])
+            time.sleep(0.05)
+            return FakeResponse({
+                'homeworks': [{'homework_name': 'hw', 'status': 'approved'}],
+                'current_date': 1
+            })
+
+        monkeypatch.setattr(requests, 'get', fake_get)
+        subscriptions = [engine.Subscription('mentor', f'chat{number}')
+                         for number in range(5)]
+        subscriptions.append(engine.Subscription('student', 'chat0'))
+        bot = FakeBot()
+        polling = engine.PollingEngine(subscriptions, bot, api_url)
+
+        async def poll_concurrently():
+            await asyncio.gather(polling.poll_all(), polling.poll('mentor'))
+
+        asyncio.run(poll_concurrently())
+        assert sorted(calls) == ['OAuth mentor', 'OAuth student'], (
+            'Число запросов к API должно зависеть от числа токенов, '
+            'а одновременные опросы одного токена должны объединяться'
+        )
+        assert sorted(bot.sent) == sorted(
+            [f'chat{number}' for number in range(5)] + ['chat0']
+        ), 'Уведомление должно уйти во все чаты, следящие за токеном'
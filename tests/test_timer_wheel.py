@@ -0,0 +1,103 @@
+import asyncio
+import random
+from functools import partial
+
+
+class FakeClock:
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestTimerWheel:
+
+    def test_jobs_fire_on_their_tick(self):
+        from timer_wheel import TimerWheel
+
+        wheel = TimerWheel(clock=FakeClock(), bits=(4, 3, 3))
+        generator = random.Random(1)
+        delays = {f'job{number}': generator.randint(1, 700)
+                  for number in range(300)}
+        for job, delay in delays.items():
+            wheel.schedule(job, delay)
+        fired = {}
+        for tick in range(1, 701):
+            for job in wheel.advance_ticks(1):
+                fired[job] = tick
+        assert fired == delays, (
+            'Каждая задача должна срабатывать ровно в свой тик, '
+            'в том числе после каскадирования уровней'
+        )
+        assert len(wheel) == 0
+
+    def test_overflow(self):
+        from timer_wheel import TimerWheel
+
+        wheel = TimerWheel(clock=FakeClock(), bits=(2, 2))
+        wheel.schedule('far', 40)
+        fired = [tick for tick in range(1, 50) if wheel.advance_ticks(1)]
+        assert fired == [40], 'Задачи за горизонтом колеса не должны теряться'
+
+    def test_cancel_and_reschedule(self):
+        from timer_wheel import TimerWheel
+
+        clock = FakeClock()
+        wheel = TimerWheel(clock=clock)
+        wheel.schedule('a', 5)
+        wheel.schedule('b', 5)
+        assert wheel.cancel('a') is True
+        assert wheel.cancel('a') is False
+        wheel.schedule('b', 10)
+        clock.now = 5
+        assert wheel.advance() == []
+        clock.now = 10
+        assert wheel.advance() == ['b'], (
+            'Перепланированная задача должна сработать в новое время'
+        )
+
+    def test_spread(self):
+        from timer_wheel import TimerWheel
+
+        wheel = TimerWheel(clock=FakeClock())
+        for number in range(6000):
+            wheel.schedule_spread(number, 60)
+        batches = [len(wheel.advance_ticks(1)) for _ in range(60)]
+        assert sum(batches) == 6000
+        assert max(batches) < 200, (
+            'Задачи с одинаковым интервалом должны распределяться по тикам'
+        )
+
+
+class TestEngineWheel:
+
+    def test_dispatch_polls_due_subscriptions(self):
+        import engine
+        from timer_wheel import TimerWheel
+
+        polled = []
+
+        class Engine(engine.PollingEngine):
+            async def poll(self, token):
+                polled.append(token)
+                return 0.01
+
+        subscriptions = [engine.Subscription(f'token{number}', 'chat')
+                         for number in range(5)]
+        polling = Engine(
+            subscriptions, None, wheel=TimerWheel(resolution=0.01),
+            policy_factory=partial(engine.PollingPolicy, 1, 1)
+        )
+
+        async def run_briefly():
+            task = asyncio.ensure_future(polling.dispatch(spread=0.05))
+            await asyncio.sleep(0.3)
+            task.cancel()
+
+        asyncio.run(run_briefly())
+        assert set(polled) == {s.token for s in subscriptions}
+        assert len(polled) > len(subscriptions), (
+            'После опроса подписка должна снова планироваться в колесе'
+        )
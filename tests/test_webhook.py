@@ -0,0 +1,227 @@
+import asyncio
+
+import pytest
+
+
+class Bot:
+
+    def __init__(self):
+        self.sent = []
+
+    def send_message(self, chat_id, text):
+        self.sent.append((chat_id, text))
+
+
+def homework_event(status='approved', number=1):
+    return [{'id': number, 'homework_name': 'project.zip', 'status': status}]
+
+
+class TestValidateEvent:
+
+    @pytest.mark.parametrize('event', [
+        [],
+        {'homeworks': []},
+        {'homeworks': {}},
+        {'homeworks': ['approved']},
+        {'homeworks': homework_event('unknown')},
+        {'homeworks': [{'status': 'approved'}]},
+    ])
+    def test_invalid_events(self, event):
+        from webhook import validate_event
+
+        with pytest.raises((ValueError, KeyError)):
+            validate_event(event)
+
+    def test_valid_event(self):
+        from webhook import validate_event
+
+        homeworks = homework_event()
+        assert validate_event({'homeworks': homeworks}) is homeworks
+
+
+class TestWebhookIngestion:
+
+    def run_engine(self, scenario, secret='secret'):
+        import engine
+        from benchmarks.standins import RelayStandIn
+        from webhook import start_webhook_server
+
+        bot = Bot()
+        polling = engine.PollingEngine(
+            [engine.Subscription('token', 'chat')], bot
+        )
+        server = start_webhook_server(polling.push, port=0, secret=secret)
+        relay = RelayStandIn(
+            f'http://127.0.0.1:{server.server_port}', secret
+        )
+
+        async def run():
+            loop = asyncio.get_running_loop()
+
+            async def push(*args, **kwargs):
+                return await loop.run_in_executor(
+                    None, lambda: relay.push(*args, **kwargs)
+                )
+
+            polling.loop = loop
+            result = await scenario(push)
+            await asyncio.sleep(0.01)
+            await asyncio.gather(*(
+                task for task in asyncio.all_tasks()
+                if task is not asyncio.current_task()
+            ))
+            return result
+
+        try:
+            codes = asyncio.run(run())
+        finally:
+            server.shutdown()
+            polling.executor.shutdown()
+        return codes, bot.sent
+
+    def test_pushed_change_is_sent_once(self):
+        import homework
+
+        async def scenario(push):
+            return [
+                await push('token', homework_event('reviewing')),
+                await push('token', homework_event('reviewing')),
+                await push('token', homework_event('approved')),
+            ]
+
+        codes, sent = self.run_engine(scenario)
+        assert codes == [202, 202, 202]
+        assert [chat for chat, _ in sent] == ['chat', 'chat'], (
+            'Повторное событие с тем же статусом не должно '
+            'приводить к новому сообщению'
+        )
+        assert sent[-1][1] == homework.parse_status(
+            homework_event('approved')[0]
+        )
+
+    def test_rejected_events(self):
+        async def scenario(push):
+            return [
+                await push('unknown', homework_event()),
+                await push('token', homework_event('unknown')),
+            ]
+
+        codes, sent = self.run_engine(scenario)
+        assert codes == [404, 400], (
+            'Событие неизвестного аккаунта и с неизвестным статусом '
+            'должны отклоняться'
+        )
+        assert sent == []
+
+    def test_secret_is_required(self):
+        import engine
+        from benchmarks.standins import RelayStandIn
+        from webhook import start_webhook_server
+
+        polling = engine.PollingEngine([engine.Subscription('token', 'c')],
+                                       Bot())
+        server = start_webhook_server(polling.push, port=0, secret='secret')
+        url = f'http://127.0.0.1:{server.server_port}'
+        try:
+            assert RelayStandIn(url, 'wrong').push(
+                'token', homework_event()
+            ) == 403, 'Событие без верного секрета должно отклоняться'
+            assert RelayStandIn(url, 'secret').push(
+                'token', homework_event()
+            ) == 503, 'До запуска движка события должны отклоняться'
+        finally:
+            server.shutdown()
+            polling.executor.shutdown()
+
+    @pytest.mark.parametrize('address', ['0.0.0.0', '', '10.0.0.5'])
+    def test_public_address_requires_secret(self, address):
+        from webhook import start_webhook_server
+
+        with pytest.raises(ValueError):
+            start_webhook_server(print, port=0, address=address, secret=None)
+
+    def test_loopback_without_secret(self):
+        from webhook import start_webhook_server
+
+        server = start_webhook_server(print, port=0, address='127.0.0.1',
+                                      secret=None)
+        server.shutdown()
+        server.server_close()
+
+
+class TestShardedWebhook:
+
+    def test_supervisor_routes_events_to_lease_owner(self, tmp_path):
+        import queue
+
+        from benchmarks.standins import RelayStandIn
+        from checkpoints import token_key
+        from sharding import Coordinator, EventRouter, worker_name
+        from webhook import start_webhook_server
+
+        class Process:
+            def __init__(self, pid):
+                self.pid = pid
+
+            def is_alive(self):
+                return True
+
+        coordinator = Coordinator(str(tmp_path / 'coordinator.sqlite3'))
+        processes = {0: Process(100), 1: Process(101)}
+        queues = {0: queue.Queue(), 1: queue.Queue()}
+        coordinator.claim(worker_name(100), [token_key('token0')])
+        coordinator.claim(worker_name(101), [token_key('token1')])
+        server = start_webhook_server(
+            EventRouter(coordinator, processes, queues).push,
+            port=0, secret='secret'
+        )
+        relay = RelayStandIn(f'http://127.0.0.1:{server.server_port}',
+                             'secret')
+        try:
+            codes = [relay.push(token, homework_event())
+                     for token in ('token1', 'token0', 'token2')]
+        finally:
+            server.shutdown()
+        assert codes == [202, 202, 404], (
+            'Супервизор должен принимать события токенов любого шарда'
+        )
+        assert [queues[number].get_nowait()[0] for number in (0, 1)] == [
+            token_key('token0'), token_key('token1')
+        ], 'Событие должно уходить воркеру, который держит аренду токена'
+
+    def test_workers_do_not_bind_webhook_port(self, monkeypatch, tmp_path):
+        import engine
+
+        started = []
+        monkeypatch.chdir(tmp_path)
+        monkeypatch.setattr(engine.Profiler, 'install_signals', lambda _: None)
+        monkeypatch.setattr(engine, 'start_http_server', lambda port: None)
+        monkeypatch.setattr(engine, 'start_webhook_server', started.append)
+        polling = engine.build_engine((), outbox_path=':memory:',
+                                      serve_webhook=False)
+        polling.outbound.stop(timeout=1)
+        polling.executor.shutdown()
+        assert started == [], 'Воркеры шардов не должны занимать порт вебхука'
+
+    def test_worker_forwards_routed_events(self):
+        import queue
+
+        from sharding import forward_events
+
+        class Engine:
+            def __init__(self):
+                self.pushed = []
+
+            def push(self, account, homeworks):
+                if not self.pushed:
+                    self.pushed.append(None)
+                    raise RuntimeError('not running')
+                self.pushed.append(account)
+                return True
+
+        events = queue.Queue()
+        for account in ('early', 'account', None):
+            events.put(None if account is None else (account, []))
+        polling = Engine()
+        forward_events(polling, events)
+        assert polling.pushed == [None, 'account']
@@ -0,0 +1,147 @@
+import time
+import zlib
+
+WHEEL_RESOLUTION = 1.0
+WHEEL_BITS = (8, 6, 6, 6, 6)
+
+
+class Timer:
+    """Handle of a scheduled job."""
+
+    __slots__ = ('job', 'due', 'slot')
+
+    def __init__(self, job, due):
+        self.job = job
+        self.due = due
+        self.slot = None
+
+
+class TimerWheel:
+    """Hierarchical timer wheel with O(1) schedule, cancel and reschedule.
+
+    Level 0 holds one slot per tick, every next level covers the whole
+    previous one per slot and is cascaded down when the lower level wraps.
+    """
+
+    def __init__(self, resolution=WHEEL_RESOLUTION, clock=time.monotonic,
+                 bits=WHEEL_BITS):
+        self.resolution = resolution
+        self.clock = clock
+        self.origin = clock()
+        self.tick = 0
+        self.bits = bits
+        self.shifts = []
+        shift = 0
+        for level_bits in bits:
+            self.shifts.append(shift)
+            shift += level_bits
+        self.horizon = 1 << shift
+        self.level_of = [
+            next(level for level, level_shift in enumerate(self.shifts)
+                 if length <= level_shift + bits[level])
+            for length in range(shift + 1)
+        ]
+        self.levels = [[{} for _ in range(1 << level_bits)]
+                       for level_bits in bits]
+        self.overflow = {}
+        self.timers = {}
+
+    def __len__(self):
+        return len(self.timers)
+
+    def __contains__(self, job):
+        return job in self.timers
+
+    def ticks(self, seconds):
+        return max(1, int(-(-seconds // self.resolution)))
+
+    def _place(self, timer):
+        delta = timer.due - self.tick
+        if delta >= self.horizon:
+            slot = self.overflow
+        else:
+            level = self.level_of[delta.bit_length()]
+            slots = self.levels[level]
+            slot = slots[(timer.due >> self.shifts[level]) & (len(slots) - 1)]
+        slot[timer] = None
+        timer.slot = slot
+
+    def schedule(self, job, delay):
+        """Scheduling (or rescheduling) a job `delay` seconds from now."""
+        due = self.tick + self.ticks(delay)
+        timer = self.timers.get(job)
+        if timer is None:
+            timer = self.timers[job] = Timer(job, due)
+        else:
+            del timer.slot[timer]
+            timer.due = due
+        self._place(timer)
+        return timer
+
+    def schedule_spread(self, job, window, key=None):
+        """Scheduling a job at a stable offset inside `window` seconds.
+
+        Offsets come from a hash of the key, so equal intervals do not make
+        all jobs wake up on the same tick.
+        """
+        window_ticks = self.ticks(window)
+        seed = zlib.crc32(str(job if key is None else key).encode())
+        return self.schedule(
+            job,
+            (seed % window_ticks + 1) * self.resolution
+        )
+
+    def cancel(self, job):
+        timer = self.timers.pop(job, None)
+        if timer is not None:
+            del timer.slot[timer]
+            timer.slot = None
+        return timer is not None
+
+    def _cascade(self):
+        for level in range(1, len(self.levels)):
+            shift = self.shifts[level]
+            if self.tick & ((1 << shift) - 1):
+                return
+            slots = self.levels[level]
+            slot = slots[(self.tick >> shift) & (len(slots) - 1)]
+            timers = list(slot)
+            slot.clear()
+            for timer in timers:
+                self._place(timer)
+        if self.tick & (self.horizon - 1) == 0 and self.overflow:
+            timers = list(self.overflow)
+            self.overflow.clear()
+            for timer in timers:
+                self._place(timer)
+
+    def advance_ticks(self, ticks):
+        """Moving the wheel forward, returns jobs that became due."""
+        due = []
+        first_level = self.levels[0]
+        mask = len(first_level) - 1
+        for _ in range(ticks):
+            self.tick += 1
+            self._cascade()
+            slot = first_level[self.tick & mask]
+            if slot:
+                for timer in slot:
+                    timer.slot = None
+                    del self.timers[timer.job]
+                    due.append(timer.job)
+                slot.clear()
+        return due
+
+    def advance(self, now=None):
+        """Moving the wheel up to the clock, returns due jobs in a batch."""
+        now = self.clock() if now is None else now
+        target = int((now - self.origin) // self.resolution)
+        return self.advance_ticks(max(0, target - self.tick))
+
+    def next_tick_in(self, now=None):
+        """Seconds until the next tick boundary."""
+        now = self.clock() if now is None else now
+        return max(
+            0.0,
+            self.origin + (self.tick + 1) * self.resolution - now
+        )
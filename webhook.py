@@ -0,0 +1,139 @@
+"""Status changes pushed by an upstream relay.
+
+    POST /events/<account>  {"homeworks": [...], "current_date": ...}
+
+`<account>` is `checkpoints.token_key` of the Practicum token, so the relay
+never needs the token itself. Events are checked with the rules of polled
+answers; polling keeps running as a slow reconciliation.
+"""
+import hmac
+import ipaddress
+import json
+import logging
+import os
+import threading
+
+import homework
+from log_pipeline import LazyMessage
+from metrics import WEBHOOK_EVENTS
+
+WEBHOOK_PORT = os.getenv('WEBHOOK_PORT')
+WEBHOOK_ADDRESS = os.getenv('WEBHOOK_ADDRESS', '127.0.0.1')
+WEBHOOK_SECRET = os.getenv('WEBHOOK_SECRET')
+WEBHOOK_RECONCILE_TIME = int(os.getenv('WEBHOOK_RECONCILE_TIME', 3600))
+WEBHOOK_MAX_BODY = int(os.getenv('WEBHOOK_MAX_BODY', 1 << 20))
+EVENTS_PATH = '/events/'
+SECRET_HEADER = 'X-Webhook-Secret'
+INVALID_EVENT_MESSAGE = 'Отклонено событие для {account}: {error}'
+NO_SECRET_MESSAGE = (
+    'Вебхук на адресе {address} доступен извне, задайте WEBHOOK_SECRET'
+)
+
+ACCEPTED = 'accepted'
+INVALID = 'invalid'
+UNKNOWN = 'unknown'
+FORBIDDEN = 'forbidden'
+UNAVAILABLE = 'unavailable'
+
+
+def validate_event(event):
+    """Homeworks of an event checked like a polled answer.
+
+    Every homework has to pass `parse_status` before any of them is
+    compared with the last seen statuses.
+    """
+    if not isinstance(event, dict) or not isinstance(
+            event.get('homeworks'), list):
+        raise ValueError(homework.EMPTY_RESPONSE_MESSAGE)
+    homeworks = event['homeworks']
+    if not all(isinstance(item, dict) for item in homeworks):
+        raise ValueError(homework.EMPTY_RESPONSE_MESSAGE)
+    homework.check_response(event)
+    for item in homeworks:
+        homework.parse_status(item)
+    return homeworks
+
+
+def accept_event(push, account, body):
+    """HTTP status and outcome of one pushed event."""
+    try:
+        accepted = push(account, validate_event(json.loads(body)))
+    except (ValueError, KeyError, TypeError) as error:
+        logging.warning(LazyMessage(
+            INVALID_EVENT_MESSAGE, account=account, error=error
+        ))
+        return 400, INVALID
+    except RuntimeError:
+        return 503, UNAVAILABLE
+    if accepted:
+        return 202, ACCEPTED
+    return 404, UNKNOWN
+
+
+def make_handler(push, secret=WEBHOOK_SECRET, max_body=WEBHOOK_MAX_BODY):
+    """Building the events handler, `http.server` is imported only here.
+
+    `push(account, homeworks)` returns False for an unknown account.
+    """
+    from http.server import BaseHTTPRequestHandler
+
+    class WebhookHandler(BaseHTTPRequestHandler):
+
+        def reply(self, status_code, outcome):
+            WEBHOOK_EVENTS.inc(outcome)
+            self.send_response(status_code)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+
+        def do_POST(self):
+            path = self.path.split('?')[0]
+            if not path.startswith(EVENTS_PATH):
+                self.send_error(404)
+                return
+            if secret and not hmac.compare_digest(
+                    self.headers.get(SECRET_HEADER, '').encode(),
+                    secret.encode()):
+                self.reply(403, FORBIDDEN)
+                return
+            length = int(self.headers.get('Content-Length') or 0)
+            if length > max_body:
+                self.reply(413, INVALID)
+                return
+            self.reply(*accept_event(
+                push, path[len(EVENTS_PATH):], self.rfile.read(length)
+            ))
+
+        def log_message(self, *args):
+            pass
+
+    return WebhookHandler
+
+
+def is_loopback(address):
+    if address == 'localhost':
+        return True
+    try:
+        return ipaddress.ip_address(address).is_loopback
+    except ValueError:
+        return False
+
+
+def start_webhook_server(push, port=WEBHOOK_PORT, address=WEBHOOK_ADDRESS,
+                         secret=WEBHOOK_SECRET):
+    """Accepting events from a daemon thread, None when port is unset.
+
+    Without a secret only a loopback address is allowed, anyone else who
+    can reach the port could push forged verdicts.
+    """
+    if port is None:
+        return None
+    if not secret and not is_loopback(address):
+        raise ValueError(NO_SECRET_MESSAGE.format(address=address))
+    from http.server import ThreadingHTTPServer
+
+    server = ThreadingHTTPServer(
+        (address, int(port)), make_handler(push, secret)
+    )
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server